@@ -0,0 +1,192 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src import serialization
+from src.binary_scene import (
+    BINARY_EXTENSION,
+    HEADER_DTYPE,
+    MAGIC,
+    NODE_DTYPES,
+    map_scene_file,
+    read_scene_data,
+    read_scene_nodes,
+    write_scene_data,
+)
+from src.node import NODE_CLASSES, HierarchicalNode, Node, register_node_class
+from src.premitives import Cube, Plane, SnowFigure, Sphere
+from src.scene import Scene
+from src.serialization import NumpyArrayEncoder
+
+
+class TestBinaryScene(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "scene" + BINARY_EXTENSION)
+
+        self.scene_data = {
+            "nodes": [
+                {
+                    "type": "Cube",
+                    "position": [1.0, 2.0, 3.0],
+                    "scaling": [2.0, 2.0, 2.0],
+                    "color_index": 5,
+                },
+                {
+                    "type": "Plane",
+                    "position": [0.0, 0.0, 0.0],
+                    "scaling": [1.0, 1.0, 1.0],
+                    "color_index": 1,
+                    "corners": np.array(
+                        [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=float
+                    ),
+                },
+                {
+                    "type": "HierarchicalNode",
+                    "position": [0.0, 1.0, 0.0],
+                    "scaling": [1.0, 0.5, 1.0],
+                    "color_index": 2,
+                    "children": [
+                        {
+                            "type": "Sphere",
+                            "position": [0.5, 0, 0],
+                            "scaling": [1.0, 1.0, 1.0],
+                            "color_index": 3,
+                        }
+                    ],
+                },
+            ]
+        }
+
+    def as_json(self, scene_data):
+        return json.loads(json.dumps(scene_data, cls=NumpyArrayEncoder))
+
+    def test_round_trip(self):
+        write_scene_data(self.scene_data, self.path)
+
+        self.assertEqual(
+            self.as_json(read_scene_data(self.path)), self.as_json(self.scene_data)
+        )
+
+    def test_memory_mapped(self):
+        write_scene_data(self.scene_data, self.path)
+
+        nodes, corners, type_names = map_scene_file(self.path)
+
+        self.assertIsInstance(nodes, np.memmap)
+        self.assertIsInstance(corners, np.memmap)
+        self.assertEqual(len(nodes), 4)
+        self.assertEqual(corners.shape, (4, 3))
+        np.testing.assert_array_equal(nodes["parent"], [-1, -1, -1, 2])
+        self.assertEqual(type_names, ("Cube", "HierarchicalNode", "Plane", "Sphere"))
+        del nodes, corners
+
+    def test_read_scene_nodes(self):
+        write_scene_data(self.scene_data, self.path)
+
+        # узлы строятся из таблицы, словари узлов не создаются
+        with patch.object(Node, "from_dict", side_effect=AssertionError):
+            cube, plane, group = read_scene_nodes(self.path)
+
+        self.assertIsInstance(cube, Cube)
+        np.testing.assert_array_equal(cube.get_position(), [1, 2, 3])
+        np.testing.assert_array_equal(np.diag(cube.scaling_matrix), [2, 2, 2, 1])
+        self.assertEqual(cube.color_index, 5)
+        self.assertIsInstance(plane, Plane)
+        np.testing.assert_array_equal(
+            plane.corners, self.scene_data["nodes"][1]["corners"]
+        )
+        self.assertEqual(len(plane.control_points), 4)
+        self.assertIsInstance(group, HierarchicalNode)
+        (sphere,) = group.child_nodes
+        self.assertIsInstance(sphere, Sphere)
+        np.testing.assert_array_equal(sphere.get_position(), [0.5, 0, 0])
+        self.assertIsNotNone(group.aabb)
+
+    def test_type_codes_follow_registry(self):
+        @register_node_class
+        class Teapot(Cube):
+            pass
+
+        self.addCleanup(NODE_CLASSES.pop, "Teapot", None)
+        scene_data = {"nodes": [{"type": "Teapot"}, {"type": "Cube"}]}
+        write_scene_data(scene_data, self.path)
+
+        teapot, cube = read_scene_nodes(self.path)
+        self.assertIsInstance(teapot, Teapot)
+        self.assertIs(type(cube), Cube)
+
+        # тип, которого уже нет в реестре, пропускается вместе с поддеревом
+        NODE_CLASSES.pop("Teapot")
+        (cube,) = read_scene_nodes(self.path)
+        self.assertIs(type(cube), Cube)
+
+    def test_version_1(self):
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["version"] = 1
+        header["node_count"] = 1
+        nodes = np.zeros(1, dtype=NODE_DTYPES[1])
+        nodes["parent"] = -1
+        nodes["position"] = [1, 2, 3]
+        with open(self.path, "wb") as file:
+            file.write(header.tobytes() + nodes.tobytes())
+
+        (node_data,) = read_scene_data(self.path)["nodes"]
+        self.assertEqual(node_data["type"], "Cube")
+        self.assertEqual(node_data["position"], [1, 2, 3])
+        self.assertEqual(node_data["scaling"], [1, 1, 1])
+
+        (cube,) = read_scene_nodes(self.path)
+        self.assertIsInstance(cube, Cube)
+        np.testing.assert_array_equal(cube.get_position(), [1, 2, 3])
+        np.testing.assert_array_equal(cube.scaling_matrix, np.identity(4))
+
+    def test_empty_scene(self):
+        write_scene_data({"nodes": []}, self.path)
+        self.assertEqual(read_scene_data(self.path), {"nodes": []})
+        self.assertEqual(read_scene_nodes(self.path), [])
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not a scene")
+        with self.assertRaises(ValueError):
+            read_scene_data(self.path)
+
+        with self.assertRaises(ValueError):
+            write_scene_data({"nodes": [{"type": "Teapot"}]}, self.path)
+
+    def test_save_and_load_scene(self):
+        scene = Scene()
+        cube = Cube()
+        cube.translate(1, 2, 3)
+        plane = Plane()
+        plane.corners = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]])
+        plane.create_control_points()
+        for scene_node in [cube, plane, SnowFigure()] + plane.control_points:
+            scene.add_node(scene_node)
+
+        with patch("src.serialization.SAVE_DIRECTORY", self.directory.name), patch(
+            "src.serialization.get_name_file_for_save_scene", return_value="saved"
+        ), patch("builtins.print"):
+            serialization.save_scene(scene, binary=True)
+            loaded = serialization.load_scene("saved" + BINARY_EXTENSION)
+
+        types = [type(scene_node).__name__ for scene_node in loaded.node_list]
+        self.assertEqual(types.count("ActivePoint"), 4)
+        self.assertEqual(
+            [t for t in types if t != "ActivePoint"], ["Cube", "Plane", "SnowFigure"]
+        )
+        loaded_cube = loaded.node_list[0]
+        np.testing.assert_array_almost_equal(loaded_cube.get_position(), [1, 2, 3])
+        self.assertEqual(loaded_cube.color_index, cube.color_index)
+
+
+if __name__ == "__main__":
+    unittest.main()
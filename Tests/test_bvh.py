@@ -0,0 +1,122 @@
+import sys
+import unittest
+
+import numpy as np
+
+from src.bvh import BVH
+from src.premitives import Cube, Sphere
+from src.scene import Scene
+
+
+def make_cube(x, y, z):
+    cube = Cube()
+    cube.translate(x, y, z)
+    return cube
+
+
+class TestBVH(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [make_cube(i * 2.0, 0, 0) for i in range(10)]
+        self.bvh = BVH(self.nodes, lambda item: item.get_pick_bounds())
+
+    def test_build(self):
+        self.assertEqual(len(self.bvh), 10)
+        np.testing.assert_array_almost_equal(self.bvh.root.min_point, [-0.5] * 3)
+        np.testing.assert_array_almost_equal(self.bvh.root.max_point, [18.5, 0.5, 0.5])
+
+    def test_query_ray(self):
+        candidates = self.bvh.query_ray([4.0, 0.0, 10.0], [0.0, 0.0, -1.0])
+        self.assertEqual(candidates, [self.nodes[2]])
+
+        candidates = self.bvh.query_ray([4.0, 5.0, 10.0], [0.0, 0.0, -1.0])
+        self.assertEqual(candidates, [])
+
+    def test_insert_and_remove(self):
+        cube = make_cube(0, 10, 0)
+        self.bvh.insert(cube)
+        self.assertIn(cube, self.bvh)
+        self.assertEqual(self.bvh.query_ray([0, 10, 10], [0, 0, -1]), [cube])
+
+        self.bvh.remove(cube)
+        self.assertNotIn(cube, self.bvh)
+        self.assertEqual(self.bvh.query_ray([0, 10, 10], [0, 0, -1]), [])
+
+        for node in self.nodes:
+            self.bvh.remove(node)
+        self.assertIsNone(self.bvh.root)
+
+    def test_refit(self):
+        self.nodes[0].translate(0, 10, 0)
+        self.bvh.refit(self.nodes[0])
+
+        self.assertEqual(self.bvh.query_ray([0, 10, 10], [0, 0, -1]), [self.nodes[0]])
+        self.assertEqual(self.bvh.query_ray([0, 0, 10], [0, 0, -1]), [])
+
+    def test_unbounded_always_returned(self):
+        node = Sphere()
+        node.aabb = None
+        self.bvh.insert(node)
+
+        self.assertIn(node, self.bvh.query_ray([100, 100, 100], [0, 0, 1]))
+
+
+class TestScenePickWithBVH(unittest.TestCase):
+
+    def brute_force(self, scene, start, direction, mat):
+        mindist = sys.maxsize
+        closest_node = None
+        for node in scene.node_list:
+            hit, distance = node.pick(start, direction, mat)
+            if hit and distance < mindist:
+                mindist, closest_node = distance, node
+        return closest_node
+
+    def test_same_result_as_linear_search(self):
+        scene = Scene()
+        for i in range(5):
+            for j in range(5):
+                node = make_cube(i * 1.5, j * 1.5, 0)
+                if (i + j) % 3 == 0:
+                    node.scale(up=True)
+                scene.add_node(node)
+        scene.create_plane_from_three_points(
+            [0.0, 0.0, 2.0], [3.0, 0.0, 2.0], [0.0, 3.0, 2.0]
+        )
+
+        mat = np.identity(4)
+        mat[:3, 3] = [0.3, -0.2, -1.0]
+        direction = np.array([0.0, 0.0, -1.0])
+
+        for x in np.linspace(-1, 7, 9):
+            for y in np.linspace(-1, 7, 9):
+                start = np.array([x, y, 10.0])
+                expected = self.brute_force(scene, start, direction, mat)
+
+                scene.select_nodes.clear()
+                scene.pick(start, direction, mat, multiple_choice=False)
+                if expected is None:
+                    self.assertEqual(scene.select_nodes, [])
+                else:
+                    self.assertEqual(scene.select_nodes, [expected])
+                    expected.select(False)
+
+    def test_refit_after_move(self):
+        scene = Scene()
+        cube = make_cube(0, 0, 0)
+        scene.add_node(cube)
+        scene.get_bvh()
+
+        cube.depth = 10.0
+        cube.selected_loc = np.array([0.0, 0.0, 0.0])
+        scene.select_nodes.append(cube)
+        scene.move_selected(
+            np.array([5.0, 0.0, -10.0]), np.array([0.0, 0.0, 1.0]), np.identity(4)
+        )
+
+        candidates = scene.get_bvh().query_ray([5, 0, 10], [0, 0, -1])
+        self.assertEqual(candidates, [cube])
+
+
+if __name__ == "__main__":
+    unittest.main()
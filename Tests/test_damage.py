@@ -0,0 +1,59 @@
+import unittest
+
+from src import damage
+from src.damage import DamageTracker
+from src.premitives import Cube, Plane
+from src.scene import Scene
+
+
+class TestDamageTracker(unittest.TestCase):
+
+    def test_mark_and_clear(self):
+        tracker = DamageTracker()
+        self.assertTrue(tracker.is_dirty())
+
+        tracker.clear()
+        self.assertFalse(tracker.is_dirty())
+
+        tracker.mark()
+        self.assertTrue(tracker.is_dirty())
+
+
+class TestNodesMarkDirty(unittest.TestCase):
+
+    def setUp(self):
+        self.cube = Cube()
+        damage.tracker.clear()
+
+    def assertMarks(self, action):
+        damage.tracker.clear()
+        action()
+        self.assertTrue(damage.tracker.is_dirty())
+
+    def test_node_changes(self):
+        self.assertFalse(damage.tracker.is_dirty())
+
+        self.assertMarks(lambda: self.cube.translate(1, 0, 0))
+        self.assertMarks(lambda: self.cube.scale(up=True))
+        self.assertMarks(lambda: self.cube.rotate_color(forwards=True))
+        self.assertMarks(lambda: self.cube.select())
+
+    def test_read_only_calls_keep_clean(self):
+        self.cube.get_position()
+        self.cube.get_pick_bounds()
+        self.assertFalse(damage.tracker.is_dirty())
+
+    def test_plane_corners(self):
+        plane = Plane()
+        self.assertMarks(
+            lambda: setattr(plane, "corners", [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+        )
+
+    def test_scene_changes(self):
+        scene = Scene()
+        self.assertMarks(lambda: scene.add_node(self.cube))
+        self.assertMarks(lambda: scene.remove_node(self.cube))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,252 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from src import renderer
+from src.bvh import BVH
+from src.frustum import (
+    Frustum,
+    perspective,
+    pick_matrix,
+    OUTSIDE,
+    INTERSECTS,
+    INSIDE,
+)
+from src.node import translation
+from src.premitives import Cube, Line, Plane, SnowFigure, Sphere
+from src.scene import Scene
+
+
+def camera_frustum():
+    """Камера в начале координат смотрит вдоль -z"""
+    return Frustum.from_matrix(perspective(70, 1.0, 0.1, 100.0))
+
+
+class TestFrustum(unittest.TestCase):
+
+    def setUp(self):
+        self.frustum = camera_frustum()
+
+    def test_classify_box(self):
+        self.assertEqual(
+            self.frustum.classify_box(np.array([-1, -1, -6]), np.array([1, 1, -4])),
+            INSIDE,
+        )
+        self.assertEqual(
+            self.frustum.classify_box(np.array([-1, -1, 4]), np.array([1, 1, 6])),
+            OUTSIDE,
+        )
+        self.assertEqual(
+            self.frustum.classify_box(np.array([-1, -1, -1]), np.array([1, 1, 1])),
+            INTERSECTS,
+        )
+        self.assertEqual(
+            self.frustum.classify_box(np.array([50, -1, -6]), np.array([52, 1, -4])),
+            OUTSIDE,
+        )
+
+    def test_boxes_visible_matches_classify(self):
+        rng = np.random.default_rng(0)
+        min_points = rng.uniform(-50, 50, (200, 3))
+        max_points = min_points + rng.uniform(0, 5, (200, 3))
+
+        visible = self.frustum.boxes_visible(min_points, max_points)
+        expected = [
+            self.frustum.classify_box(lo, hi) != OUTSIDE
+            for lo, hi in zip(min_points, max_points)
+        ]
+        np.testing.assert_array_equal(visible, expected)
+
+    def test_boxes_inside_matches_classify(self):
+        rng = np.random.default_rng(2)
+        min_points = rng.uniform(-20, 20, (200, 3)) - [0, 0, 20]
+        max_points = min_points + rng.uniform(0, 5, (200, 3))
+
+        inside = self.frustum.boxes_inside(min_points, max_points)
+        expected = [
+            self.frustum.classify_box(lo, hi) == INSIDE
+            for lo, hi in zip(min_points, max_points)
+        ]
+        np.testing.assert_array_equal(inside, expected)
+        self.assertTrue(inside.any())
+
+    def test_pick_matrix(self):
+        # углы прямоугольника окна 800x600 переходят в углы NDC
+        matrix = pick_matrix(500, 100, 300, 400, 800, 600)
+        for x, y, expected in ((300, 100, [-1, -1]), (500, 400, [1, 1])):
+            ndc = np.array([2 * x / 800 - 1, 2 * y / 600 - 1, 0, 1])
+            np.testing.assert_array_almost_equal((matrix @ ndc)[:2], expected)
+
+    def test_camera_transform(self):
+        # сдвинутая камера видит то, что раньше было за спиной
+        frustum = Frustum.from_matrix(
+            perspective(70, 1.0, 0.1, 100.0) @ translation([0, 0, -20])
+        )
+        self.assertEqual(
+            frustum.classify_box(np.array([-1, -1, 4]), np.array([1, 1, 6])), INSIDE
+        )
+
+    def test_projected_sizes(self):
+        self.assertIsNone(self.frustum.projected_sizes([[0, 0, -5]], [0.5]))
+
+        frustum = Frustum.from_matrix(perspective(90, 1.0, 0.1, 100.0), 600)
+        sizes = frustum.projected_sizes([[0, 0, -1], [0, 0, -10]], [0.5, 0.5])
+        # при угле обзора 90 градусов на расстоянии 1 экран охватывает 2 единицы
+        np.testing.assert_array_almost_equal(sizes, [300, 30])
+
+    def test_bvh_query_frustum(self):
+        rng = np.random.default_rng(1)
+        boxes = []
+        for lo in rng.uniform(-40, 40, (100, 3)):
+            boxes.append((lo, lo + 1.0))
+        bvh = BVH(range(len(boxes)), lambda i: boxes[i])
+
+        expected = {
+            i
+            for i, (lo, hi) in enumerate(boxes)
+            if self.frustum.classify_box(lo, hi) != OUTSIDE
+        }
+        self.assertEqual(set(bvh.query_frustum(self.frustum)), expected)
+
+
+class TestSceneFrustumCulling(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = Scene()
+        self.frustum = camera_frustum()
+
+    def test_render_bounds(self):
+        cube = Cube()
+        cube.translate(1, 2, 3)
+        cube.scale(up=True)
+        lo, hi = cube.get_render_bounds()
+        np.testing.assert_array_almost_equal(lo, [0.45, 1.45, 2.45])
+        np.testing.assert_array_almost_equal(hi, [1.55, 2.55, 3.55])
+
+        # рамка снеговика не охватывает нижний шар, границы берутся по детям
+        figure = SnowFigure()
+        lo, hi = figure.get_render_bounds()
+        self.assertLessEqual(lo[1], -1.1 + 1e-9)
+
+        plane = Plane()
+        self.assertIsNone(plane.get_render_bounds())
+        plane.corners = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]])
+        plane.translate(0, 0, 2)
+        lo, hi = plane.get_render_bounds()
+        np.testing.assert_array_almost_equal(lo, [0, 0, 2])
+        np.testing.assert_array_almost_equal(hi, [1, 1, 2])
+
+    @patch.dict(renderer.LOD_LEVELS)
+    def test_update_lod(self):
+        renderer.register_lod(10, [(60, 10), (20, 11), (0, 12)])
+        frustum = Frustum.from_matrix(perspective(90, 1.0, 0.1, 100.0), 600)
+        spheres = [Sphere() for _ in range(3)]
+        for sphere, depth in zip(spheres, (-1, -10, -100)):
+            sphere.call_list = 10
+            sphere.translate(0, 0, depth)
+        cube = Cube()
+
+        self.scene.update_lod(spheres + [cube], frustum)
+
+        self.assertEqual([s.get_call_list() for s in spheres], [10, 11, 12])
+        self.assertIsNone(cube.lod_call_list)
+
+        self.scene.update_lod(spheres, None)
+        self.assertEqual([s.get_call_list() for s in spheres], [10, 10, 10])
+
+    @patch("src.scene.Scene.render_aabbs")
+    def test_render_draws_visible_nodes(self, _):
+        visible = Sphere()
+        visible.translate(0, 0, -5)
+        hidden = Sphere()
+        hidden.translate(0, 0, 5)
+        unbounded = Plane()
+        for scene_node in (visible, hidden, unbounded):
+            scene_node.render = MagicMock()
+            self.scene.add_node(scene_node)
+
+        self.scene.render(self.frustum)
+
+        visible.render.assert_called_once()
+        hidden.render.assert_not_called()
+        unbounded.render.assert_called_once()
+
+        # после перемещения индекс обновляется вместе со сценой
+        self.scene.translate_nodes([hidden], 0, 0, -10)
+        self.scene.render(self.frustum)
+        hidden.render.assert_called_once()
+
+
+class TestSceneRegionSelection(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = Scene()
+        self.projection = perspective(90, 1.0, 0.1, 100.0)
+
+    def region_frustum(self, x0, y0, x1, y1):
+        return Frustum.from_matrix(
+            pick_matrix(x0, y0, x1, y1, 600, 600) @ self.projection
+        )
+
+    def test_select_in_region(self):
+        left, right, partly = Cube(), Cube(), Cube()
+        left.translate(-2, 0, -5)
+        right.translate(2, 0, -5)
+        partly.translate(0, 0, -5)
+        line = Line([-2.0, 1.0, -5.0], [-1.5, 1.0, -5.0])
+        for scene_node in [left, right, partly, line] + line.control_points:
+            self.scene.add_node(scene_node)
+
+        # левая половина окна: куб по центру в неё входит только частично
+        selected = self.scene.select_in_region(self.region_frustum(0, 0, 290, 600))
+
+        self.assertEqual(set(selected), {left, line})
+        self.assertEqual(set(self.scene.select_nodes), {left, line})
+        self.assertTrue(left.selected)
+        self.assertFalse(partly.selected)
+        for point in line.control_points:
+            self.assertFalse(point.selected)
+
+        # без multiple_choice прежнее выделение снимается
+        self.scene.select_in_region(self.region_frustum(310, 0, 600, 600))
+        self.assertEqual(list(self.scene.select_nodes), [right])
+        self.assertFalse(left.selected)
+
+        self.scene.select_in_region(self.region_frustum(0, 0, 290, 600), True)
+        self.assertEqual(set(self.scene.select_nodes), {left, line, right})
+
+    def test_move_after_select_in_region(self):
+        boxed, clicked = Cube(), Cube()
+        boxed.translate(-2, 0, -5)
+        clicked.translate(2, 0, -5)
+        for scene_node in (boxed, clicked):
+            self.scene.add_node(scene_node)
+
+        # луч через центр рамки
+        start = np.zeros(3)
+        box_direction = np.array([-1.0, 0.0, -5.0]) / np.sqrt(26)
+        self.scene.select_in_region(
+            self.region_frustum(0, 0, 290, 600), start=start, direction=box_direction
+        )
+        self.assertAlmostEqual(boxed.depth, np.sqrt(29))
+        np.testing.assert_allclose(boxed.selected_loc, box_direction * np.sqrt(29))
+
+        # Ctrl + клик добавляет второй узел, затем выделенное перетаскивается
+        self.scene.select_picked(
+            clicked, 5.0, start, np.array([0.0, 0.0, -1.0]), multiple_choice=True
+        )
+        # курсор на луче рамки: узел из рамки остаётся на месте
+        self.scene.move_selected(start, box_direction, np.identity(4))
+        np.testing.assert_allclose(boxed.get_position(), [-2, 0, -5])
+
+        direction = np.array([0.0, 0.0, -1.0])
+        self.scene.move_selected(start, direction, np.identity(4))
+        np.testing.assert_allclose(
+            boxed.get_position(),
+            np.array([-2, 0, -5]) + (direction - box_direction) * np.sqrt(29),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,12 +2,15 @@ import unittest
 from unittest.mock import MagicMock, patch
 
 import src.interaction
+from src import damage
 from OpenGL.raw.GLUT import (
     GLUT_LEFT_BUTTON,
     GLUT_DOWN,
     GLUT_KEY_UP,
     GLUT_KEY_LEFT,
     GLUT_RIGHT_BUTTON,
+    GLUT_UP,
+    GLUT_ACTIVE_SHIFT,
 )
 
 from src.interaction import Interaction, Trackball
@@ -61,6 +64,26 @@ class TestInteraction(unittest.TestCase):
 
         self.assertEqual(self.interaction.translation[2], 0.0)
 
+    @patch("src.interaction.glutPostRedisplay")
+    @patch("src.interaction.glutGetModifiers", return_value=GLUT_ACTIVE_SHIFT)
+    @patch("src.interaction.glutGet", return_value=800)
+    def test_box_select(self, *_):
+        mock_pick = MagicMock()
+        mock_move = MagicMock()
+        mock_box_select = MagicMock()
+        self.interaction.register_callback("pick", mock_pick)
+        self.interaction.register_callback("move", mock_move)
+        self.interaction.register_callback("box_select", mock_box_select)
+
+        self.interaction.handle_mouse_button(GLUT_LEFT_BUTTON, GLUT_DOWN, 100, 200)
+        self.interaction.handle_mouse_move(300, 500)
+        self.interaction.handle_mouse_button(GLUT_LEFT_BUTTON, GLUT_UP, 300, 500)
+
+        mock_pick.assert_not_called()
+        mock_move.assert_not_called()
+        mock_box_select.assert_called_once_with(100, 600, 300, 300, False)
+        self.assertIsNone(self.interaction.box_start)
+
     @patch("src.interaction.glutPostRedisplay")
     @patch("src.interaction.glutGet", return_value=800)
     def test_handle_mouse_move(self, mock_glutGet, _):
@@ -107,6 +130,28 @@ class TestInteraction(unittest.TestCase):
 
         mock_callback_rotate_color.assert_called_once_with(forward=True)
 
+    @patch("src.interaction.glutPostRedisplay")
+    @patch("src.interaction.glutGet", return_value=800)
+    def test_redisplay_only_when_dirty(self, mock_glutGet, mock_redisplay):
+        self.interaction.register_callback("save", MagicMock())
+        damage.tracker.clear()
+
+        self.interaction.handle_keystroke(b"k", 0, 0)
+        mock_redisplay.assert_not_called()
+
+        self.interaction.handle_mouse_button(3, GLUT_DOWN, 100, 200)
+        mock_redisplay.assert_called_once()
+
+    @patch("src.interaction.glutPostRedisplay")
+    @patch("src.interaction.glutGet")
+    def test_mouse_move_without_button(self, mock_glutGet, mock_redisplay):
+        self.interaction.pressed = None
+
+        self.interaction.handle_mouse_move(150, 200)
+
+        mock_glutGet.assert_not_called()
+        mock_redisplay.assert_not_called()
+
     def test_trackball_drag_to(self):
         trackball = Trackball()
 
@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src.journal import SceneJournal
+from src.premitives import Cube, Sphere, Plane, ActivePoint
+from src.scene import Scene
+from src.serialization import NumpyArrayEncoder
+
+
+def describe(scene):
+    """Узлы сцены без точек-контроллеров, для сравнения"""
+    nodes = [
+        scene_node.to_dict()
+        for scene_node in scene.node_list
+        if not isinstance(scene_node, ActivePoint)
+    ]
+    return json.loads(json.dumps(nodes, cls=NumpyArrayEncoder))
+
+
+class TestSceneJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        patcher = patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.scene = Scene()
+        self.cubes = [Cube() for _ in range(3)]
+        for i, cube in enumerate(self.cubes):
+            cube.translate(i, 0, 0)
+            self.scene.add_node(cube)
+        self.journal = SceneJournal(self.directory.name)
+        self.journal.attach(self.scene)
+
+    def read_journal(self):
+        with open(self.journal.journal_path, "r") as file:
+            return [json.loads(line) for line in file]
+
+    def recover(self):
+        return SceneJournal(self.directory.name).recover()
+
+    def test_flush_writes_only_changes(self):
+        self.scene.translate_nodes([self.cubes[1]], 0, 1, 0)
+        self.scene.translate_nodes([self.cubes[1]], 0, 1, 0)
+
+        self.assertEqual(self.journal.flush(), 1)
+        self.assertEqual(self.journal.flush(), 0)
+
+        header, entry = self.read_journal()
+        self.assertEqual(header, {"generation": 1})
+        self.assertEqual(entry["op"], "update")
+        self.assertEqual(entry["id"], 1)
+        np.testing.assert_array_almost_equal(entry["node"]["position"], [1, 2, 0])
+
+    def test_recover(self):
+        sphere = Sphere()
+        self.scene.add_node(sphere)
+        self.scene.select_nodes.append(self.cubes[0])
+        self.scene.rotate_selected_color(forwards=True)
+        self.scene.scale_selected(up=True)
+        self.scene.select_nodes.clear()
+        self.scene.remove_node(self.cubes[2])
+
+        plane = Plane()
+        plane.corners = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]])
+        plane.create_control_points()
+        self.scene.add_node(plane)
+        for control_point in plane.control_points:
+            self.scene.add_node(control_point)
+        self.journal.flush()
+
+        # угол плоскости двигается её точкой-контроллером
+        plane.control_points[3].translate(0, 0, 1)
+        self.scene.record_change(plane.control_points[3])
+        self.journal.flush()
+
+        recovered = self.recover()
+
+        self.assertEqual(describe(recovered), describe(self.scene))
+        self.assertEqual(len(recovered.node_list), len(self.scene.node_list))
+
+    def test_added_and_removed_between_flushes(self):
+        sphere = Sphere()
+        self.scene.add_node(sphere)
+        self.scene.record_change(sphere)
+        self.scene.remove_node(sphere)
+
+        self.assertEqual(self.journal.flush(), 0)
+        self.assertEqual(len(self.read_journal()), 1)
+
+    def test_compaction(self):
+        journal = SceneJournal(self.directory.name, compact_min_entries=2)
+        journal.attach(self.scene)
+        self.assertIs(self.scene.journal, journal)
+
+        for cube in self.cubes[:2]:
+            self.scene.translate_nodes([cube], 1, 0, 0)
+            journal.flush()
+        self.assertEqual(journal.generation, 1)
+
+        self.scene.translate_nodes([self.cubes[2]], 1, 0, 0)
+        journal.flush()
+        # записей стало столько же, сколько узлов в сцене, журнал сжат в снимок
+        self.assertEqual(journal.generation, 2)
+        self.assertEqual(len(self.read_journal()), 1)
+
+        self.scene.translate_nodes([self.cubes[0]], 1, 0, 0)
+        journal.flush()
+        self.assertEqual(describe(self.recover()), describe(self.scene))
+
+    def test_interrupted_writes(self):
+        self.scene.translate_nodes([self.cubes[0]], 0, 0, 5)
+        self.journal.flush()
+        expected = describe(self.scene)
+
+        with open(self.journal.journal_path, "a") as file:
+            file.write('{"op": "remove", "id"')
+        self.assertEqual(describe(self.recover()), expected)
+
+        # журнал прошлого поколения поверх нового снимка не проигрывается
+        with open(self.journal.journal_path, "w") as file:
+            file.write(json.dumps({"generation": 0}) + "\n")
+            file.write(json.dumps({"op": "remove", "id": 0}) + "\n")
+        self.assertEqual(len(describe(self.recover())), 3)
+
+    def test_exists(self):
+        self.assertTrue(self.journal.exists())
+        self.assertFalse(
+            SceneJournal(os.path.join(self.directory.name, "missing")).exists()
+        )
+
+    def test_close(self):
+        self.scene.translate_nodes([self.cubes[0]], 0, 0, 5)
+        self.journal.close()
+
+        self.assertIsNone(self.scene.journal)
+        self.assertFalse(self.journal.exists())
+        self.assertFalse(os.path.exists(self.journal.journal_path))
+        # после штатного выхода новому сеансу восстанавливать нечего
+        self.assertFalse(SceneJournal(self.directory.name).exists())
+        self.scene.add_node(Sphere())
+        self.journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
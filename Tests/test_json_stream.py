@@ -0,0 +1,53 @@
+import io
+import json
+import unittest
+
+from src.json_stream import JSONStreamReader, iter_member_array
+
+
+def stream(data):
+    return io.BytesIO(json.dumps(data, indent=4).encode())
+
+
+class TestJSONStreamReader(unittest.TestCase):
+
+    def test_items_across_chunks(self):
+        nodes = [
+            {"type": "Plane", "position": [i, 0.5, -i], "name": "узел " * i}
+            for i in range(50)
+        ]
+        file = stream({"version": {"a": [1, 2]}, "nodes": nodes, "tail": 1})
+
+        # куски меньше одного узла и границы посреди чисел и utf-8
+        self.assertEqual(list(iter_member_array(file, "nodes", chunk_size=7)), nodes)
+
+    def test_numbers_on_chunk_boundary(self):
+        file = io.BytesIO(b'{"nodes": [12345, 6.789e3, -1]}')
+        items = list(iter_member_array(file, "nodes", chunk_size=3))
+        self.assertEqual(items, [12345, 6789.0, -1])
+
+    def test_reads_lazily(self):
+        file = stream({"nodes": [{"i": i} for i in range(10000)]})
+        reader = JSONStreamReader(file, chunk_size=1024)
+        items = reader.iter_member_array("nodes")
+
+        self.assertEqual(next(items), {"i": 0})
+        self.assertLess(reader.bytes_read, 4096)
+        self.assertLess(len(reader.buffer), 4096)
+
+    def test_empty_and_missing(self):
+        self.assertEqual(list(iter_member_array(stream({"nodes": []}), "nodes")), [])
+        self.assertEqual(list(iter_member_array(stream({}), "nodes")), [])
+        self.assertEqual(list(iter_member_array(stream({"a": 1}), "nodes")), [])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iter_member_array(io.BytesIO(b'{"nodes": [1 2]}'), "nodes"))
+        with self.assertRaises(ValueError):
+            list(iter_member_array(io.BytesIO(b'{"nodes": [{"a": }]}'), "nodes"))
+        with self.assertRaises(ValueError):
+            list(iter_member_array(io.BytesIO(b"[1, 2]"), "nodes"))
+
+
+if __name__ == "__main__":
+    unittest.main()
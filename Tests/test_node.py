@@ -6,7 +6,10 @@ import numpy as np
 import trimesh
 
 from src.node import Node, AABB, HierarchicalNode, Primitive, ObjectWithControlPoints
-from src.node import translation, scaling
+from src.node import translation, scaling, ray_box_intersection
+from src.node import get_point_coord, get_points_coord
+from src.node import NODE_CLASSES, node_from_dict
+from src.premitives import Cube, Sphere
 
 
 class TestNode(unittest.TestCase):
@@ -101,7 +104,33 @@ class TestAABB(unittest.TestCase):
         expected_extents = np.array(self.max_point) - np.array(self.min_point)
         np.testing.assert_array_equal(self.aabb.original_extents, expected_extents)
 
-        self.assertTrue(isinstance(self.aabb.box, trimesh.primitives.Box))
+        np.testing.assert_array_equal(
+            self.aabb.bounds, [self.min_point, self.max_point]
+        )
+
+    def test_vertices_match_trimesh_box(self):
+
+        aabb = AABB([0.0, 1.0, 2.0], [1.0, 3.0, 5.0])
+        box = trimesh.primitives.Box(
+            extents=aabb.original_extents,
+            transform=trimesh.transformations.translation_matrix([0.5, 2.0, 3.5]),
+        )
+        np.testing.assert_array_almost_equal(aabb.vertices, box.vertices)
+
+        aabb.scale(2.0)
+        box.apply_scale(2.0)
+        aabb.translate([1.0, 0.0, 0.0])
+        box.apply_translation([1.0, 0.0, 0.0])
+        np.testing.assert_array_almost_equal(aabb.vertices, box.vertices)
+        np.testing.assert_array_almost_equal(aabb.bounds, box.bounds)
+
+    def test_set_bounds(self):
+
+        intersector = self.aabb.intersector
+        self.aabb.set_bounds([1.0, 1.0, 1.0], [0.0, 2.0, 0.0])
+
+        np.testing.assert_array_equal(self.aabb.bounds, [[0, 1, 0], [1, 2, 1]])
+        self.assertIsNot(self.aabb.intersector, intersector)
 
     def test_ray_hit(self):
 
@@ -118,12 +147,47 @@ class TestAABB(unittest.TestCase):
         hit, distance = self.aabb.ray_hit(start, direction, matrix)
         self.assertFalse(hit)
 
+    def test_ray_hit_from_inside(self):
+
+        hit, distance = self.aabb.ray_hit(
+            [0.5, 0.5, 0.5], [1.0, 0.0, 0.0], np.identity(4)
+        )
+        self.assertTrue(hit)
+        self.assertAlmostEqual(distance, 0.5, places=5)
+
+    def test_intersector_cached(self):
+
+        intersector = self.aabb.intersector
+        self.assertIs(self.aabb.intersector, intersector)
+
+        self.aabb.scale(2.0)
+        self.assertIsNot(self.aabb.intersector, intersector)
+        np.testing.assert_array_almost_equal(
+            self.aabb.intersector.max_point, [2.0, 2.0, 2.0]
+        )
+
+        intersector = self.aabb.intersector
+        self.aabb.translate([1.0, 0.0, 0.0])
+        self.assertIsNot(self.aabb.intersector, intersector)
+
+    def test_ray_box_intersection_batch(self):
+
+        hit, t = ray_box_intersection(
+            np.array([[0.5, 0.5, 2.0], [5.0, 5.0, 5.0]]),
+            np.array([[0.0, 0.0, -1.0], [0.0, 0.0, 1.0]]),
+            np.array([0.0, 0.0, 0.0]),
+            np.array([1.0, 1.0, 1.0]),
+        )
+        np.testing.assert_array_equal(hit, [True, False])
+        self.assertAlmostEqual(t[0], 1.0)
+
     def test_scale(self):
 
         scale_factor = 2.0
-        with patch("trimesh.primitives.Box.apply_scale") as mock_scale:
-            self.aabb.scale(scale_factor)
-            mock_scale.assert_called_with(scale_factor)
+        self.aabb.scale(scale_factor)
+
+        np.testing.assert_array_equal(self.aabb.bounds, [[0, 0, 0], [2, 2, 2]])
+        np.testing.assert_array_equal(np.diag(self.aabb.transform), [2, 2, 2, 1])
 
     def test_translate(self):
 
@@ -158,6 +222,69 @@ class TestAABB(unittest.TestCase):
         self.assertGreater(mock_glVertex3fv.call_count, 0)
 
 
+class TestNodeClasses(unittest.TestCase):
+
+    def test_node_from_dict(self):
+        node = node_from_dict(
+            {"type": "HierarchicalNode", "color_index": 2, "position": [1, 2, 3]}
+        )
+
+        self.assertIsInstance(node, HierarchicalNode)
+        self.assertEqual(node.color_index, 2)
+        np.testing.assert_array_almost_equal(node.translation_matrix[:3, 3], [1, 2, 3])
+        self.assertEqual(node.child_nodes, [])
+
+    def test_nested_groups(self):
+        inner = HierarchicalNode()
+        cube = Cube()
+        cube.translate(1, 0, 0)
+        cube.scale(up=True)
+        inner.add_child(cube)
+        inner.translate(0, 2, 0)
+        outer = HierarchicalNode()
+        outer.add_child(inner)
+        outer.add_child(Sphere())
+        outer.scaling_matrix = scaling([2, 2, 2])
+
+        node = node_from_dict(outer.to_dict())
+
+        loaded_inner, sphere = node.child_nodes
+        self.assertIsInstance(sphere, Sphere)
+        (loaded_cube,) = loaded_inner.child_nodes
+        self.assertIsInstance(loaded_cube, Cube)
+        np.testing.assert_array_almost_equal(node.scaling_matrix, outer.scaling_matrix)
+        np.testing.assert_array_almost_equal(
+            loaded_cube.scaling_matrix, cube.scaling_matrix
+        )
+        np.testing.assert_array_almost_equal(loaded_cube.aabb.bounds, cube.aabb.bounds)
+        np.testing.assert_array_almost_equal(
+            loaded_inner.translation_matrix, inner.translation_matrix
+        )
+        # рамка группы охватывает детей
+        np.testing.assert_array_almost_equal(
+            loaded_inner.aabb.max_point, [1.55, 0.55, 0.55]
+        )
+        self.assertEqual(node.to_dict(), outer.to_dict())
+
+    def test_deep_tree(self):
+        data = {"type": "Cube"}
+        for _ in range(5000):
+            data = {"type": "HierarchicalNode", "children": [data]}
+
+        node = node_from_dict(data)
+
+        depth = 0
+        while isinstance(node, HierarchicalNode):
+            (node,) = node.child_nodes
+            depth += 1
+        self.assertEqual(depth, 5000)
+        self.assertIsInstance(node, Cube)
+
+    def test_unknown_type(self):
+        self.assertNotIn("Node", NODE_CLASSES)
+        self.assertIsNone(node_from_dict({"type": "Node"}))
+
+
 class TestHierarchicalNode(unittest.TestCase):
     def setUp(self):
 
@@ -184,6 +311,20 @@ class TestHierarchicalNode(unittest.TestCase):
         child_node1.render.assert_called_once()
         child_node2.render.assert_called_once()
 
+    @patch("src.node.glColor3f")
+    @patch("src.node.glMultMatrixf")
+    @patch("src.node.glPopMatrix")
+    @patch("src.node.glPushMatrix")
+    def test_render_id(self, _, __, ___, mock_glColor3f):
+        child_node = MagicMock()
+        self.node.add_child(child_node)
+
+        self.node.render_id()
+
+        child_node.render_id.assert_called_once()
+        child_node.render.assert_not_called()
+        mock_glColor3f.assert_not_called()
+
     def test_to_dict(self):
 
         child_node = MagicMock()
@@ -239,16 +380,91 @@ class TestObjectWithControlPoints(unittest.TestCase):
 
     def test_translate(self):
 
-        with patch.object(
-            ObjectWithControlPoints, "translate", wraps=self.object_with_cp.translate
-        ) as mock_translate:
+        self.object_with_cp.corners = np.array(
+            [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]
+        )
+        self.object_with_cp.create_control_points()
+        self.assertEqual(
+            [point.corner_index for point in self.object_with_cp.control_points],
+            [0, 1, 2],
+        )
+
+        self.object_with_cp.translate(1, 2, 3)
+
+        for point, corner in zip(
+            self.object_with_cp.control_points, self.object_with_cp.corners
+        ):
+            np.testing.assert_array_almost_equal(
+                point.get_position(), corner + [1, 2, 3]
+            )
+
+    def test_scaled_and_translated_control_points(self):
+
+        self.object_with_cp.corners = np.array(
+            [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]
+        )
+        self.object_with_cp.create_control_points()
+        self.object_with_cp.scale(up=True)
+        self.object_with_cp.translate(1, 2, 3)
+
+        # точки стоят там же, где рисуются углы (translation @ scaling)
+        matrix = (
+            self.object_with_cp.translation_matrix @ self.object_with_cp.scaling_matrix
+        )
+        moved = [point.get_position() for point in self.object_with_cp.control_points]
+        np.testing.assert_array_almost_equal(
+            moved,
+            [(matrix @ np.append(c, 1))[:3] for c in self.object_with_cp.corners],
+        )
+
+        self.object_with_cp.create_control_points()
+        created = [point.get_position() for point in self.object_with_cp.control_points]
+        np.testing.assert_array_almost_equal(created, moved)
+
+    def test_get_points_coord(self):
+
+        node = Node()
+        node.translate(1, 2, 3)
+        node.scale(up=True)
+        points = np.array([[0.0, 0.0, 0.0], [1.0, -1.0, 2.0]])
+
+        np.testing.assert_array_almost_equal(
+            get_points_coord(points, node),
+            [get_point_coord(point, node) for point in points],
+        )
+
+    def test_world_corners_cache(self):
 
-            self.object_with_cp.translate(1, 2, 3)
+        self.object_with_cp.corners = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+        world_corners = self.object_with_cp.get_world_corners()
+        self.assertIs(self.object_with_cp.get_world_corners(), world_corners)
 
-            mock_translate.assert_called_with(1, 2, 3)
+        Node.translate(self.object_with_cp, 0, 1, 0)
+        np.testing.assert_array_almost_equal(
+            self.object_with_cp.get_world_corners(), [[0, 1, 0], [1, 1, 0]]
+        )
 
-            for point in self.object_with_cp.control_points:
-                point.update_position.assert_called_once()
+        self.object_with_cp.corners = np.array([[2.0, 0.0, 0.0]])
+        np.testing.assert_array_almost_equal(
+            self.object_with_cp.get_world_corners(), [[2, 1, 0]]
+        )
+
+    def test_translate_does_not_search_control_points(self):
+
+        class ControlPoints(list):
+            def index(self, *args):
+                raise AssertionError("linear search in control points")
+
+        self.object_with_cp.corners = np.zeros((3, 3))
+        self.object_with_cp.create_control_points()
+        self.object_with_cp.control_points = ControlPoints(
+            self.object_with_cp.control_points
+        )
+
+        self.object_with_cp.translate(1, 0, 0)
+        for point in self.object_with_cp.control_points:
+            point.update_position()
+            np.testing.assert_array_almost_equal(point.get_position(), [1, 0, 0])
 
 
 if __name__ == "__main__":
@@ -15,6 +15,7 @@ from src.premitives import (
     ExtrudedPolygon,
 )
 from unittest.mock import patch, MagicMock, Mock
+from src.node import get_point_coord, scaling, node_from_dict
 import src.premitives
 
 
@@ -39,6 +40,24 @@ class TestSnowFigure(unittest.TestCase):
             np.allclose(self.snow_figure.child_nodes[2].scaling_matrix[0, 0], 0.7)
         )
 
+    def test_from_dict_skips_default_children(self):
+        data = SnowFigure().to_dict()
+        init = Sphere.__init__
+
+        # строятся только шары из файла, без трёх шаров по умолчанию
+        with patch.object(Sphere, "__init__", autospec=True, side_effect=init) as mock:
+            figure = node_from_dict(data)
+        self.assertEqual(mock.call_count, 3)
+        self.assertEqual(len(figure.child_nodes), 3)
+        np.testing.assert_array_equal(figure.aabb.bounds, [[0, 0, 0], [0.5, 1.1, 0.5]])
+
+        # в старых файлах детей нет, фигура строится целиком
+        del data["children"]
+        with patch.object(Sphere, "__init__", autospec=True, side_effect=init) as mock:
+            figure = node_from_dict(data)
+        self.assertEqual(mock.call_count, 3)
+        self.assertEqual(len(figure.child_nodes), 3)
+
 
 class TestActivePoint(unittest.TestCase):
 
@@ -298,6 +317,19 @@ class TestLine(unittest.TestCase):
         )
         np.testing.assert_array_almost_equal(self.line.scaling_matrix, np.identity(4))
 
+    def test_from_dict(self):
+        line = Line.from_dict(
+            {"type": "Line", "color_index": 3, "corners": [[0, 0, 0], [2, 0, 0]]}
+        )
+
+        self.assertEqual(line.color_index, 3)
+        np.testing.assert_array_almost_equal(line.get_position(), [1, 0, 0])
+        self.assertEqual(len(line.control_points), 2)
+        np.testing.assert_array_almost_equal(
+            line.control_points[1].get_position(), [2, 0, 0]
+        )
+        self.assertIsNotNone(line.aabb)
+
 
 class TestExtrudedPolygon(unittest.TestCase):
 
@@ -329,18 +361,61 @@ class TestExtrudedPolygon(unittest.TestCase):
             self.polygon.update_corners()
             self.assertTrue(mock_update_planes.called)
 
+    @patch("src.premitives.glIsEnabled")
+    @patch("src.premitives.glDisable")
+    @patch("src.premitives.glEnable")
     @patch("src.premitives.Plane.render_self")
     @patch("src.premitives.glColor3f")
     @patch("src.premitives.glBegin")
     @patch("src.premitives.glEnd")
     @patch("src.premitives.glVertex3fv")
-    def test_render_self(self, mock_glVertex3fv, mock_glEnd, mock_glBegin, _, __):
+    def test_render_self(
+        self, mock_glVertex3fv, mock_glEnd, mock_glBegin, _, mock_plane_render, *__
+    ):
         """Тест рендеринга многогранника."""
         self.polygon.render_self()
 
         self.assertTrue(mock_glBegin.called)
-        self.assertTrue(mock_glVertex3fv.called)
         self.assertTrue(mock_glEnd.called)
+        # 36 вершин граней и 24 вершины рёбер
+        self.assertEqual(mock_glVertex3fv.call_count, 60)
+        mock_plane_render.assert_not_called()
+
+    def test_face_vertices(self):
+        """Треугольники граней лежат в плоскостях многогранника."""
+        faces = self.polygon.get_face_vertices().reshape(6, 6, 3)
+        for face, plane in zip(faces, self.polygon.planes):
+            self.assertEqual(
+                {tuple(vertex) for vertex in np.round(face, 6)},
+                {tuple(corner) for corner in np.round(plane.corners, 6)},
+            )
+
+    def test_geometry_vertices(self):
+        """Рёбра из кеша углов совпадают с поточечным get_point_coord."""
+        self.polygon.scaling_matrix = scaling([2, 2, 2])
+        corners = [
+            get_point_coord(corner, self.polygon) for corner in self.polygon.corners
+        ]
+        expected = []
+        for i in range(4):
+            expected += [corners[i], corners[4 + i]]
+        nodes = [0, 2, 3, 1]
+        for k, i in enumerate(nodes):
+            j = nodes[(k + 1) % len(nodes)]
+            expected += [corners[i], corners[j], corners[4 + i], corners[4 + j]]
+
+        np.testing.assert_array_almost_equal(
+            self.polygon.get_geometry_vertices(), expected
+        )
+
+    def test_translate_moves_corners(self):
+        corners = np.array(self.polygon.corners, dtype=float)
+        self.polygon.translate(1, 0, 0)
+
+        np.testing.assert_array_almost_equal(self.polygon.corners, corners + [1, 0, 0])
+        np.testing.assert_array_almost_equal(
+            self.polygon.planes[-2].corners, corners[:4] + [1, 0, 0]
+        )
 
     def test_pick(self):
         """Тест проверки пересечения луча с многогранником."""
@@ -351,6 +426,15 @@ class TestExtrudedPolygon(unittest.TestCase):
         hit, distance = self.polygon.pick(start, direction, mat)
         self.assertTrue(hit)
 
+    def test_from_dict(self):
+        data = self.polygon.to_dict()
+        polygon = ExtrudedPolygon.from_dict(data)
+
+        np.testing.assert_array_almost_equal(polygon.corners, self.polygon.corners)
+        self.assertEqual(polygon.color_index, self.polygon.color_index)
+        self.assertEqual(len(polygon.control_points), 8)
+        self.assertEqual(len(polygon.planes), 6)
+
 
 class MockBasePlane:
     def __init__(self):
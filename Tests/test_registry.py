@@ -0,0 +1,87 @@
+import unittest
+
+from src.node import Node
+from src.premitives import Point, ActivePoint, Line, Plane
+from src.registry import NodeRegistry, SelectionIndex, key_to_color, color_to_key
+
+
+class TestNodeRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [Node() for _ in range(4)]
+        self.registry = NodeRegistry(self.nodes)
+
+    def test_keeps_insertion_order(self):
+        self.assertEqual(list(self.registry), self.nodes)
+        self.assertEqual(len(self.registry), 4)
+        self.assertIs(self.registry[2], self.nodes[2])
+        self.assertEqual(self.registry, self.nodes)
+
+    def test_remove(self):
+        self.registry.remove(self.nodes[1])
+
+        self.assertNotIn(self.nodes[1], self.registry)
+        self.assertEqual(list(self.registry), self.nodes[:1] + self.nodes[2:])
+        with self.assertRaises(ValueError):
+            self.registry.remove(self.nodes[1])
+
+        self.registry.discard(self.nodes[1])
+        self.assertEqual(len(self.registry), 3)
+
+    def test_keys_are_stable(self):
+        key = self.registry.key_of(self.nodes[3])
+        self.registry.remove(self.nodes[0])
+        new_node = Node()
+        new_key = self.registry.add(new_node)
+
+        self.assertEqual(self.registry.key_of(self.nodes[3]), key)
+        self.assertIs(self.registry.get(key), self.nodes[3])
+        self.assertNotEqual(new_key, key)
+        self.assertIs(self.registry[-1], new_node)
+
+    def test_key_colors(self):
+        for key in (0, 255, 256, 70000, 2**24 - 2):
+            color = key_to_color(key)
+            self.assertTrue(all(0 <= channel <= 255 for channel in color))
+            self.assertEqual(color_to_key(color), key)
+        self.assertIsNone(color_to_key((0, 0, 0)))
+
+    def test_add_twice(self):
+        key = self.registry.add(self.nodes[0])
+
+        self.assertEqual(key, self.registry.key_of(self.nodes[0]))
+        self.assertEqual(len(self.registry), 4)
+        self.assertIsNone(self.registry.key_of(Node()))
+
+
+class TestSelectionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.line = Line([0.0, 0.0, 0.0], [1.0, 0.0, 0.0])
+        self.point = Point()
+        self.active_point = ActivePoint(self.line, corner_index=0)
+        self.selection = SelectionIndex([self.active_point, self.line, self.point])
+
+    def test_buckets(self):
+        self.assertEqual(self.selection.count(Point), 2)
+        self.assertTrue(self.selection.has(Line))
+        self.assertFalse(self.selection.has(Plane))
+        self.assertFalse(self.selection.only(Point))
+        self.assertIs(self.selection.first(Point), self.active_point)
+        self.assertIsNone(self.selection.first(Plane))
+        self.assertEqual(self.selection.of_type(Point), [self.active_point, self.point])
+
+    def test_remove_and_clear(self):
+        self.selection.remove(self.line)
+
+        self.assertFalse(self.selection.has(Line))
+        self.assertTrue(self.selection.only(Point))
+        self.assertEqual(self.selection[:], [self.active_point, self.point])
+
+        self.selection.clear()
+        self.assertEqual(self.selection, [])
+        self.assertEqual(self.selection.count(Point), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,414 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+from OpenGL.raw.GL.VERSION.GL_1_0 import GL_TRIANGLE_STRIP, GL_LINES, GL_TRIANGLES
+
+from src import renderer
+from src.renderer import (
+    GeometryBuffer,
+    InstancedMesh,
+    PickBuffer,
+    init_renderer,
+    sphere_mesh,
+    cube_mesh,
+)
+from src.node import AABB
+from src.premitives import (
+    Plane,
+    Line,
+    Sphere,
+    Cube,
+    ExtrudedPolygon,
+    strip_triangles,
+)
+from src.scene import Scene
+
+
+class TestGeometryBuffer(unittest.TestCase):
+
+    @patch("src.renderer.vbo.VBO")
+    def test_update(self, mock_vbo):
+        buffer = GeometryBuffer(GL_LINES)
+        buffer.update([[0, 0, 0], [1, 1, 1]])
+
+        mock_vbo.assert_called_once()
+        uploaded = mock_vbo.call_args[0][0]
+        self.assertEqual(uploaded.dtype, np.float32)
+        self.assertEqual(buffer.count, 2)
+
+        buffer.update([[0, 0, 0], [1, 1, 1], [2, 2, 2], [3, 3, 3]])
+        mock_vbo.assert_called_once()
+        mock_vbo.return_value.set_array.assert_called_once()
+        self.assertEqual(buffer.count, 4)
+
+    @patch("src.renderer.glDisableClientState")
+    @patch("src.renderer.glEnableClientState")
+    @patch("src.renderer.glVertexPointer")
+    @patch("src.renderer.glDrawArrays")
+    @patch("src.renderer.vbo.VBO")
+    def test_draw(self, mock_vbo, mock_glDrawArrays, _, __, ___):
+        buffer = GeometryBuffer(GL_TRIANGLE_STRIP)
+        buffer.draw()
+        mock_glDrawArrays.assert_not_called()
+
+        buffer.update(np.zeros((4, 3)))
+        buffer.draw()
+
+        mock_vbo.return_value.bind.assert_called_once()
+        mock_glDrawArrays.assert_called_once_with(GL_TRIANGLE_STRIP, 0, 4)
+        mock_vbo.return_value.unbind.assert_called_once()
+
+    @patch("src.renderer.vbo.VBO")
+    def test_update_with_colors(self, mock_vbo):
+        buffer = GeometryBuffer(GL_LINES)
+        buffer.update([[0, 0, 0], [1, 1, 1]], [[1, 0, 0], [0, 1, 0]])
+
+        uploaded = mock_vbo.call_args[0][0]
+        self.assertEqual(uploaded.shape, (2, 6))
+        np.testing.assert_array_equal(uploaded[1], [1, 1, 1, 0, 1, 0])
+        self.assertTrue(buffer.has_colors)
+        self.assertEqual(buffer.count, 2)
+
+    @patch("src.renderer.glGenBuffers")
+    def test_init_renderer(self, mock_glGenBuffers):
+        try:
+            self.assertTrue(init_renderer())
+            self.assertTrue(renderer.vbo_enabled())
+        finally:
+            renderer.VBO_ENABLED = False
+            renderer.FRAMEBUFFERS_ENABLED = False
+
+
+@patch("src.renderer.VBO_ENABLED", True)
+class TestRetainedModePrimitives(unittest.TestCase):
+
+    @patch("src.premitives.glIsEnabled")
+    @patch("src.premitives.glDisable")
+    @patch("src.premitives.glEnable")
+    @patch("src.premitives.glVertex3fv")
+    @patch("src.node.GeometryBuffer")
+    def test_plane_uploads_only_after_corners_change(
+        self, mock_buffer, mock_glVertex3fv, _, __, ___
+    ):
+        plane = Plane()
+        plane.corners = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]])
+
+        plane.render_self()
+        plane.render_self()
+
+        mock_buffer.assert_called_once_with(GL_TRIANGLE_STRIP)
+        mock_buffer.return_value.update.assert_called_once()
+        self.assertEqual(mock_buffer.return_value.draw.call_count, 2)
+        mock_glVertex3fv.assert_not_called()
+
+        plane.translate(1, 0, 0)
+        plane.render_self()
+        mock_buffer.return_value.update.assert_called_once()
+
+        plane.corners = np.array([[0, 0, 1], [1, 0, 1], [0, 1, 1], [1, 1, 1]])
+        plane.render_self()
+        self.assertEqual(mock_buffer.return_value.update.call_count, 2)
+
+    @patch("src.premitives.glVertex3fv")
+    @patch("src.node.GeometryBuffer")
+    def test_line(self, mock_buffer, mock_glVertex3fv):
+        line = Line([0.0, 0.0, 0.0], [1.0, 1.0, 1.0])
+        line.render_self()
+
+        mock_buffer.assert_called_once_with(GL_LINES)
+        mock_buffer.return_value.draw.assert_called_once()
+        mock_glVertex3fv.assert_not_called()
+
+    @patch("src.node.glEnable")
+    @patch("src.node.glDisable")
+    @patch("src.node.glColor3f")
+    @patch("src.node.glVertex3fv")
+    @patch("src.node.GeometryBuffer")
+    def test_aabb(self, mock_buffer, mock_glVertex3fv, _, __, ___):
+        aabb = AABB([0.0, 0.0, 0.0], [1.0, 1.0, 1.0])
+        aabb.render()
+        aabb.render()
+
+        mock_buffer.assert_called_once_with(GL_LINES)
+        mock_buffer.return_value.update.assert_called_once()
+        uploaded = mock_buffer.return_value.update.call_args[0][0]
+        self.assertEqual(len(uploaded), 12)
+        mock_glVertex3fv.assert_not_called()
+
+        aabb.scale(2.0)
+        self.assertEqual(mock_buffer.return_value.update.call_count, 2)
+
+
+def outward_facing(vertices):
+    triangles = vertices.reshape(-1, 3, 3)
+    normals = np.cross(
+        triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]
+    )
+    return np.all(np.einsum("ij,ij->i", normals, triangles.mean(axis=1)) > 0)
+
+
+@patch("src.renderer.VBO_ENABLED", True)
+class TestRetainedModeExtrudedPolygon(unittest.TestCase):
+
+    @patch("src.premitives.glIsEnabled")
+    @patch("src.premitives.glDisable")
+    @patch("src.premitives.glEnable")
+    @patch("src.premitives.glColor3f")
+    @patch("src.premitives.glVertex3fv")
+    @patch("src.premitives.GeometryBuffer")
+    @patch("src.node.GeometryBuffer")
+    def test_buffers_rebuilt_only_on_change(
+        self, mock_edges, mock_faces, mock_glVertex3fv, *_
+    ):
+        base_plane = Plane()
+        base_plane.corners = np.array(
+            [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [1.0, 0.0, 1.0]]
+        )
+        polygon = ExtrudedPolygon(base_plane)
+
+        polygon.render_self()
+        polygon.render_self()
+
+        mock_faces.assert_called_once_with(GL_TRIANGLES)
+        mock_faces.return_value.update.assert_called_once()
+        self.assertEqual(len(mock_faces.return_value.update.call_args[0][0]), 36)
+        mock_edges.return_value.update.assert_called_once()
+        self.assertEqual(mock_faces.return_value.draw.call_count, 2)
+        mock_glVertex3fv.assert_not_called()
+
+        polygon.translate(1, 0, 0)
+        polygon.render_self()
+        self.assertEqual(mock_faces.return_value.update.call_count, 2)
+        self.assertEqual(mock_edges.return_value.update.call_count, 2)
+
+
+@patch("src.scene.glMaterialfv")
+@patch("src.scene.glEnable")
+@patch("src.scene.glDisable")
+@patch("src.scene.glIsEnabled", return_value=True)
+class TestSceneBatchedRender(unittest.TestCase):
+
+    def test_strip_triangles(self, *_):
+        self.assertEqual(strip_triangles(4), [0, 1, 2, 2, 1, 3])
+        self.assertEqual(strip_triangles(2), [])
+
+    @patch("src.scene.Scene.render_aabbs")
+    @patch("src.scene.renderer.draw_vertex_array")
+    def test_render_batches_by_mode(self, mock_draw, *_):
+        scene = Scene()
+        corners = np.array([[0, 0, 0], [1, 0, 0], [0, 0, 1], [1, 0, 1]], dtype=float)
+        planes = [Plane() for _ in range(3)]
+        for plane in planes:
+            plane.corners = corners.copy()
+            plane.render = MagicMock()
+        planes[1].translate(0, 2, 0)
+        planes[2].select()
+        line = Line([0.0, 0.0, 0.0], [1.0, 1.0, 1.0])
+        polygon = ExtrudedPolygon(planes[0])
+        for scene_node in planes + [line, polygon]:
+            scene.add_node(scene_node)
+
+        scene.render()
+
+        for plane in planes:
+            plane.render.assert_not_called()
+        draws = {
+            (call[0][0], len(call[0][1])): call for call in mock_draw.call_args_list
+        }
+        # две плоскости и грани многогранника, выделенная плоскость,
+        # линия и рёбра многогранника
+        self.assertEqual(
+            set(draws), {(GL_TRIANGLES, 48), (GL_TRIANGLES, 6), (GL_LINES, 26)}
+        )
+
+        _, vertices, colors = draws[(GL_TRIANGLES, 48)][0]
+        np.testing.assert_array_almost_equal(vertices[:6], corners[[0, 1, 2, 2, 1, 3]])
+        np.testing.assert_array_almost_equal(vertices[6], corners[0] + [0, 2, 0])
+        self.assertEqual(colors.shape, (48, 3))
+        _, _, colors = draws[(GL_LINES, 26)][0]
+        np.testing.assert_array_equal(colors[2:], np.ones((24, 3)))
+
+    @patch("src.scene.Scene.render_aabbs")
+    @patch("src.scene.renderer.draw_vertex_array")
+    def test_node_without_corners_renders_itself(self, mock_draw, *_):
+        scene = Scene()
+        plane = Plane()
+        plane.render = MagicMock()
+        scene.add_node(plane)
+
+        scene.render()
+
+        plane.render.assert_called_once_with(draw_aabb=False)
+        mock_draw.assert_not_called()
+
+    def test_batch_geometry_cached_until_change(self, *_):
+        plane = Plane()
+        plane.corners = np.array(
+            [[0, 0, 0], [1, 0, 0], [0, 0, 1], [1, 0, 1]], dtype=float
+        )
+
+        geometry = plane.get_batch_geometry()
+        self.assertIs(plane.get_batch_geometry(), geometry)
+
+        plane.translate(0, 1, 0)
+        moved = plane.get_batch_geometry()
+        self.assertIsNot(moved, geometry)
+        np.testing.assert_array_almost_equal(moved[0][1][0], [0, 1, 0])
+
+        plane.color_index = (plane.color_index + 1) % len(plane.colors)
+        self.assertIsNot(plane.get_batch_geometry(), moved)
+
+    @patch("src.scene.Scene.render_aabbs")
+    @patch("src.scene.renderer.vbo_enabled", return_value=True)
+    @patch("src.scene.GeometryBuffer")
+    def test_batch_buffers_uploaded_only_on_change(self, mock_buffer, *_):
+        scene = Scene()
+        corners = np.array([[0, 0, 0], [1, 0, 0], [0, 0, 1], [1, 0, 1]], dtype=float)
+        planes = [Plane() for _ in range(2)]
+        for plane in planes:
+            plane.corners = corners.copy()
+            scene.add_node(plane)
+        line = Line([0.0, 0.0, 0.0], [1.0, 1.0, 1.0])
+        scene.add_node(line)
+        update = mock_buffer.return_value.update
+
+        scene.render()
+        scene.render()
+
+        self.assertEqual(update.call_count, 2)  # треугольники и линии
+        self.assertEqual(mock_buffer.return_value.draw.call_count, 4)
+
+        planes[1].translate(0, 2, 0)
+        scene.render()
+
+        self.assertEqual(update.call_count, 3)
+        vertices, _ = update.call_args[0]
+        self.assertEqual(len(vertices), 12)
+        np.testing.assert_array_almost_equal(vertices[6], corners[0] + [0, 2, 0])
+
+        planes[0].select()
+        scene.render()
+
+        # плоскость перешла в группу выделенных, обе группы пересобраны
+        self.assertEqual(update.call_count, 5)
+
+
+class TestPickBuffer(unittest.TestCase):
+
+    @patch("src.renderer.glDeleteRenderbuffers")
+    @patch("src.renderer.glDeleteFramebuffers")
+    @patch("src.renderer.glFramebufferRenderbuffer")
+    @patch("src.renderer.glRenderbufferStorage")
+    @patch("src.renderer.glBindRenderbuffer")
+    @patch("src.renderer.glGenRenderbuffers", return_value=[2, 3])
+    @patch("src.renderer.glBindFramebuffer")
+    @patch("src.renderer.glGenFramebuffers", return_value=1)
+    def test_recreated_only_on_resize(
+        self, mock_glGenFramebuffers, mock_glBindFramebuffer, *mocks
+    ):
+        mock_glDeleteFramebuffers = mocks[-2]
+        buffer = PickBuffer()
+
+        buffer.bind(640, 480)
+        buffer.unbind()
+        buffer.bind(640, 480)
+        mock_glGenFramebuffers.assert_called_once()
+        mock_glBindFramebuffer.assert_called_with(renderer.GL_FRAMEBUFFER, 1)
+
+        buffer.bind(800, 600)
+        mock_glDeleteFramebuffers.assert_called_once()
+        self.assertEqual(mock_glGenFramebuffers.call_count, 2)
+        self.assertEqual(buffer.size, (800, 600))
+
+
+class TestInstancedMeshes(unittest.TestCase):
+
+    def test_sphere_mesh(self):
+        vertices, normals = sphere_mesh(0.5, 20, 20)
+        self.assertEqual(len(vertices) % 3, 0)
+        np.testing.assert_array_almost_equal(np.linalg.norm(vertices, axis=1), 0.5)
+        np.testing.assert_array_almost_equal(np.linalg.norm(normals, axis=1), 1.0)
+        self.assertTrue(outward_facing(vertices))
+
+    def test_cube_mesh(self):
+        vertices, normals = cube_mesh(1.0)
+        self.assertEqual(len(vertices), 36)
+        np.testing.assert_array_almost_equal(np.abs(vertices).max(axis=0), 0.5)
+        self.assertTrue(outward_facing(vertices))
+
+    def test_pack_instances(self):
+        matrix = np.identity(4)
+        matrix[:3, 3] = [1, 2, 3]
+        instances = InstancedMesh.pack_instances(
+            [matrix], np.array([[0.1, 0.2, 0.3]]), np.array([0.3])
+        )
+
+        self.assertEqual(instances.shape, (1, InstancedMesh.INSTANCE_SIZE))
+        # четвёртый столбец матрицы (сдвиг) идёт последним
+        np.testing.assert_array_almost_equal(instances[0, 12:16], [1, 2, 3, 1])
+        np.testing.assert_array_almost_equal(instances[0, 16:], [0.1, 0.2, 0.3, 0.3])
+
+
+class TestLevelOfDetail(unittest.TestCase):
+
+    @patch.dict(renderer.LOD_LEVELS)
+    def test_select_lod(self):
+        renderer.register_lod(1, [(0, 4), (60, 1), (20, 3)])
+        self.assertTrue(renderer.has_lod(1))
+        self.assertFalse(renderer.has_lod(2))
+
+        lists = renderer.select_lod(1, [100, 60, 59, 20, 5, 0])
+        self.assertEqual(list(lists), [1, 1, 3, 3, 4, 4])
+
+        self.assertEqual(list(renderer.select_lod(2, [100, 0])), [2, 2])
+
+    @patch("src.node.glCallList")
+    def test_primitive_draws_selected_level(self, mock_glCallList):
+        sphere = Sphere()
+        sphere.call_list = 1
+        sphere.lod_call_list = 3
+        sphere.render_self()
+        mock_glCallList.assert_called_once_with(3)
+
+
+@patch("src.renderer.INSTANCING_ENABLED", True)
+class TestSceneInstancedRender(unittest.TestCase):
+
+    def setUp(self):
+        self.meshes = {1: MagicMock(), 2: MagicMock()}
+        patcher = patch.dict(renderer.INSTANCED_MESHES, self.meshes)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("src.scene.Scene.render_aabbs")
+    @patch("src.scene.renderer.draw_instances")
+    def test_render_groups_by_call_list(self, mock_draw_instances, *_):
+        scene = Scene()
+        spheres = [Sphere() for _ in range(3)]
+        cubes = [Cube() for _ in range(2)]
+        for i, primitive in enumerate(spheres + cubes):
+            primitive.call_list = 1 if primitive in spheres else 2
+            primitive.translate(i, 0, 0)
+            scene.add_node(primitive)
+        spheres[1].select()
+
+        other = MagicMock()
+        scene.node_list.append(other)
+
+        scene.render()
+
+        other.render.assert_called_once()
+        self.assertEqual(mock_draw_instances.call_count, 2)
+
+        calls = {call[0][0]: call[0][1:] for call in mock_draw_instances.call_args_list}
+        matrices, colors, emissions = calls[1]
+        self.assertEqual(matrices.shape, (3, 4, 4))
+        np.testing.assert_array_almost_equal(matrices[2][:3, 3], [2, 0, 0])
+        np.testing.assert_array_almost_equal(emissions, [0.0, 0.3, 0.0])
+        self.assertEqual(colors.shape, (3, 3))
+        self.assertEqual(len(calls[2][0]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -25,6 +25,18 @@ class TestScene(unittest.TestCase):
 
         self.assertIn(mock_node, self.scene.node_list)
 
+    def test_node_list_assignment_resets_indexes(self):
+        nodes = [Sphere(), Cube()]
+        self.scene.add_node(nodes[0])
+        self.scene.get_bvh()
+
+        self.scene.node_list = nodes
+
+        self.assertEqual(list(self.scene.node_list), nodes)
+        self.assertIsNone(self.scene._bvh)
+        self.scene.remove_node(nodes[0])
+        self.assertEqual(list(self.scene.node_list), nodes[1:])
+
     def test_render(self):
 
         mock_node1 = MagicMock(spec=Node)
@@ -37,6 +49,69 @@ class TestScene(unittest.TestCase):
         mock_node1.render.assert_called_once()
         mock_node2.render.assert_called_once()
 
+    def test_get_aabb_lines(self):
+        cube = Cube()
+        cube.translate(1, 2, 3)
+        cube.scale(True)
+        sphere = Sphere()
+        plane = Plane()
+        for scene_node in (cube, sphere, plane):
+            self.scene.add_node(scene_node)
+
+        lines = self.scene.get_aabb_lines(self.scene.node_list)
+
+        self.assertEqual(lines.shape, (48, 3))
+        expected = cube.aabb.vertices[node.AABB_EDGES].reshape(-1, 3) + [1, 2, 3]
+        np.testing.assert_array_almost_equal(lines[:24], expected)
+
+    @patch("src.scene.glEnable")
+    @patch("src.scene.glDisable")
+    @patch("src.scene.glColor3f")
+    @patch("src.scene.renderer.draw_vertex_array")
+    def test_render_aabbs_in_one_call(self, mock_draw, *_):
+        cubes = [Cube() for _ in range(3)]
+        for cube in cubes:
+            self.scene.add_node(cube)
+        self.scene.select_nodes = [cubes[0]]
+
+        self.scene.render_aabbs()
+        mock_draw.assert_called_once()
+        self.assertEqual(len(mock_draw.call_args[0][1]), 72)
+
+        self.scene.render_aabbs(selected_only=True)
+        self.assertEqual(len(mock_draw.call_args[0][1]), 24)
+
+    @patch("src.scene.Scene.render_aabbs")
+    def test_render_skips_per_node_aabb(self, mock_render_aabbs):
+        mock_node = MagicMock(spec=Node)
+        self.scene.add_node(mock_node)
+
+        self.scene.render()
+        mock_node.render.assert_called_once_with(draw_aabb=False)
+        mock_render_aabbs.assert_called_once_with(False, self.scene.node_list)
+
+        self.scene.show_aabbs = False
+        self.scene.render()
+        mock_render_aabbs.assert_called_once()
+
+    @patch("src.scene.glColor3ub")
+    def test_render_ids(self, mock_glColor3ub):
+        nodes = [MagicMock(spec=Node) for _ in range(3)]
+        for scene_node in nodes:
+            self.scene.add_node(scene_node)
+        self.scene.remove_node(nodes[0])
+
+        self.scene.render_ids()
+
+        nodes[0].render_id.assert_not_called()
+        for scene_node in nodes[1:]:
+            scene_node.render_id.assert_called_once()
+            scene_node.render.assert_not_called()
+        colors = [call[0] for call in mock_glColor3ub.call_args_list]
+        self.assertEqual(len(set(colors)), 2)
+        self.assertIs(self.scene.get_node_by_color(colors[1]), nodes[2])
+        self.assertIsNone(self.scene.get_node_by_color((0, 0, 0)))
+
     def test_apply_for_each_select_nodes(self):
 
         mock_node1 = MagicMock(spec=Node)
@@ -59,6 +134,8 @@ class TestScene(unittest.TestCase):
 
         mock_node1.pick.return_value = (True, 5.0)
         mock_node2.pick.return_value = (True, 10.0)
+        mock_node1.get_pick_bounds.return_value = None
+        mock_node2.get_pick_bounds.return_value = None
 
         start = np.array([0, 0, 0])
         direction = np.array([1, 0, 0])
@@ -74,6 +151,48 @@ class TestScene(unittest.TestCase):
 
         self.scene.pick(start, direction, mat, multiple_choice=True)
 
+    def test_pick_batch(self):
+
+        cubes = [Cube(), Cube(), Cube()]
+        cubes[0].translate(0, 0, -5)
+        cubes[1].translate(0, 0, -2)
+        cubes[2].translate(3, 0, 0)
+        cubes[1].scale(up=True)
+        for cube in cubes:
+            self.scene.add_node(cube)
+
+        start = np.array([0.0, 0.0, 10.0])
+        direction = np.array([0.0, 0.0, -1.0])
+        mat = np.identity(4)
+
+        closest_node, distance = self.scene.pick_batch(start, direction, mat)
+
+        expected = [cube.pick(start, direction, mat) for cube in cubes]
+        self.assertIs(closest_node, cubes[1])
+        self.assertAlmostEqual(distance, expected[1][1])
+
+        closest_node, distance = self.scene.pick_batch(
+            np.array([10.0, 10.0, 10.0]), direction, mat
+        )
+        self.assertIsNone(closest_node)
+        self.assertIsNone(distance)
+
+    def test_pick_batch_custom_pick(self):
+
+        cube = Cube()
+        cube.translate(0, 0, -5)
+        mock_node = MagicMock(spec=Node)
+        mock_node.pick.return_value = (True, 1.0)
+        self.scene.add_node(cube)
+        self.scene.add_node(mock_node)
+
+        closest_node, distance = self.scene.pick_batch(
+            np.array([0.0, 0.0, 10.0]), np.array([0.0, 0.0, -1.0]), np.identity(4)
+        )
+
+        self.assertIs(closest_node, mock_node)
+        self.assertEqual(distance, 1.0)
+
     @patch("src.scene.Plane")
     def test_create_plane_from_three_points(self, mock_plane):
 
@@ -101,7 +220,9 @@ class TestScene(unittest.TestCase):
         mock_point = MagicMock(spec=Point)
 
         mock_line.corners = [MagicMock(), MagicMock()]
-        node.get_point_coord = MagicMock()
+        patcher = patch.object(node, "get_point_coord")
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
         self.scene.create_plane_from_line_and_point(mock_line, mock_point)
 
@@ -117,7 +238,9 @@ class TestScene(unittest.TestCase):
         mock_point = MagicMock(spec=Point)
 
         mock_plane.corners = [MagicMock(), MagicMock(), MagicMock()]
-        node.get_point_coord = MagicMock()
+        patcher = patch.object(node, "get_point_coord")
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
         self.scene.create_plane_from_plane_and_point(mock_plane, mock_point)
 
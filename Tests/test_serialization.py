@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import patch, mock_open, MagicMock, call
 import json
 import os
+import tempfile
 from datetime import datetime
 import numpy as np
 from OpenGL.raw.GL.VERSION.GL_1_0 import GL_UNSIGNED_BYTE, GL_RGB
@@ -14,9 +15,11 @@ from src.serialization import (
     NumpyArrayEncoder,
     load_data,
     export_scene_to_image,
+    stream_scene,
 )
+from src.node import get_point_coord
 from src.scene import Scene
-from src.premitives import Cube, Sphere
+from src.premitives import Cube, Sphere, ExtrudedPolygon
 
 
 class TestSerialization(unittest.TestCase):
@@ -91,6 +94,107 @@ class TestSerialization(unittest.TestCase):
 
         self.assertEqual(added_node.color_index, 2)
 
+    def test_load_data_with_plane(self):
+        scene_data = {
+            "nodes": [
+                {
+                    "type": "Plane",
+                    "color_index": 1,
+                    "position": [1, 0, 0],
+                    "corners": [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]],
+                }
+            ]
+        }
+
+        scene = load_data(scene_data)
+
+        plane = scene.node_list[-1]
+        self.assertEqual(len(plane.control_points), 4)
+        for point, corner in zip(plane.control_points, plane.corners):
+            np.testing.assert_array_almost_equal(
+                point.get_position(), get_point_coord(corner, plane)
+            )
+
+    def test_load_data_with_extruded_polygon(self):
+        corners = [[0, 0, 0], [1, 0, 0], [0, 0, 1], [1, 0, 1]]
+        corners += [[x, 1, z] for x, _, z in corners]
+        scene_data = {
+            "nodes": [
+                {"type": "ExtrudedPolygon", "color_index": 1, "corners": corners},
+                {"type": "Unknown"},
+            ]
+        }
+
+        scene = load_data(scene_data)
+
+        polygon = scene.node_list[-1]
+        self.assertIsInstance(polygon, ExtrudedPolygon)
+        np.testing.assert_array_almost_equal(polygon.corners, corners)
+        self.assertEqual(len(scene.node_list), 9)  # с контрольными точками
+
+    def test_load_data_with_group(self):
+        scene = Scene()
+        for position in ([0, 0, 0], [2, 0, 0]):
+            cube = Cube()
+            cube.translate(*position)
+            scene.add_node(cube)
+            scene.select_nodes.append(cube)
+        group = scene.combine()
+        group.scale(up=False)
+        scene_data = json.loads(
+            json.dumps({"nodes": [group.to_dict()]}, cls=NumpyArrayEncoder)
+        )
+
+        (loaded,) = load_data(scene_data).node_list
+
+        self.assertEqual([type(child) for child in loaded.child_nodes], [Cube, Cube])
+        np.testing.assert_array_almost_equal(
+            loaded.child_nodes[1].get_position(), [2, 0, 0]
+        )
+        np.testing.assert_array_almost_equal(loaded.aabb.bounds, group.aabb.bounds)
+        self.assertEqual(loaded.to_dict(), scene_data["nodes"][0])
+
+    def test_stream_scene(self):
+        scene_data = {
+            "nodes": [
+                {"type": "Cube", "color_index": 2, "position": [1, 1, 1]},
+                {
+                    "type": "Plane",
+                    "color_index": 1,
+                    "position": [0, 0, 0],
+                    "corners": [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]],
+                },
+                {"type": "Sphere", "color_index": 3, "position": [2, 0, 0]},
+            ]
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "scene.json"), "w") as file:
+                json.dump(scene_data, file, indent=4)
+            total_bytes = os.path.getsize(os.path.join(directory, "scene.json"))
+
+            progress = MagicMock()
+            scene = Scene()
+            with patch("src.serialization.SAVE_DIRECTORY", directory):
+                loading = stream_scene("scene.json", scene, progress)
+
+                # узел попадает в сцену сразу, до разбора остальных
+                self.assertIsInstance(next(loading), Cube)
+                self.assertEqual(len(scene.node_list), 1)
+                progress.assert_called_once_with(1, total_bytes, total_bytes)
+
+                nodes = list(loading)
+
+        self.assertEqual(len(nodes), 2)
+        self.assertIsInstance(nodes[1], Sphere)
+        # плоскость добавляется вместе с четырьмя контрольными точками
+        self.assertEqual(len(scene.node_list), 7)
+        self.assertEqual(progress.call_count, 3)
+        expected = load_data(scene_data)
+        self.assertEqual(
+            [type(node) for node in scene.node_list],
+            [type(node) for node in expected.node_list],
+        )
+
     @patch("src.serialization.glReadBuffer")
     @patch("os.path.exists")
     @patch("os.makedirs")
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image
+
+from src import serialization
+from src.frustum import perspective
+from src.premitives import Cube, Line
+from src.scene import Scene
+from src.software_renderer import (
+    BACKGROUND,
+    SoftwareRasterizer,
+    collect_geometry,
+    render_image,
+)
+
+BACKGROUND_PIXEL = list(np.round(np.array(BACKGROUND) * 255).astype(np.uint8))
+
+
+def front_camera():
+    """Камера в начале координат смотрит вдоль -z"""
+    return perspective(90, 1.0, 0.1, 100.0), np.identity(4)
+
+
+class TestSoftwareRasterizer(unittest.TestCase):
+
+    def setUp(self):
+        self.rasterizer = SoftwareRasterizer(40, 40, perspective(90, 1.0, 0.1, 100.0))
+
+    def test_depth_test(self):
+        far = np.array([[[-5, -5, -10], [5, -5, -10], [0, 5, -10]]], dtype=float)
+        near = far * 0.5
+
+        self.rasterizer.draw_triangles(near, np.array([[1.0, 0.0, 0.0]]))
+        self.rasterizer.draw_triangles(far, np.array([[0.0, 0.0, 1.0]]))
+
+        image = self.rasterizer.get_image()
+        np.testing.assert_array_equal(image[20, 20], [255, 0, 0])
+        np.testing.assert_array_equal(image[0, 0], BACKGROUND_PIXEL)
+
+    def test_clip_lines(self):
+        lines = np.array(
+            [
+                [[0, 0, -5], [0, 0, 5]],  # уходит за камеру
+                [[0, 0, 1], [0, 0, 5]],  # целиком сзади
+            ],
+            dtype=float,
+        )
+        clipped, keep = self.rasterizer.clip_lines(lines)
+
+        np.testing.assert_array_equal(keep, [True, False])
+        np.testing.assert_array_almost_equal(clipped[0, 0], [0, 0, -5])
+        self.assertLess(clipped[0, 1, 2], 0)
+
+
+class TestRenderImage(unittest.TestCase):
+
+    def test_collect_geometry(self):
+        cube = Cube()
+        cube.translate(1, 0, 0)
+        line = Line([0.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+
+        triangles, colors, lines, line_colors = collect_geometry([cube, line])
+
+        self.assertEqual(triangles.shape, (12, 3, 3))
+        self.assertAlmostEqual(triangles[..., 0].min(), 0.5)
+        self.assertEqual(colors.shape, (12, 3))
+        self.assertEqual(lines.shape, (1, 2, 3))
+        self.assertEqual(line_colors.shape, (1, 3))
+
+    def test_render_image(self):
+        scene = Scene()
+        self.assertTrue(
+            np.all(
+                render_image(scene, 32, 24, front_camera(), False) == BACKGROUND_PIXEL
+            )
+        )
+
+        cube = Cube()
+        cube.translate(0, 0, -3)
+        scene.add_node(cube)
+        image = render_image(scene, 32, 24, front_camera(), False)
+
+        self.assertEqual(image.shape, (24, 32, 3))
+        self.assertEqual(image.dtype, np.uint8)
+        self.assertFalse(np.array_equal(image[12, 16], BACKGROUND_PIXEL))
+        np.testing.assert_array_equal(image[0, 0], BACKGROUND_PIXEL)
+
+    def test_default_camera_sees_scene(self):
+        scene = Scene()
+        scene.add_node(Cube())
+        image = render_image(scene, 64, 48)
+        self.assertGreater(np.any(image != BACKGROUND_PIXEL, axis=-1).sum(), 0)
+
+    @patch("src.serialization.load_scene")
+    def test_render_scene_to_image(self, mock_load_scene):
+        scene = Scene()
+        scene.add_node(Cube())
+        mock_load_scene.return_value = scene
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scene.png")
+            serialization.render_scene_to_image("scene.json", path, 16, 12)
+
+            mock_load_scene.assert_called_once_with("scene.json")
+            with Image.open(path) as image:
+                self.assertEqual(image.size, (16, 12))
+
+
+if __name__ == "__main__":
+    unittest.main()
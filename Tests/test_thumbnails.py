@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src import thumbnails
+
+
+class TestThumbnails(unittest.TestCase):
+
+    def setUp(self):
+        self.scenes = tempfile.TemporaryDirectory()
+        self.output = tempfile.TemporaryDirectory()
+        self.addCleanup(self.scenes.cleanup)
+        self.addCleanup(self.output.cleanup)
+        for name in ("scene_1.json", "scene_2.json", "other.json"):
+            self.write_scene(name, [])
+
+        patcher = patch("src.thumbnails.serialization.SAVE_DIRECTORY", self.scenes.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_scene(self, name, nodes):
+        with open(os.path.join(self.scenes.name, name), "w") as file:
+            json.dump({"nodes": nodes}, file)
+
+    def generate(self, pattern="*.json", **kwargs):
+        with patch("src.thumbnails.render_thumbnail", side_effect=lambda t: t[0]):
+            paths, failed = thumbnails.generate_thumbnails(
+                pattern, self.output.name, 32, 24, workers=1, **kwargs
+            )
+        self.assertEqual(failed, {})
+        return paths
+
+    def touch_thumbnails(self, paths):
+        for path in paths:
+            open(path, "w").close()
+
+    def test_pattern(self):
+        self.assertEqual(
+            thumbnails.find_scenes("scene_*"), ["scene_1.json", "scene_2.json"]
+        )
+        paths = self.generate("scene_*")
+        self.assertEqual(
+            [os.path.basename(path) for path in paths],
+            ["scene_1.json.png", "scene_2.json.png"],
+        )
+
+    def test_skips_unchanged_scenes(self):
+        self.touch_thumbnails(self.generate())
+
+        self.assertEqual(self.generate(), [])
+
+        self.write_scene("scene_2.json", [{"type": "Cube"}])
+        paths = self.generate()
+        self.assertEqual(
+            [os.path.basename(path) for path in paths], ["scene_2.json.png"]
+        )
+
+        self.assertEqual(len(self.generate(force=True)), 3)
+
+    def test_size_change_rerenders(self):
+        self.touch_thumbnails(self.generate())
+        with patch("src.thumbnails.render_thumbnail", side_effect=lambda t: t[0]):
+            paths, _ = thumbnails.generate_thumbnails(
+                "*.json", self.output.name, 64, 48, workers=1
+            )
+        self.assertEqual(len(paths), 3)
+
+    def test_extension_in_thumbnail_name(self):
+        self.assertNotEqual(
+            thumbnails.get_thumbnail_path(self.output.name, "scene_1.json"),
+            thumbnails.get_thumbnail_path(self.output.name, "scene_1.s3d"),
+        )
+
+    def test_failed_scene_does_not_lose_others(self):
+        def render(task):
+            if task[0] == "scene_2.json":
+                raise ValueError("broken scene")
+            return task[0]
+
+        with patch("src.thumbnails.render_thumbnail", side_effect=render):
+            paths, failed = thumbnails.generate_thumbnails(
+                "*.json", self.output.name, 32, 24, workers=1
+            )
+
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(list(failed), ["scene_2.json"])
+        self.assertIsInstance(failed["scene_2.json"], ValueError)
+        manifest = thumbnails.load_manifest(self.output.name)
+        self.assertEqual(set(manifest), {"other.json", "scene_1.json"})
+
+        # в следующий раз рисуется только не получившаяся сцена
+        self.touch_thumbnails(paths)
+        self.assertEqual(
+            [os.path.basename(path) for path in self.generate()], ["scene_2.json.png"]
+        )
+
+    def test_failed_scene_in_worker_process(self):
+        with open(os.path.join(self.scenes.name, "scene_2.json"), "w") as file:
+            file.write("{not json")
+
+        paths, failed = thumbnails.generate_thumbnails(
+            "scene_*", self.output.name, 16, 12, workers=2
+        )
+
+        self.assertEqual(
+            [os.path.basename(path) for path in paths], ["scene_1.json.png"]
+        )
+        self.assertTrue(os.path.exists(paths[0]))
+        self.assertEqual(list(failed), ["scene_2.json"])
+        self.assertEqual(
+            list(thumbnails.load_manifest(self.output.name)), ["scene_1.json"]
+        )
+
+    def test_render_thumbnail(self):
+        path = os.path.join(self.output.name, "scene_1.png")
+        with patch("builtins.print"):
+            filename = thumbnails.render_thumbnail(("scene_1.json", path, 16, 12))
+
+        self.assertEqual(filename, "scene_1.json")
+        self.assertTrue(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
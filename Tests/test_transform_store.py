@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src import serialization
+from src.node import Node, translation
+from src.premitives import Cube, Sphere
+from src.scene import Scene
+from src.transform_store import TransformStore
+
+
+class TestTransformStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TransformStore(capacity=2)
+
+    def test_attach_moves_matrices(self):
+        node = Node()
+        node.translate(1, 2, 3)
+        index = self.store.attach(node)
+
+        np.testing.assert_array_almost_equal(
+            self.store.translations[index], translation([1, 2, 3])
+        )
+        node.translate(1, 0, 0)
+        np.testing.assert_array_almost_equal(
+            self.store.translations[index], translation([2, 2, 3])
+        )
+        np.testing.assert_array_almost_equal(node.get_position(), [2, 2, 3])
+
+    def test_detach_restores_own_matrices(self):
+        node = Node()
+        self.store.attach(node)
+        node.translate(1, 2, 3)
+        self.store.detach(node)
+
+        self.assertIsNone(node._transform_store)
+        self.assertEqual(len(self.store), 0)
+        np.testing.assert_array_almost_equal(node.get_position(), [1, 2, 3])
+
+    def test_grow(self):
+        nodes = [Node() for _ in range(5)]
+        for i, node in enumerate(nodes):
+            node.translate(i, 0, 0)
+            self.store.attach(node)
+
+        self.assertGreaterEqual(self.store.capacity, 5)
+        for i, node in enumerate(nodes):
+            np.testing.assert_array_almost_equal(node.get_position(), [i, 0, 0])
+
+    def test_bulk_translate_matches_node_translate(self):
+        nodes = [Node() for _ in range(3)]
+        expected = [Node() for _ in range(3)]
+        for i, (node, other) in enumerate(zip(nodes, expected)):
+            node.translate(i, 1, 2)
+            other.translate(i, 1, 2)
+            self.store.attach(node)
+
+        self.store.translate(self.store.indices_of(nodes), [0.5, -1, 3])
+        for node, other in zip(nodes, expected):
+            other.translate(0.5, -1, 3)
+            np.testing.assert_array_almost_equal(
+                node.translation_matrix, other.translation_matrix, decimal=5
+            )
+
+    def test_model_matrices(self):
+        node = Node()
+        node.translate(1, 0, 0)
+        node.scale(up=True)
+        index = self.store.attach(node)
+
+        np.testing.assert_array_almost_equal(
+            self.store.model_matrices([index])[0],
+            node.translation_matrix @ node.scaling_matrix,
+        )
+
+
+class TestSceneTransformStore(unittest.TestCase):
+
+    def test_enable_attaches_nodes(self):
+        scene = Scene()
+        cube = Cube()
+        scene.add_node(cube)
+        store = scene.enable_transform_store()
+
+        sphere = Sphere()
+        scene.add_node(sphere)
+
+        self.assertIs(cube._transform_store, store)
+        self.assertIs(sphere._transform_store, store)
+
+        scene.remove_node(cube)
+        self.assertIsNone(cube._transform_store)
+
+    def test_translate_nodes_and_pick(self):
+        scene = Scene()
+        cubes = [Cube() for _ in range(4)]
+        for cube in cubes:
+            scene.add_node(cube)
+        scene.enable_transform_store()
+
+        scene.translate_nodes(cubes[:2], 3, 0, 0)
+        np.testing.assert_array_almost_equal(cubes[0].get_position(), [3, 0, 0])
+        np.testing.assert_array_almost_equal(cubes[2].get_position(), [0, 0, 0])
+
+        closest_node, _ = scene.pick_batch(
+            np.array([3.0, 0.0, 10.0]), np.array([0.0, 0.0, -1.0]), np.identity(4)
+        )
+        self.assertIn(closest_node, cubes[:2])
+
+        closest_node, _ = scene.pick_batch(
+            np.array([0.0, 0.0, 10.0]), np.array([0.0, 0.0, -1.0]), np.identity(4)
+        )
+        self.assertIn(closest_node, cubes[2:])
+
+    def test_save_scene(self):
+        scene = Scene()
+        cube = Cube()
+        scene.add_node(cube)
+        scene.enable_transform_store()
+        scene.translate_nodes([cube], 1, 2, 3)
+        cube.scale(up=True)
+
+        directory = tempfile.TemporaryDirectory(dir=os.getcwd())
+        self.addCleanup(directory.cleanup)
+        with patch(
+            "src.serialization.SAVE_DIRECTORY", os.path.relpath(directory.name)
+        ), patch("builtins.print"):
+            serialization.save_scene(scene)
+            (filename,) = os.listdir(directory.name)
+            loaded = serialization.load_scene(filename)
+
+        (loaded_cube,) = loaded.node_list
+        np.testing.assert_array_almost_equal(loaded_cube.get_position(), [1, 2, 3])
+        np.testing.assert_array_almost_equal(
+            loaded_cube.scaling_matrix, cube.scaling_matrix
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -21,17 +21,28 @@ from OpenGL.raw.GL.VERSION.GL_1_0 import (
     GL_LINES,
 )
 from OpenGL.raw.GL._types import GLfloat_4, GLfloat_3
-from OpenGL.raw.GLUT import GLUT_WINDOW_WIDTH, GLUT_WINDOW_HEIGHT, GLUT_MIDDLE_BUTTON
+from OpenGL.raw.GLUT import (
+    GLUT_WINDOW_WIDTH,
+    GLUT_WINDOW_HEIGHT,
+    GLUT_MIDDLE_BUTTON,
+    GLUT_SINGLE,
+    GLUT_RGB,
+    GLUT_DEPTH,
+)
 
-from viewer import Viewer, WINDOW_WIDTH, WINDOW_HEIGHT
+from src.frustum import perspective
+from src.node import translation
+from viewer import Viewer, WINDOW_WIDTH, WINDOW_HEIGHT, STREAM_SIZE, AUTOSAVE_MS
 
 
 class TestViewer(unittest.TestCase):
 
     @patch.object(Viewer, "_init_interface")
     @patch.object(Viewer, "init_opengl")
+    @patch("viewer.init_renderer")
     @patch("viewer.init_primitives")
     @patch.object(Viewer, "init_grid")
+    @patch.object(Viewer, "init_autosave")
     @patch.object(Viewer, "init_scene")
     @patch.object(Viewer, "init_interaction")
     @patch.object(Viewer, "create_menu")
@@ -40,8 +51,10 @@ class TestViewer(unittest.TestCase):
         mock_create_menu,
         mock_init_interaction,
         mock_init_scene,
+        mock_init_autosave,
         mock_init_grid,
         mock_init_primitives,
+        mock_init_renderer,
         mock_init_opengl,
         mock_init_interface,
     ):
@@ -51,6 +64,7 @@ class TestViewer(unittest.TestCase):
         self.mock_init_scene = mock_init_scene
         self.mock_init_grid = mock_init_grid
         self.mock_init_primitives = mock_init_primitives
+        self.mock_init_renderer = mock_init_renderer
         self.mock_init_opengl = mock_init_opengl
         self.mock_init_interface = mock_init_interface
 
@@ -59,6 +73,7 @@ class TestViewer(unittest.TestCase):
     def test_init_calls(self):
         self.mock_init_interface.assert_called_once()
         self.mock_init_primitives.assert_called_once()
+        self.mock_init_renderer.assert_called_once()
         self.mock_init_grid.assert_called_once()
         self.mock_init_scene.assert_called_once()
         self.mock_init_interaction.assert_called_once()
@@ -84,7 +99,9 @@ class TestViewer(unittest.TestCase):
         mock_glutInit.assert_called_once()
         mock_glutInitWindowSize.assert_called_once_with(640, 480)
         mock_glutInitWindowPosition.assert_called_once_with(50, 50)
-        mock_glutInitDisplayMode.assert_called_once()
+        mock_glutInitDisplayMode.assert_called_once_with(
+            GLUT_SINGLE | GLUT_RGB | GLUT_DEPTH
+        )
         mock_glutCreateWindow.assert_called_once_with(self.viewer.render)
         mock_glutDisplayFunc.assert_called_once_with("3D Editor")
 
@@ -187,6 +204,113 @@ class TestViewer(unittest.TestCase):
         self.viewer.load_scene()
         mock_load_scene.assert_called_once_with("Demonstration_scene.json")
 
+    @patch("viewer.serialization.load_scene")
+    def test_init_scene_recovers_autosave(self, mock_load_scene):
+        self.viewer.journal = MagicMock()
+        self.viewer.journal.exists.return_value = True
+
+        self.viewer.init_scene()
+
+        mock_load_scene.assert_not_called()
+        self.assertIs(self.viewer.scene, self.viewer.journal.recover.return_value)
+        self.viewer.journal.attach.assert_called_once_with(self.viewer.scene)
+
+    @patch("viewer.serialization.load_scene")
+    def test_init_scene_after_clean_shutdown(self, mock_load_scene):
+        journal = MagicMock()
+        self.viewer.journal = journal
+
+        self.viewer.shutdown()
+        journal.close.assert_called_once()
+        self.assertIsNone(self.viewer.journal)
+
+        journal.exists.return_value = False
+        self.viewer.journal = journal
+        self.viewer.init_scene()
+        journal.recover.assert_not_called()
+        mock_load_scene.assert_called_once_with("Demonstration_scene.json")
+
+    @patch("viewer.atexit.register")
+    @patch("viewer.glutCloseFunc")
+    @patch("viewer.glutTimerFunc")
+    @patch("viewer.serialization.get_autosave_directory", return_value="autosave")
+    def test_init_autosave(
+        self, _, mock_glutTimerFunc, mock_glutCloseFunc, mock_atexit_register
+    ):
+        self.viewer.init_autosave()
+
+        self.assertEqual(self.viewer.journal.directory, "autosave")
+        mock_glutTimerFunc.assert_called_once_with(AUTOSAVE_MS, self.viewer.autosave, 0)
+        mock_glutCloseFunc.assert_called_once_with(self.viewer.shutdown)
+        mock_atexit_register.assert_called_once_with(self.viewer.exit_handler)
+
+    def test_exit_handler(self):
+        journal = MagicMock()
+        self.viewer.journal = journal
+
+        # после сбоя автосохранение остаётся для восстановления
+        with patch("viewer.sys.last_value", ValueError(), create=True):
+            self.viewer.exit_handler()
+        journal.close.assert_not_called()
+
+        with patch("viewer.sys", spec=[]):
+            self.viewer.exit_handler()
+        journal.close.assert_called_once()
+        self.assertIsNone(self.viewer.journal)
+
+    @patch("viewer.glutTimerFunc")
+    def test_autosave(self, mock_glutTimerFunc):
+        self.viewer.journal = MagicMock()
+
+        self.viewer.autosave()
+        self.viewer.journal.flush.assert_called_once()
+        mock_glutTimerFunc.assert_called_once_with(AUTOSAVE_MS, self.viewer.autosave, 0)
+
+        # пока сцена грузится по частям, журнал не пишется
+        self.viewer.loading = MagicMock()
+        self.viewer.autosave()
+        self.viewer.journal.flush.assert_called_once()
+
+    @patch("viewer.serialization.get_scene_size", return_value=STREAM_SIZE + 1)
+    @patch("viewer.serialization.load_scene")
+    @patch.object(Viewer, "stream_scene")
+    def test_load_large_scene_streams(self, mock_stream_scene, mock_load_scene, _):
+        self.viewer.load_scene("big.json")
+        mock_stream_scene.assert_called_once_with("big.json")
+        mock_load_scene.assert_not_called()
+
+    @patch("viewer.glutPostRedisplay")
+    @patch("viewer.glutSetWindowTitle")
+    @patch("viewer.glutIdleFunc")
+    @patch("viewer.serialization.stream_scene")
+    def test_stream_scene(
+        self, mock_stream_scene, mock_glutIdleFunc, mock_glutSetWindowTitle, _
+    ):
+        loaded = []
+
+        def stream(filename, scene, progress):
+            for count in range(1, 4):
+                loaded.append(count)
+                progress(count, count * 10, 30)
+                yield count
+
+        mock_stream_scene.side_effect = stream
+        self.viewer.stream_scene("big.json")
+
+        self.assertEqual(len(self.viewer.scene.node_list), 0)
+        mock_glutIdleFunc.assert_called_once_with(self.viewer.load_step)
+
+        with patch("viewer.LOAD_STEP_SECONDS", 0):
+            self.viewer.load_step()
+        self.assertEqual(loaded, [1])
+        mock_glutSetWindowTitle.assert_called_with("3D Editor - loading 33% (1 nodes)")
+
+        self.viewer.load_step()
+        self.assertEqual(loaded, [1, 2, 3])
+        self.assertIsNone(self.viewer.loading)
+        mock_glutIdleFunc.assert_called_with(None)
+        mock_glutSetWindowTitle.assert_called_with("3D Editor")
+
     @patch("viewer.glutMainLoop")
     def test_main_loop(self, mock_glutMainLoop):
         self.viewer.main_loop()
@@ -285,6 +409,10 @@ class TestViewer(unittest.TestCase):
         mock_glViewport.assert_called_once_with(0, 0, 800, 600)
         mock_gluPerspective.assert_called_once_with(70, 800 / 600, 0.1, 1000.0)
         mock_glTranslated.assert_called_once_with(0, 0, -15)
+        np.testing.assert_array_almost_equal(
+            self.viewer.projection,
+            perspective(70, 800 / 600, 0.1, 1000.0) @ translation([0, 0, -15]),
+        )
 
     @patch.object(Viewer, "init_view")
     @patch("viewer.glMatrixMode")
@@ -321,6 +449,92 @@ class TestViewer(unittest.TestCase):
 
         self.viewer.scene.pick.assert_called_once()
 
+    @patch.object(
+        Viewer, "get_ray", return_value=(np.zeros(3), np.array([0.0, 0.0, -1.0]))
+    )
+    @patch("viewer.glutGet", return_value=600)
+    def test_box_select(self, _, get_ray):
+        self.viewer.scene = MagicMock()
+        self.viewer.projection = perspective(90, 1.0, 0.1, 100.0)
+        self.viewer.modelView = np.identity(4)
+
+        self.viewer.box_select(100, 100, 100, 300)
+        self.viewer.scene.select_in_region.assert_not_called()
+
+        self.viewer.box_select(0, 0, 300, 600, True)
+        frustum, multiple_choice = self.viewer.scene.select_in_region.call_args[0]
+        self.assertTrue(multiple_choice)
+        self.assertTrue(frustum.boxes_inside([[-2, -1, -5]], [[-1, 1, -4]])[0])
+        self.assertFalse(frustum.boxes_inside([[1, -1, -5]], [[2, 1, -4]])[0])
+        get_ray.assert_called_once_with(150, 300)
+        kwargs = self.viewer.scene.select_in_region.call_args[1]
+        np.testing.assert_array_equal(kwargs["start"], np.zeros(3))
+        np.testing.assert_array_equal(kwargs["direction"], [0.0, 0.0, -1.0])
+        self.assertIs(kwargs["mat"], self.viewer.modelView)
+
+    @patch("viewer.gluUnProject", return_value=(1.0, 2.0, 7.0))
+    @patch.object(
+        Viewer,
+        "get_ray",
+        return_value=(np.array([1.0, 2.0, 3.0]), np.array([0.0, 0.0, 1.0])),
+    )
+    @patch.object(Viewer, "pick_color")
+    def test_pick_color_mode(self, mock_pick_color, _, __):
+        self.viewer.scene = MagicMock()
+        picked = MagicMock()
+        mock_pick_color.return_value = (picked, 0.5)
+
+        self.viewer.toggle_pick_mode()
+        self.viewer.pick(100, 200, True)
+
+        self.viewer.scene.pick.assert_not_called()
+        node, distance, *_, multiple_choice = self.viewer.scene.select_picked.call_args[
+            0
+        ]
+        self.assertIs(node, picked)
+        self.assertAlmostEqual(distance, 4.0)
+        self.assertTrue(multiple_choice)
+
+    @patch("viewer.renderer.FRAMEBUFFERS_ENABLED", True)
+    @patch("viewer.glutGet", return_value=600)
+    @patch("viewer.glReadPixels")
+    @patch("viewer.glScissor")
+    @patch("viewer.glClearColor")
+    @patch("viewer.glClear")
+    @patch("viewer.glEnable")
+    @patch("viewer.glDisable")
+    @patch("viewer.glPopMatrix")
+    @patch.object(Viewer, "apply_camera")
+    @patch.object(Viewer, "init_view")
+    def test_pick_color(
+        self,
+        _,
+        __,
+        ___,
+        ____,
+        _____,
+        ______,
+        _______,
+        mock_glScissor,
+        mock_glReadPixels,
+        ________,
+    ):
+        self.viewer.scene = MagicMock()
+        self.viewer.pick_buffer = MagicMock()
+        mock_glReadPixels.side_effect = [bytes([0, 1, 2]), np.array([[0.25]])]
+
+        node, depth = self.viewer.pick_color(10, 20)
+
+        mock_glScissor.assert_called_once_with(10, 20, 1, 1)
+        self.viewer.pick_buffer.bind.assert_called_once_with(600, 600)
+        self.viewer.pick_buffer.unbind.assert_called_once()
+        self.viewer.scene.render_ids.assert_called_once()
+        np.testing.assert_array_equal(
+            self.viewer.scene.get_node_by_color.call_args[0][0], [0, 1, 2]
+        )
+        self.assertIs(node, self.viewer.scene.get_node_by_color.return_value)
+        self.assertEqual(depth, 0.25)
+
     @patch.object(
         Viewer,
         "get_ray",
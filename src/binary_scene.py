@@ -0,0 +1,263 @@
+import numpy as np
+
+from src.node import NODE_CLASSES
+
+BINARY_EXTENSION = ".s3d"
+MAGIC = b"S3DSCENE"
+VERSION = 3
+
+# с третьей версии файл сам хранит имена своих типов (NODE_CLASSES),
+# код типа в таблице узлов - номер имени; старые файлы писались этими кодами
+LEGACY_NODE_TYPES = (
+    "Cube",
+    "Sphere",
+    "SnowFigure",
+    "Line",
+    "Point",
+    "Plane",
+    "ExtrudedPolygon",
+    "HierarchicalNode",
+)
+TYPE_COUNT_DTYPE = np.dtype("<u4")
+TYPE_NAME_DTYPE = np.dtype("S64")
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("node_count", "<u4"),
+        ("corner_count", "<u8"),
+    ]
+)
+
+# parent - индекс родителя в таблице (-1 у узлов сцены), дети идут после него;
+# углы узла - срез corner_start:corner_start + corner_count общего массива
+NODE_FIELDS = [
+    ("type", "u1"),
+    ("parent", "<i4"),
+    ("color_index", "<i4"),
+    ("corner_start", "<u8"),
+    ("corner_count", "<u4"),
+    ("position", "<f8", (3,)),
+]
+NODE_DTYPE = np.dtype(NODE_FIELDS + [("scaling", "<f8", (3,))])
+
+# таблица узлов по версии файла, в первой версии масштаба не было
+NODE_DTYPES = {1: np.dtype(NODE_FIELDS), 2: NODE_DTYPE, VERSION: NODE_DTYPE}
+
+CORNER_DTYPE = np.dtype("<f8")
+
+
+def flatten_nodes(nodes, parent=-1, table=None):
+    """Словари узлов (как из to_dict) в плоский список (parent, словарь),
+    дети сразу после родителя"""
+    if table is None:
+        table = []
+    for node_data in nodes:
+        index = len(table)
+        table.append((parent, node_data))
+        flatten_nodes(node_data.get("children", []), index, table)
+    return table
+
+
+def pack_scene_data(scene_data):
+    """Таблица узлов NODE_DTYPE, массив углов (K, 3) и имена типов для записи"""
+    table = flatten_nodes(scene_data["nodes"])
+    type_names = sorted({node_data["type"] for _, node_data in table})
+    for node_type in type_names:
+        if node_type not in NODE_CLASSES:
+            raise ValueError(f"unknown node type: {node_type}")
+    type_codes = {name: code for code, name in enumerate(type_names)}
+
+    types, color_indexes, positions, corner_counts, corner_arrays = [], [], [], [], []
+    scalings = []
+    for _, node_data in table:
+        types.append(type_codes[node_data["type"]])
+        color_indexes.append(node_data.get("color_index", 0))
+        positions.append(node_data.get("position", [0, 0, 0]))
+        scalings.append(node_data.get("scaling", [1, 1, 1]))
+        corners = node_data.get("corners")
+        if corners is None:
+            corner_counts.append(0)
+        else:
+            corners = np.asarray(corners, dtype=CORNER_DTYPE).reshape(-1, 3)
+            corner_counts.append(len(corners))
+            corner_arrays.append(corners)
+
+    nodes = np.zeros(len(table), dtype=NODE_DTYPE)
+    nodes["type"] = types
+    nodes["parent"] = [parent for parent, _ in table]
+    nodes["color_index"] = color_indexes
+    nodes["position"] = np.asarray(positions, dtype=float).reshape(-1, 3)
+    nodes["scaling"] = np.asarray(scalings, dtype=float).reshape(-1, 3)
+    nodes["corner_count"] = corner_counts
+    nodes["corner_start"] = np.cumsum(corner_counts) - corner_counts
+
+    if corner_arrays:
+        corners = np.concatenate(corner_arrays)
+    else:
+        corners = np.empty((0, 3), dtype=CORNER_DTYPE)
+    return nodes, corners, type_names
+
+
+def write_scene_data(scene_data, path):
+    """Пишет сцену: заголовок, имена типов, таблица узлов,
+    углы одним массивом float64"""
+    nodes, corners, type_names = pack_scene_data(scene_data)
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["node_count"] = len(nodes)
+    header["corner_count"] = len(corners)
+    with open(path, "wb") as file:
+        file.write(header.tobytes())
+        file.write(np.array([len(type_names)], dtype=TYPE_COUNT_DTYPE).tobytes())
+        file.write(np.array(type_names, dtype=TYPE_NAME_DTYPE).tobytes())
+        file.write(nodes.tobytes())
+        file.write(np.ascontiguousarray(corners, dtype=CORNER_DTYPE).tobytes())
+
+
+def map_scene_file(path):
+    """Отображает файл в память без чтения:
+    (таблица узлов, углы (K, 3), имена типов по кодам)"""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) == 0 or header["magic"][0] != MAGIC:
+        raise ValueError(f"{path} is not a binary scene file")
+    version = int(header["version"][0])
+    node_dtype = NODE_DTYPES.get(version)
+    if node_dtype is None:
+        raise ValueError(f"unsupported scene version: {version}")
+
+    node_count = int(header["node_count"][0])
+    corner_count = int(header["corner_count"][0])
+    offset = HEADER_DTYPE.itemsize
+    type_names = LEGACY_NODE_TYPES
+    if version >= 3:
+        type_count = int(
+            np.fromfile(path, dtype=TYPE_COUNT_DTYPE, count=1, offset=offset)[0]
+        )
+        offset += TYPE_COUNT_DTYPE.itemsize
+        names = np.fromfile(
+            path, dtype=TYPE_NAME_DTYPE, count=type_count, offset=offset
+        )
+        type_names = tuple(name.decode() for name in names.tolist())
+        offset += TYPE_NAME_DTYPE.itemsize * type_count
+
+    nodes = np.empty(0, dtype=node_dtype)
+    corners = np.empty((0, 3), dtype=CORNER_DTYPE)
+    # memmap не умеет отображать пустой срез
+    if node_count:
+        nodes = np.memmap(
+            path, dtype=node_dtype, mode="r", offset=offset, shape=(node_count,)
+        )
+    offset += node_dtype.itemsize * node_count
+    if corner_count:
+        corners = np.memmap(
+            path, dtype=CORNER_DTYPE, mode="r", offset=offset, shape=(corner_count, 3)
+        )
+    return nodes, corners, type_names
+
+
+def split_corners(nodes, corners):
+    """Углы каждого узла срезами общего массива, один проход по файлу"""
+    return np.split(
+        np.asarray(corners), np.asarray(nodes["corner_start"])[1:].astype(np.intp)
+    )
+
+
+def build_matrices(nodes):
+    """Матрицы переноса и масштаба (N, 4, 4) для всей таблицы сразу,
+    масштаба нет (None) в файлах первой версии"""
+    translations = np.tile(np.identity(4), (len(nodes), 1, 1))
+    translations[:, :3, 3] = nodes["position"]
+    if "scaling" not in nodes.dtype.names:
+        return translations, None
+    scalings = np.tile(np.identity(4), (len(nodes), 1, 1))
+    diagonal = np.arange(3)
+    scalings[:, diagonal, diagonal] = nodes["scaling"]
+    return translations, scalings
+
+
+def build_scene_nodes(nodes, corners, type_names):
+    """Узлы сцены прямо из таблицы, без словарей узлов. Незнакомый тип
+    пропускается вместе с поддеревом, как в node_from_dict"""
+    translations, scalings = build_matrices(nodes)
+    node_classes = [NODE_CLASSES.get(name) for name in type_names]
+    types = nodes["type"].tolist()
+    parents = nodes["parent"].tolist()
+    color_indexes = nodes["color_index"].tolist()
+    corner_counts = nodes["corner_count"].tolist()
+    parent_indexes = np.asarray(nodes["parent"])
+    has_children = (
+        np.bincount(parent_indexes[parent_indexes >= 0], minlength=len(nodes)) > 0
+    ).tolist()
+    node_corners = split_corners(nodes, corners)
+
+    built = [None] * len(nodes)
+    roots = []
+    loaded = []  # составные узлы, родители раньше детей
+    for i, code in enumerate(types):
+        node_class = node_classes[code]
+        parent = parents[i]
+        if node_class is None or (parent >= 0 and built[parent] is None):
+            continue
+        node = node_class.from_state(
+            color_index=color_indexes[i],
+            translation_matrix=translations[i],
+            scaling_matrix=None if scalings is None else scalings[i],
+            corners=node_corners[i] if corner_counts[i] else None,
+            has_children=has_children[i],
+        )
+        built[i] = node
+        if parent < 0:
+            roots.append(node)
+        else:
+            built[parent].add_child(node)
+        if has_children[i]:
+            loaded.append(node)
+
+    # рамки составных узлов считаются по уже собранным детям
+    for node in reversed(loaded):
+        node.on_children_loaded()
+    return roots
+
+
+def read_scene_nodes(path):
+    return build_scene_nodes(*map_scene_file(path))
+
+
+def unpack_scene_data(nodes, corners, type_names):
+    """Обратно в словари узлов, как в json (для проверки и перевода файлов)"""
+    node_dicts = []
+    roots = []
+    types = nodes["type"].tolist()
+    parents = nodes["parent"].tolist()
+    color_indexes = nodes["color_index"].tolist()
+    positions = nodes["position"].tolist()
+    if "scaling" in nodes.dtype.names:
+        scalings = nodes["scaling"].tolist()
+    else:
+        scalings = [[1.0, 1.0, 1.0]] * len(nodes)
+    corner_counts = nodes["corner_count"].tolist()
+    node_corners = split_corners(nodes, corners)
+    for i, node_type in enumerate(type_names[code] for code in types):
+        node_data = {
+            "type": node_type,
+            "position": positions[i],
+            "scaling": scalings[i],
+            "color_index": color_indexes[i],
+        }
+        if corner_counts[i]:
+            node_data["corners"] = node_corners[i]
+        if node_type == "HierarchicalNode":
+            node_data["children"] = []
+        node_dicts.append(node_data)
+        if parents[i] < 0:
+            roots.append(node_data)
+        else:
+            node_dicts[parents[i]].setdefault("children", []).append(node_data)
+    return {"nodes": roots}
+
+
+def read_scene_data(path):
+    return unpack_scene_data(*map_scene_file(path))
@@ -0,0 +1,232 @@
+import numpy as np
+
+from src.node import ray_box_intersection
+from src.frustum import OUTSIDE, INSIDE
+
+
+class BVHNode:
+    """Узел иерархии ограничивающих объёмов"""
+
+    __slots__ = ("min_point", "max_point", "left", "right", "parent", "item")
+
+    def __init__(self, min_point, max_point, item=None):
+        self.min_point = min_point
+        self.max_point = max_point
+        self.left = None
+        self.right = None
+        self.parent = None
+        self.item = item
+
+    def is_leaf(self):
+        return self.item is not None
+
+    def refit(self):
+        """Пересчитывает границы внутреннего узла по детям"""
+        self.min_point = np.minimum(self.left.min_point, self.right.min_point)
+        self.max_point = np.maximum(self.left.max_point, self.right.max_point)
+
+
+def surface_area(min_point, max_point):
+    extents = max_point - min_point
+    return extents[0] * extents[1] + extents[1] * extents[2] + extents[2] * extents[0]
+
+
+class BVH:
+    """Иерархия AABB для отсечения узлов сцены перед точной проверкой.
+    bounds_func(item) возвращает (min_point, max_point) в мировой ск или None,
+    если объект ничем не ограничен, такие объекты проверяются всегда"""
+
+    def __init__(self, items, bounds_func):
+        self.bounds_func = bounds_func
+        self.root = None
+        self.leaves = dict()  # id(item) -> лист
+        self.unbounded = dict()  # id(item) -> item
+
+        bounded = []
+        for item in items:
+            bounds = self._get_bounds(item)
+            if bounds is None:
+                self.unbounded[id(item)] = item
+            else:
+                bounded.append(BVHNode(bounds[0], bounds[1], item))
+
+        for leaf in bounded:
+            self.leaves[id(leaf.item)] = leaf
+        if bounded:
+            self.root = self._build(bounded)
+
+    def __len__(self):
+        return len(self.leaves) + len(self.unbounded)
+
+    def __contains__(self, item):
+        return id(item) in self.leaves or id(item) in self.unbounded
+
+    def _get_bounds(self, item):
+        bounds = self.bounds_func(item)
+        if bounds is None:
+            return None
+        return np.array(bounds[0], dtype=float), np.array(bounds[1], dtype=float)
+
+    def _build(self, leaves):
+        """Строит дерево сверху вниз, деля листья по медиане вдоль самой длинной оси"""
+        if len(leaves) == 1:
+            return leaves[0]
+
+        centers = np.array([leaf.min_point + leaf.max_point for leaf in leaves])
+        axis = np.argmax(centers.max(axis=0) - centers.min(axis=0))
+        order = np.argsort(centers[:, axis], kind="stable")
+        middle = len(leaves) // 2
+
+        node = BVHNode(None, None)
+        node.left = self._build([leaves[i] for i in order[:middle]])
+        node.right = self._build([leaves[i] for i in order[middle:]])
+        node.left.parent = node
+        node.right.parent = node
+        node.refit()
+        return node
+
+    def insert(self, item):
+        """Добавляет объект, спускаясь к соседу с наименьшим ростом площади"""
+        bounds = self._get_bounds(item)
+        if bounds is None:
+            self.unbounded[id(item)] = item
+            return
+
+        leaf = BVHNode(bounds[0], bounds[1], item)
+        self.leaves[id(item)] = leaf
+        if self.root is None:
+            self.root = leaf
+            return
+
+        sibling = self.root
+        while not sibling.is_leaf():
+            left, right = sibling.left, sibling.right
+            left_cost = surface_area(
+                np.minimum(left.min_point, leaf.min_point),
+                np.maximum(left.max_point, leaf.max_point),
+            ) - surface_area(left.min_point, left.max_point)
+            right_cost = surface_area(
+                np.minimum(right.min_point, leaf.min_point),
+                np.maximum(right.max_point, leaf.max_point),
+            ) - surface_area(right.min_point, right.max_point)
+            sibling = left if left_cost <= right_cost else right
+
+        old_parent = sibling.parent
+        new_parent = BVHNode(None, None)
+        new_parent.parent = old_parent
+        new_parent.left = sibling
+        new_parent.right = leaf
+        sibling.parent = new_parent
+        leaf.parent = new_parent
+
+        if old_parent is None:
+            self.root = new_parent
+        elif old_parent.left is sibling:
+            old_parent.left = new_parent
+        else:
+            old_parent.right = new_parent
+
+        self._refit_upwards(new_parent)
+
+    def remove(self, item):
+        """Убирает объект, заменяя его родителя соседним поддеревом"""
+        if self.unbounded.pop(id(item), None) is not None:
+            return
+
+        leaf = self.leaves.pop(id(item), None)
+        if leaf is None:
+            return
+
+        parent = leaf.parent
+        if parent is None:
+            self.root = None
+            return
+
+        sibling = parent.right if parent.left is leaf else parent.left
+        grandparent = parent.parent
+        sibling.parent = grandparent
+        if grandparent is None:
+            self.root = sibling
+            return
+
+        if grandparent.left is parent:
+            grandparent.left = sibling
+        else:
+            grandparent.right = sibling
+        self._refit_upwards(grandparent)
+
+    def refit(self, item):
+        """Обновляет границы объекта после перемещения или масштабирования"""
+        leaf = self.leaves.get(id(item))
+        if leaf is None:
+            if id(item) in self.unbounded:
+                # объект мог снова стать ограниченным
+                self.remove(item)
+                self.insert(item)
+            return
+
+        bounds = self._get_bounds(item)
+        if bounds is None:
+            self.remove(item)
+            self.unbounded[id(item)] = item
+            return
+
+        leaf.min_point, leaf.max_point = bounds
+        self._refit_upwards(leaf.parent)
+
+    def _refit_upwards(self, node):
+        while node is not None:
+            old_min, old_max = node.min_point, node.max_point
+            node.refit()
+            if (
+                old_min is not None
+                and np.array_equal(old_min, node.min_point)
+                and np.array_equal(old_max, node.max_point)
+            ):
+                break
+            node = node.parent
+
+    def query_ray(self, origin, direction):
+        """Возвращает объекты, чьи границы пересекает луч, и все неограниченные"""
+        candidates = list(self.unbounded.values())
+        if self.root is None:
+            return candidates
+
+        origin = np.asarray(origin, dtype=float)
+        direction = np.asarray(direction, dtype=float)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            hit, _ = ray_box_intersection(
+                origin, direction, node.min_point, node.max_point
+            )
+            if not hit:
+                continue
+            if node.is_leaf():
+                candidates.append(node.item)
+            else:
+                stack.append(node.left)
+                stack.append(node.right)
+        return candidates
+
+    def query_frustum(self, frustum):
+        """Возвращает объекты, чьи границы хотя бы частично в пирамиде видимости,
+        и все неограниченные. Поддеревья целиком внутри не проверяются"""
+        visible = list(self.unbounded.values())
+        if self.root is None:
+            return visible
+
+        stack = [(self.root, False)]
+        while stack:
+            node, inside = stack.pop()
+            if not inside:
+                result = frustum.classify_box(node.min_point, node.max_point)
+                if result == OUTSIDE:
+                    continue
+                inside = result == INSIDE
+            if node.is_leaf():
+                visible.append(node.item)
+            else:
+                stack.append((node.right, inside))
+                stack.append((node.left, inside))
+        return visible
@@ -0,0 +1,23 @@
+class DamageTracker:
+    """Флаг устаревшего кадра. Узлы и камера отмечают изменения,
+    а окно перерисовывается, только если что-то поменялось"""
+
+    def __init__(self):
+        self.dirty = True  # первый кадр рисуется всегда
+
+    def mark(self):
+        self.dirty = True
+
+    def is_dirty(self):
+        return self.dirty
+
+    def clear(self):
+        self.dirty = False
+
+
+# общий трекер приложения, окно одно
+tracker = DamageTracker()
+
+
+def mark_dirty():
+    tracker.mark()
@@ -0,0 +1,108 @@
+import numpy as np
+
+# результат проверки коробки
+OUTSIDE = 0
+INTERSECTS = 1
+INSIDE = 2
+
+
+def perspective(fovy, aspect, near, far):
+    """Та же матрица, что строит gluPerspective (для умножения слева на столбец)"""
+    f = 1.0 / np.tan(np.radians(fovy) / 2)
+    matrix = np.zeros((4, 4))
+    matrix[0, 0] = f / aspect
+    matrix[1, 1] = f
+    matrix[2, 2] = (far + near) / (near - far)
+    matrix[2, 3] = 2 * far * near / (near - far)
+    matrix[3, 2] = -1
+    return matrix
+
+
+def pick_matrix(x0, y0, x1, y1, width, height):
+    """Та же матрица, что строит gluPickMatrix: растягивает прямоугольник окна
+    (в пикселях, начало внизу слева) на всё окно. Умножается слева на проекцию"""
+    region_width = abs(x1 - x0)
+    region_height = abs(y1 - y0)
+    center_x = (x0 + x1) / 2
+    center_y = (y0 + y1) / 2
+    matrix = np.identity(4)
+    matrix[0, 0] = width / region_width
+    matrix[1, 1] = height / region_height
+    matrix[0, 3] = (width - 2 * center_x) / region_width
+    matrix[1, 3] = (height - 2 * center_y) / region_height
+    return matrix
+
+
+class Frustum:
+    """Пирамида видимости камеры: шесть плоскостей (a, b, c, d) в мировой ск,
+    точка внутри, если a*x + b*y + c*z + d >= 0 для всех плоскостей"""
+
+    def __init__(self, planes, matrix=None, viewport_height=None):
+        self.planes = np.asarray(planes, dtype=float)
+        self.normals = self.planes[:, :3]
+        self.offsets = self.planes[:, 3]
+        self.positive = self.normals >= 0
+        # для оценки размера объектов на экране
+        self.matrix = matrix
+        self.viewport_height = viewport_height
+
+    @classmethod
+    def from_matrix(cls, matrix, viewport_height=None):
+        """Плоскости из матрицы projection @ modelview (метод Gribb-Hartmann)"""
+        matrix = np.asarray(matrix, dtype=float)
+        planes = np.array(
+            [
+                matrix[3] + matrix[0],  # левая
+                matrix[3] - matrix[0],  # правая
+                matrix[3] + matrix[1],  # нижняя
+                matrix[3] - matrix[1],  # верхняя
+                matrix[3] + matrix[2],  # ближняя
+                matrix[3] - matrix[2],  # дальняя
+            ]
+        )
+        planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+        return cls(planes, matrix, viewport_height)
+
+    def classify_box(self, min_point, max_point):
+        """OUTSIDE, INTERSECTS или INSIDE для одной коробки"""
+        # самый дальний по нормали угол коробки и самый ближний
+        far_corners = np.where(self.positive, max_point, min_point)
+        near_corners = np.where(self.positive, min_point, max_point)
+        if np.any(np.einsum("ij,ij->i", self.normals, far_corners) + self.offsets < 0):
+            return OUTSIDE
+        if np.all(
+            np.einsum("ij,ij->i", self.normals, near_corners) + self.offsets >= 0
+        ):
+            return INSIDE
+        return INTERSECTS
+
+    def boxes_visible(self, min_points, max_points):
+        """Маска коробок (N, 3), хотя бы частично попадающих в пирамиду"""
+        min_points = np.asarray(min_points, dtype=float)
+        max_points = np.asarray(max_points, dtype=float)
+        far_corners = np.where(
+            self.positive[None], max_points[:, None], min_points[:, None]
+        )
+        distances = np.einsum("pj,npj->np", self.normals, far_corners) + self.offsets
+        return np.all(distances >= 0, axis=1)
+
+    def boxes_inside(self, min_points, max_points):
+        """Маска коробок (N, 3), целиком лежащих в пирамиде"""
+        min_points = np.asarray(min_points, dtype=float).reshape(-1, 3)
+        max_points = np.asarray(max_points, dtype=float).reshape(-1, 3)
+        near_corners = np.where(
+            self.positive[None], min_points[:, None], max_points[:, None]
+        )
+        distances = np.einsum("pj,npj->np", self.normals, near_corners) + self.offsets
+        return np.all(distances >= 0, axis=1)
+
+    def projected_sizes(self, centers, radii):
+        """Примерный диаметр сфер на экране в пикселях, None без размера окна"""
+        if self.matrix is None or self.viewport_height is None:
+            return None
+        centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+        # w в отсечённых координатах - расстояние до камеры вдоль взгляда
+        w = centers @ self.matrix[3, :3] + self.matrix[3, 3]
+        focal = np.linalg.norm(self.matrix[1, :3])
+        w = np.maximum(w, 1e-6)
+        return np.asarray(radii) * focal / w * self.viewport_height
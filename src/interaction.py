@@ -18,12 +18,15 @@ from OpenGL.raw.GLUT import (
     GLUT_LEFT_BUTTON,
     glutGetModifiers,
     GLUT_ACTIVE_CTRL,
+    GLUT_ACTIVE_SHIFT,
     GLUT_KEY_UP,
     GLUT_KEY_DOWN,
     GLUT_KEY_LEFT,
     GLUT_KEY_RIGHT,
 )
 
+from src import damage
+
 
 class Interaction(object):
     def __init__(self):
@@ -31,6 +34,8 @@ class Interaction(object):
         self.translation = [0, 0, 0, 0]  # позиция камеры
         self.trackball = Trackball(theta=-25, distance=15)
         self.mouse_loc = None
+        self.box_start = None  # угол рамки выделения (Shift + левая кнопка)
+        self.box_multiple = False
         self.callbacks = defaultdict(list)
         self.register()
 
@@ -54,6 +59,12 @@ class Interaction(object):
         self.translation[0] += x
         self.translation[1] += y
         self.translation[2] += z
+        damage.mark_dirty()
+
+    def post_redisplay(self):
+        """Просит перерисовку, только если сцена или камера изменились"""
+        if damage.tracker.is_dirty():
+            glutPostRedisplay()
 
     def handle_mouse_button(self, button, mode, x, y):
         xSize, ySize = glutGet(GLUT_WINDOW_WIDTH), glutGet(GLUT_WINDOW_HEIGHT)
@@ -68,7 +79,12 @@ class Interaction(object):
                 # self.trigger('create_menu')
                 pass
             elif button == GLUT_LEFT_BUTTON:  # pick
-                if glutGetModifiers() & GLUT_ACTIVE_CTRL:
+                modifiers = glutGetModifiers()
+                if modifiers & GLUT_ACTIVE_SHIFT:
+                    # выделение рамкой, узлы выбираются при отпускании
+                    self.box_start = (x, y)
+                    self.box_multiple = bool(modifiers & GLUT_ACTIVE_CTRL)
+                elif modifiers & GLUT_ACTIVE_CTRL:
                     self.trigger(
                         "multiple_choice", x, y
                     )  # для выделения нескольких объектов
@@ -79,26 +95,30 @@ class Interaction(object):
                 self.translate(0, 0, 1.0)
             elif button == 4:  # scroll down
                 self.translate(0, 0, -1.0)
-        else:  # GLUT_UP, не обрабатываем
+        else:  # GLUT_UP
+            if self.box_start is not None:
+                self.trigger("box_select", *self.box_start, x, y, self.box_multiple)
+                self.box_start = None
             self.pressed = None
-        glutPostRedisplay()  # обновляем окно
+        self.post_redisplay()  # обновляем окно, если что-то изменилось
 
     def handle_mouse_move(self, x, screen_y):
+        if self.pressed is None:
+            return  # без нажатой кнопки движение ничего не меняет
         xSize, ySize = glutGet(GLUT_WINDOW_WIDTH), glutGet(GLUT_WINDOW_HEIGHT)
         y = ySize - screen_y  # получаем координату для GL
-        if self.pressed is not None:
-            dx = x - self.mouse_loc[0]
-            dy = y - self.mouse_loc[1]
-            if self.pressed == GLUT_RIGHT_BUTTON and self.trackball is not None:
-                # при нажатии правой кнопки мыши камера вращается
-                self.trackball.drag_to(self.mouse_loc[0], self.mouse_loc[1], dx, dy)
-            elif self.pressed == GLUT_LEFT_BUTTON:
-                self.trigger("move", x, y)
-            elif self.pressed == GLUT_MIDDLE_BUTTON:
-                self.translate(dx / 60.0, dy / 60.0, 0)
-            else:
-                pass
-            glutPostRedisplay()
+        dx = x - self.mouse_loc[0]
+        dy = y - self.mouse_loc[1]
+        if self.pressed == GLUT_RIGHT_BUTTON and self.trackball is not None:
+            # при нажатии правой кнопки мыши камера вращается
+            self.trackball.drag_to(self.mouse_loc[0], self.mouse_loc[1], dx, dy)
+        elif self.pressed == GLUT_LEFT_BUTTON and self.box_start is None:
+            self.trigger("move", x, y)
+        elif self.pressed == GLUT_MIDDLE_BUTTON:
+            self.translate(dx / 60.0, dy / 60.0, 0)
+        else:
+            pass
+        self.post_redisplay()
         self.mouse_loc = (x, y)
 
     def handle_keystroke(self, key, x, screen_y):
@@ -122,7 +142,9 @@ class Interaction(object):
             self.trigger("dissection")
         elif key == b"q":
             self.trigger("extrude")
-        glutPostRedisplay()
+        elif key == b"g":
+            self.trigger("toggle_pick_mode")
+        self.post_redisplay()
 
     def handle_special_keystroke(self, key, x, screen_y):
         xSize, ySize = glutGet(GLUT_WINDOW_WIDTH), glutGet(GLUT_WINDOW_HEIGHT)
@@ -135,7 +157,7 @@ class Interaction(object):
             self.trigger("rotate_color", forward=True)
         elif key == GLUT_KEY_RIGHT:
             self.trigger("rotate_color", forward=False)
-        glutPostRedisplay()
+        self.post_redisplay()
 
 
 class Trackball:
@@ -167,6 +189,7 @@ class Trackball:
         self.matrix[1, 2] = -sin_phi
         self.matrix[2, 1] = sin_phi
         self.matrix[2, 2] *= cos_phi
+        damage.mark_dirty()
 
     def drag_to(self, start_x, start_y, delta_x, delta_y):
         self.theta += delta_x * 0.2
@@ -0,0 +1,171 @@
+import json
+import os
+
+from src.premitives import ActivePoint
+from src.serialization import NumpyArrayEncoder, load_data
+
+SNAPSHOT_EXTENSION = ".json"
+JOURNAL_EXTENSION = ".journal"
+# журнал сжимается в снимок, когда записей в нём не меньше, чем узлов в сцене,
+# так что полная запись сцены приходится на столько же мелких изменений
+COMPACT_MIN_ENTRIES = 1000
+
+
+class SceneJournal:
+    """Автосохранение сцены: снимок плюс журнал изменений, который только
+    дописывается. Сцена сообщает о добавленных, изменённых и удалённых узлах,
+    flush дописывает в журнал лишь их, а при восстановлении журнал
+    проигрывается поверх снимка.
+
+    Снимок и журнал помечены номером поколения: журнал, оставшийся от
+    прошлого снимка (сбой посреди сжатия), при восстановлении не читается.
+    При штатном выходе close удаляет оба файла, поэтому их наличие значит,
+    что прошлый сеанс оборвался"""
+
+    def __init__(self, directory, name="autosave", compact_min_entries=None):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, name + SNAPSHOT_EXTENSION)
+        self.journal_path = os.path.join(directory, name + JOURNAL_EXTENSION)
+        self.compact_min_entries = compact_min_entries or COMPACT_MIN_ENTRIES
+        self.scene = None
+        self.generation = 0
+        self.entry_count = 0  # записей в журнале после снимка
+        self.ids = dict()  # id(узла) -> номер узла в журнале
+        self.next_id = 0
+        # номер -> (операция, узел): между сбросами изменения одного узла
+        # сливаются, а его состояние сериализуется один раз в flush
+        self.pending = dict()
+
+    def exists(self):
+        return os.path.exists(self.snapshot_path)
+
+    def close(self):
+        """Штатное завершение: восстанавливать нечего, журнал отцепляется
+        от сцены, а снимок и журнал удаляются"""
+        if self.scene is not None and self.scene.journal is self:
+            self.scene.journal = None
+        self.scene = None
+        self.pending.clear()
+        for path in (self.snapshot_path, self.journal_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def attach(self, scene):
+        """Ведёт журнал для сцены, начиная с её полного снимка"""
+        if self.scene is not None and self.scene.journal is self:
+            self.scene.journal = None
+        self.scene = scene
+        scene.journal = self
+        self.compact()
+
+    def node_added(self, node):
+        if isinstance(node, ActivePoint):
+            return  # точки-контроллеры восстанавливаются вместе с объектом
+        node_id = self.next_id
+        self.next_id += 1
+        self.ids[id(node)] = node_id
+        self.pending[node_id] = ("add", node)
+
+    def node_changed(self, node):
+        if isinstance(node, ActivePoint):
+            node = node.parent_object  # точка двигает углы своего объекта
+        node_id = self.ids.get(id(node))
+        if node_id is None or node_id in self.pending:
+            return  # узла нет в сцене или он и так будет записан
+        self.pending[node_id] = ("update", node)
+
+    def node_removed(self, node):
+        node_id = self.ids.pop(id(node), None)
+        if node_id is None:
+            return
+        operation, _ = self.pending.pop(node_id, (None, None))
+        if operation != "add":
+            # добавленный после прошлого сброса узел в журнал не попадает вовсе
+            self.pending[node_id] = ("remove", None)
+
+    def flush(self):
+        """Дописывает накопленные изменения в журнал, при необходимости
+        сжимает журнал в снимок. Возвращает число записанных записей"""
+        if not self.pending:
+            return 0
+        lines = []
+        for node_id, (operation, node) in self.pending.items():
+            entry = {"op": operation, "id": node_id}
+            if node is not None:
+                entry["node"] = node.to_dict()
+            lines.append(json.dumps(entry, cls=NumpyArrayEncoder) + "\n")
+        self.pending.clear()
+
+        with open(self.journal_path, "a") as file:
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        self.entry_count += len(lines)
+
+        if self.entry_count >= max(self.compact_min_entries, len(self.ids)):
+            self.compact()
+        return len(lines)
+
+    def compact(self):
+        """Записывает полный снимок сцены и начинает пустой журнал"""
+        os.makedirs(self.directory, exist_ok=True)
+        nodes = [
+            scene_node
+            for scene_node in self.scene.node_list
+            if not isinstance(scene_node, ActivePoint)
+        ]
+        self.generation += 1
+        scene_data = {
+            "generation": self.generation,
+            "nodes": [scene_node.to_dict() for scene_node in nodes],
+        }
+        # снимок подменяется целиком, чтобы сбой не оставил его недописанным
+        temporary_path = self.snapshot_path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(scene_data, file, cls=NumpyArrayEncoder)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.snapshot_path)
+
+        with open(self.journal_path, "w") as file:
+            file.write(json.dumps({"generation": self.generation}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+        # номера узлов в журнале - их места в снимке
+        self.ids = {id(scene_node): i for i, scene_node in enumerate(nodes)}
+        self.next_id = len(nodes)
+        self.pending.clear()
+        self.entry_count = 0
+
+    def read_scene_data(self):
+        """Снимок с проигранным поверх журналом, в виде для load_data"""
+        with open(self.snapshot_path, "r") as file:
+            snapshot = json.load(file)
+        self.generation = snapshot.get("generation", 0)
+        states = dict(enumerate(snapshot["nodes"]))
+
+        try:
+            with open(self.journal_path, "r") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            lines = []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break  # строка оборвана сбоем во время записи
+        if entries and entries[0].get("generation") == self.generation:
+            for entry in entries[1:]:
+                if entry["op"] == "remove":
+                    states.pop(entry["id"], None)
+                else:
+                    states[entry["id"]] = entry["node"]
+        return {"nodes": list(states.values())}
+
+    def recover(self):
+        """Сцена на момент последнего сброса журнала"""
+        return load_data(self.read_scene_data())
@@ -0,0 +1,130 @@
+import codecs
+import json
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\n\r"
+NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JSONStreamReader:
+    """Разбор JSON из двоичного файла по кускам.
+    В памяти только непрочитанный хвост текущего куска и очередное значение,
+    поэтому большой массив можно обойти поэлементно, не читая файл целиком"""
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0  # начало неразобранной части buffer
+        self.bytes_read = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        """Дочитывает кусок в буфер, False если файл уже кончился"""
+        if self.eof:
+            return False
+        chunk = self.file.read(size or self.chunk_size)
+        self.bytes_read += len(chunk)
+        self.eof = not chunk
+        # разобранное начало выбрасываем только здесь, а не после каждого значения
+        self.buffer = self.buffer[self.position :] + self.text_decoder.decode(
+            chunk, final=self.eof
+        )
+        self.position = 0
+        return True
+
+    def peek(self):
+        """Следующий значимый символ без сдвига, "" в конце файла"""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(
+                f"expected {char!r}, got {found!r} near byte {self.bytes_read}"
+            )
+        self.position += 1
+
+    def read_value(self):
+        """Очередное значение JSON целиком"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # значение не поместилось в буфер: дочитываем всё большими
+                # кусками, чтобы длинный узел не разбирался заново много раз
+                if self._fill(size):
+                    size *= 2
+                    continue
+                raise
+            # число на границе куска могло оборваться (в том числе на "1.5e")
+            if self._may_continue(value, end) and self._fill(size):
+                continue
+            self.position = end
+            return value
+
+    def _may_continue(self, value, end):
+        """Значение кончается на границе буфера и могло оборваться:
+        число вроде "12" или "1.5e" продолжится в следующем куске"""
+        if isinstance(value, (int, float)):
+            while end < len(self.buffer) and self.buffer[end] in NUMBER_CHARS:
+                end += 1
+        return end == len(self.buffer)
+
+    def iter_array(self):
+        """Элементы массива по одному"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            separator = self.peek()
+            self.position += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(
+                    f"expected ',' or ']', got {separator!r} "
+                    f"near byte {self.bytes_read}"
+                )
+
+    def iter_member_array(self, key):
+        """Элементы массива под ключом key корневого объекта.
+        Остальные поля разбираются и выбрасываются"""
+        self.expect("{")
+        if self.peek() == "}":
+            return
+        while True:
+            name = self.read_value()
+            self.expect(":")
+            if name == key:
+                yield from self.iter_array()
+                return
+            self.read_value()
+            separator = self.peek()
+            self.position += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(
+                    f"expected ',' or '}}', got {separator!r} "
+                    f"near byte {self.bytes_read}"
+                )
+
+
+def iter_member_array(file, key, chunk_size=CHUNK_SIZE):
+    return JSONStreamReader(file, chunk_size).iter_member_array(key)
@@ -1,8 +1,8 @@
+import functools
 import random
 
 import numpy
 import numpy as np
-import trimesh
 from OpenGL.GL import (
     glEnable,
     glPopMatrix,
@@ -19,34 +19,216 @@ from OpenGL.GL import (
 from OpenGL.raw.GL.VERSION.GL_1_0 import GL_EMISSION, GL_FRONT, glMaterialfv, glColor3f
 from matplotlib import colors as mcolors
 
+from src import renderer, damage
+from src.renderer import GeometryBuffer
+
+# общий для всех узлов список цветов, узлы хранят только номер
+COLORS = list(mcolors.XKCD_COLORS.values())
+
+# имя класса (поле "type" в сохранённой сцене) -> класс узла
+NODE_CLASSES = dict()
+
+
+def register_node_class(node_class):
+    """Разрешает загружать узлы класса из файла, можно как декоратор"""
+    NODE_CLASSES[node_class.__name__] = node_class
+    return node_class
+
+
+def create_node(data):
+    """Один узел по словарю to_dict без детей, None для незнакомого типа"""
+    node_class = NODE_CLASSES.get(data["type"])
+    if node_class is None:
+        return None
+    return node_class.from_dict(data)
+
+
+def node_state(data):
+    """Словарь to_dict в поля Node.load_state"""
+    factors = data.get("scaling")
+    return {
+        "color_index": data.get("color_index", 0),
+        "translation_matrix": translation(data.get("position", [0, 0, 0])),
+        "scaling_matrix": None if factors is None else scaling(factors),
+        "corners": data.get("corners"),
+        "has_children": "children" in data,
+    }
+
+
+def node_from_dict(data):
+    """Узел по словарю to_dict вместе со всем поддеревом детей.
+    Дерево обходится явным стеком, а не рекурсией, так что глубина
+    вложенности не упирается в предел рекурсии Python"""
+    root = create_node(data)
+    if root is None:
+        return None
+
+    loaded = []  # составные узлы, родители раньше детей
+    stack = [(root, data)]
+    while stack:
+        node, node_data = stack.pop()
+        if not isinstance(node, HierarchicalNode) or "children" not in node_data:
+            continue
+        loaded.append(node)
+        for child_data in node_data["children"]:
+            child = create_node(child_data)
+            if child is not None:
+                node.add_child(child)
+                stack.append((child, child_data))
+
+    # рамки составных узлов считаются по уже собранным детям
+    for node in reversed(loaded):
+        node.on_children_loaded()
+    return root
+
 
 def get_point_coord(point, node):
-    return (node.scaling_matrix @ node.translation_matrix @ np.append(point, 1))[:3]
+    """Точка узла в ск сцены, с той же матрицей, что в Node.render"""
+    return (node.translation_matrix @ node.scaling_matrix @ np.append(point, 1))[:3]
+
+
+def get_points_coord(points, node):
+    """get_point_coord сразу для всех точек (N, 3) одним умножением (N, 4) @ (4, 4)"""
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    homogeneous = np.hstack([points, np.ones((len(points), 1))])
+    matrix = node.translation_matrix @ node.scaling_matrix
+    return (homogeneous @ np.transpose(matrix))[:, :3]
+
+
+@functools.lru_cache(maxsize=None)
+def get_rgb(color):
+    """Цвет matplotlib в rgb, кешируем, чтобы не разбирать строку каждый кадр"""
+    return mcolors.to_rgb(color)
+
+
+def get_transformed_bounds(min_point, max_point, matrix):
+    """Границы коробки после применения матрицы ко всем её 8 углам"""
+    corners = np.array(
+        [
+            [x, y, z, 1]
+            for x in (min_point[0], max_point[0])
+            for y in (min_point[1], max_point[1])
+            for z in (min_point[2], max_point[2])
+        ]
+    )
+    transformed = (corners @ np.transpose(matrix))[:, :3]
+    return transformed.min(axis=0), transformed.max(axis=0)
+
+
+def transform_points(points, matrix):
+    """Применяет матрицу 4x4 сразу ко всем точкам (N, 3)"""
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    return points @ np.transpose(matrix[:3, :3]) + matrix[:3, 3]
+
+
+def get_points_bounds(points, matrix):
+    """Границы набора точек (N, 3) после применения матрицы"""
+    transformed = transform_points(points, matrix)
+    return transformed.min(axis=0), transformed.max(axis=0)
+
+
+def union_bounds(bounds):
+    """Общие границы списка пар (min_point, max_point)"""
+    return (
+        np.min([bound[0] for bound in bounds], axis=0),
+        np.max([bound[1] for bound in bounds], axis=0),
+    )
 
 
 class Node(object):
     """Самая базовая сущность"""
+
+    # если узел подключён к TransformStore, его матрицы лежат там
+    _transform_store = None
+    _transform_index = None
+
     def __init__(self):
-        self.colors = list(mcolors.XKCD_COLORS.values())
+        self.colors = COLORS
         self.color_index = random.randint(0, len(self.colors) - 1)
         self.aabb = AABB([0.0, 0.0, 0.0], [0.5, 0.5, 0.5])  # задаём "колайдер" узла
         self.translation_matrix = numpy.identity(4)
         self.scaling_matrix = numpy.identity(4)
         self.selected = False
 
+    @property
+    def translation_matrix(self):
+        if self._transform_store is not None:
+            return self._transform_store.translations[self._transform_index]
+        return self._translation_matrix
+
+    @translation_matrix.setter
+    def translation_matrix(self, matrix):
+        if self._transform_store is not None:
+            self._transform_store.translations[self._transform_index] = matrix
+        else:
+            self._translation_matrix = matrix
+        damage.mark_dirty()
+        self.on_transform_changed()
+
+    @property
+    def scaling_matrix(self):
+        if self._transform_store is not None:
+            return self._transform_store.scalings[self._transform_index]
+        return self._scaling_matrix
+
+    @scaling_matrix.setter
+    def scaling_matrix(self, matrix):
+        if self._transform_store is not None:
+            self._transform_store.scalings[self._transform_index] = matrix
+        else:
+            self._scaling_matrix = matrix
+        damage.mark_dirty()
+        self.on_transform_changed()
+
+    def on_transform_changed(self):
+        """Вызывается при замене матриц, узлы с кешем геометрии его сбрасывают"""
+        pass
+
     def to_dict(self):
         return {
             "type": self.__class__.__name__,
-            "position": list(self.translation_matrix[:3, 3]),
+            # tolist: матрицы из TransformStore хранят float32, json их не пишет
+            "position": self.translation_matrix[:3, 3].tolist(),
+            "scaling": numpy.diag(self.scaling_matrix)[:3].tolist(),
             "color_index": self.color_index,
         }
 
-    def render(self):
+    @classmethod
+    def from_dict(cls, data):
+        """Узел из словаря to_dict, без промежуточной геометрии"""
+        return cls.from_state(**node_state(data))
+
+    @classmethod
+    def from_state(cls, **state):
+        """Узел по готовым полям (см. load_state), так грузит и бинарный формат"""
+        node = cls()
+        node.load_state(**state)
+        return node
+
+    def load_state(
+        self,
+        color_index=0,
+        translation_matrix=None,
+        scaling_matrix=None,
+        corners=None,
+        has_children=False,
+    ):
+        """Поля сохранённого узла, общие для json и бинарного формата"""
+        self.color_index = color_index
+        if translation_matrix is not None:
+            self.translation_matrix = translation_matrix
+        if scaling_matrix is not None:
+            self.scaling_matrix = scaling_matrix
+            if self.aabb is not None:
+                self.aabb.scale(numpy.diag(scaling_matrix)[:3])
+
+    def render(self, draw_aabb=True):
+        """draw_aabb=False, когда рамки рисует общий проход Scene.render_aabbs"""
         glPushMatrix()
         glMultMatrixf(
             numpy.transpose(self.translation_matrix)
         )  # переводим объект в ск камеры
-        if self.aabb is not None:
+        if draw_aabb and self.aabb is not None:
             self.aabb.render()
         glMultMatrixf(self.scaling_matrix)
 
@@ -62,6 +244,18 @@ class Node(object):
             glMaterialfv(GL_FRONT, GL_EMISSION, [0.0, 0.0, 0.0])
         glPopMatrix()
 
+    def render_id(self):
+        """Рисует узел для выбора по цвету: без рамки, своего цвета и
+        свечения, цвет номера узла задаёт Scene.render_ids"""
+        glPushMatrix()
+        glMultMatrixf(numpy.transpose(self.translation_matrix))
+        glMultMatrixf(self.scaling_matrix)
+        self.render_id_self()
+        glPopMatrix()
+
+    def render_id_self(self):
+        self.render_self()
+
     def get_transformed_aabb(self):
         """Возвращает AABB с учетом всех применённых трансформаций,
         нужно для построения нового aabb для объеденной фигуры"""
@@ -78,6 +272,26 @@ class Node(object):
             np.maximum(transformed_min_point, transformed_max_point),
         )
 
+    def get_pick_bounds(self):
+        """Границы (в мировой ск) области, в которой pick может найти касание.
+        Pick переводит луч матрицей translation @ inv(scaling), поэтому и коробку
+        переводим ей же. None, если область ничем не ограничена"""
+        if self.aabb is None:
+            return None
+        transform = numpy.dot(
+            self.translation_matrix, numpy.linalg.inv(self.scaling_matrix)
+        )
+        bounds = self.aabb.bounds
+        return get_transformed_bounds(bounds[0], bounds[1], transform)
+
+    def get_render_bounds(self):
+        """Границы того, что рисует узел, в ск его родителя (у сцены мировая).
+        None, если границы неизвестны, такой узел рисуется всегда"""
+        if self.aabb is None:
+            return None
+        # рамка рисуется со сдвигом узла, а масштаб в неё уже внесён
+        return get_transformed_bounds(*self.aabb.bounds, self.translation_matrix)
+
     def pick(self, start, direction, mat):
         """Проверка луча на касание с node"""
 
@@ -96,6 +310,7 @@ class Node(object):
             self.selected = select
         else:
             self.selected = not self.selected
+        damage.mark_dirty()
 
     def render_self(self):
         raise NotImplementedError(
@@ -116,6 +331,7 @@ class Node(object):
     def rotate_color(self, forwards):
         self.color_index += 1 if forwards else -1
         self.color_index %= len(self.colors)
+        damage.mark_dirty()
 
     def get_position(self):
         """Возвращает текущие координаты узла"""
@@ -139,6 +355,7 @@ def translation(displacement):
     return t
 
 
+@register_node_class
 class HierarchicalNode(Node):
     def __init__(self):
         super(HierarchicalNode, self).__init__()
@@ -148,51 +365,210 @@ class HierarchicalNode(Node):
         for child in self.child_nodes:
             child.render()
 
+    def render_id_self(self):
+        # дети красятся номером составного узла
+        for child in self.child_nodes:
+            child.render_id()
+
     def add_child(self, node):
         self.child_nodes.append(node)
 
+    def get_render_bounds(self):
+        """Границы детей в ск узла вместе с его рамкой"""
+        child_bounds = [child.get_render_bounds() for child in self.child_nodes]
+        if any(bound is None for bound in child_bounds):
+            return None
+        transform = self.translation_matrix @ self.scaling_matrix
+        bounds = [get_transformed_bounds(*bound, transform) for bound in child_bounds]
+        own_bounds = super().get_render_bounds()
+        if own_bounds is not None:
+            bounds.append(own_bounds)
+        return union_bounds(bounds) if bounds else None
+
     def to_dict(self):
         data = super().to_dict()
         data.update({"children": [child.to_dict() for child in self.child_nodes]})
         return data
 
+    def load_state(self, has_children=False, **state):
+        super().load_state(has_children=has_children, **state)
+        # детей собирает загрузчик, без них остаются созданные в конструкторе
+        if has_children:
+            self.child_nodes = []
+
+    def fit_aabb(self):
+        """Рамка по рамкам детей в ск узла. False, если у детей рамок нет"""
+        boxes = [
+            child.get_transformed_aabb()
+            for child in self.child_nodes
+            if child.aabb is not None
+        ]
+        if not boxes:
+            return False
+        self.aabb = AABB(
+            np.min([box.min_point for box in boxes], axis=0),
+            np.max([box.max_point for box in boxes], axis=0),
+        )
+        return True
+
+    def on_children_loaded(self):
+        """Рамка объединения, как её строит Scene.combine, с масштабом узла"""
+        if self.fit_aabb():
+            self.aabb.scale(numpy.diag(self.scaling_matrix)[:3])
+
 
 class Primitive(Node):
+    # уровень детализации на текущий кадр, выбирает Scene.update_lod
+    lod_call_list = None
+
     def __init__(self):
         super(Primitive, self).__init__()
         self.call_list = None
 
+    def get_call_list(self):
+        if self.lod_call_list is not None:
+            return self.lod_call_list
+        return self.call_list
+
     def render_self(self):
-        glCallList(self.call_list)
+        glCallList(self.get_call_list())
+
+
+def ray_box_intersection(origins, directions, min_points, max_points):
+    """Аналитический тест луча с AABB (slab test), работает с массивами лучей/коробок.
+    Возвращает маску попаданий и параметр t ближайшей точки входа (или выхода,
+    если начало луча внутри коробки)"""
+    origins = np.asarray(origins, dtype=float)
+    directions = np.asarray(directions, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv_directions = 1.0 / directions
+        t1 = (min_points - origins) * inv_directions
+        t2 = (max_points - origins) * inv_directions
+    # nan появляется, когда луч параллелен грани и лежит ровно на ней
+    t_near = np.nanmax(np.minimum(t1, t2), axis=-1)
+    t_far = np.nanmin(np.maximum(t1, t2), axis=-1)
+
+    hit = (t_far >= t_near) & (t_far >= 0)
+    t = np.where(t_near >= 0, t_near, t_far)
+    return hit, t
+
+
+class SlabIntersector:
+    """Пересечение лучей с коробкой по её границам, без построения BVH"""
+
+    def __init__(self, bounds):
+        self.min_point = np.array(bounds[0], dtype=float)
+        self.max_point = np.array(bounds[1], dtype=float)
+
+    def intersects_location(self, ray_origins, ray_directions):
+        """Аналог trimesh RayMeshIntersector.intersects_location для одной коробки"""
+        ray_origins = np.asarray(ray_origins, dtype=float)
+        ray_directions = np.asarray(ray_directions, dtype=float)
+        hit, t = ray_box_intersection(
+            ray_origins, ray_directions, self.min_point, self.max_point
+        )
+        index_ray = np.nonzero(hit)[0]
+        locations = (
+            ray_origins[index_ray] + ray_directions[index_ray] * t[index_ray, None]
+        )
+        return locations, index_ray
+
+
+# пары индексов вершин AABB.vertices, образующие рёбра коробки
+AABB_EDGES = [
+    [0, 1],
+    [2, 0],
+    [2, 3],
+    [3, 1],  # Нижняя грань
+    [4, 5],
+    [5, 7],
+    [6, 7],
+    [4, 6],  # Верхняя грань
+    [0, 4],
+    [1, 5],
+    [2, 6],
+    [3, 7],  # Вертикальные ребра
+]
+
+
+# углы коробки в порядке trimesh: бит 2 - x, бит 1 - y, бит 0 - z (1 = максимум)
+AABB_CORNER_MASK = np.array(
+    [[(i >> 2) & 1, (i >> 1) & 1, i & 1] for i in range(8)], dtype=bool
+)
 
 
 class AABB:
+    """Коробка, выровненная по осям. Хранит только границы и матрицу
+    накопленных сдвигов и масштабов, углы считаются по запросу"""
+
+    __slots__ = (
+        "min_point",
+        "max_point",
+        "original_extents",
+        "transform",
+        "bounds",
+        "_intersector",
+        "_edges_buffer",
+    )
+
     def __init__(self, min_point, max_point):
         self.min_point = np.array(min_point)
         self.max_point = np.array(max_point)
         self.original_extents = self.max_point - self.min_point
-        self.box = trimesh.primitives.Box(
-            extents=self.original_extents,
-            transform=trimesh.transformations.translation_matrix(
-                (self.min_point + self.max_point) / 2
-            ),
+        self.transform = np.identity(4)
+        self.bounds = np.sort(
+            np.array([self.min_point, self.max_point], dtype=float), axis=0
         )
-        self.transform = trimesh.transformations.translation_matrix(
-            (self.min_point + self.max_point) / 2
+        self._intersector = None
+        self._edges_buffer = None
+
+    def __repr__(self):
+        return f"AABB({self.bounds[0].tolist()}, {self.bounds[1].tolist()})"
+
+    @property
+    def extents(self):
+        return self.bounds[1] - self.bounds[0]
+
+    @property
+    def vertices(self):
+        """8 углов коробки (8, 3)"""
+        return np.where(AABB_CORNER_MASK, self.bounds[1], self.bounds[0])
+
+    def set_bounds(self, min_point, max_point):
+        """Задаёт коробку заново без создания нового объекта"""
+        self.min_point = np.array(min_point)
+        self.max_point = np.array(max_point)
+        self.original_extents = self.max_point - self.min_point
+        self.transform = np.identity(4)
+        self.bounds = np.sort(
+            np.array([self.min_point, self.max_point], dtype=float), axis=0
         )
+        self.update()
+
+    @property
+    def intersector(self):
+        """Пересекатель строится один раз и сбрасывается только при изменении коробки"""
+        if self._intersector is None:
+            self._intersector = SlabIntersector(self.bounds)
+        return self._intersector
+
+    def update(self):
+        """Обновляет кеши (пересекатель, буфер рёбер) после изменения коробки"""
+        self._intersector = None
+        if self._edges_buffer is not None:
+            self._edges_buffer.update(self.vertices[AABB_EDGES])
 
     def ray_hit(self, start, direction, matrix):
         """Проверяет пересечение луча с AABB"""
         transformation_matrix = np.array(matrix)
         local_ray_origins = np.dot(
-            trimesh.transformations.inverse_matrix(transformation_matrix),
+            np.linalg.inv(transformation_matrix),
             np.append(start, 1),
         )[:3]
         local_ray_directions = np.dot(transformation_matrix[:3, :3].T, direction)
         local_ray_directions /= np.linalg.norm(local_ray_directions)
 
-        ray = trimesh.ray.ray_pyembree.RayMeshIntersector(self.box)
-        locations, _, _ = ray.intersects_location(
+        locations, _ = self.intersector.intersects_location(
             ray_origins=[local_ray_origins],
             ray_directions=[local_ray_directions],
         )
@@ -200,62 +576,131 @@ class AABB:
         if len(locations) > 0:
             hit_location = locations[0]
             distance = np.linalg.norm(start - hit_location)
-            print(f"pick {self.box.__str__()}")
             return True, distance
         else:
             return False, None
 
     def scale(self, scale_factor):
-        """Масштабирует AABB и обновляет коллайдер"""
-        self.box.apply_scale(scale_factor)
-        print(self.box.scale)
+        """Масштабирует AABB относительно начала координат и обновляет коллайдер"""
+        self.transform = scaling(np.broadcast_to(scale_factor, 3)) @ self.transform
+        self.bounds = np.sort(self.bounds * scale_factor, axis=0)
+        self.update()
 
     def translate(self, translation_vector):
         """Перемещает AABB на заданный вектор"""
-        translation_matrix = trimesh.transformations.translation_matrix(
-            translation_vector
-        )
-        self.transform = trimesh.transformations.concatenate_matrices(
-            self.transform, translation_matrix
-        )
-        self.box.apply_transform(translation_matrix)
+        self.transform = translation(translation_vector) @ self.transform
+        self.bounds = self.bounds + translation_vector
+        self.update()
         self.min_point += translation_vector
         self.max_point += translation_vector
 
     def render(self):
         """Рендерит грани AABB"""
-        corners = self.box.vertices
-        edges = [
-            [0, 1],
-            [2, 0],
-            [2, 3],
-            [3, 1],  # Нижняя грань
-            [4, 5],
-            [5, 7],
-            [6, 7],
-            [4, 6],  # Верхняя грань
-            [0, 4],
-            [1, 5],
-            [2, 6],
-            [3, 7],  # Вертикальные ребра
-        ]
-
         glDisable(GL_LIGHTING)
         glColor3f(1, 1, 1)
-        glBegin(GL_LINES)
-        for edge in edges:
-            glVertex3fv(corners[edge[0]])
-            glVertex3fv(corners[edge[1]])
-        glEnd()
+        if renderer.vbo_enabled():
+            if self._edges_buffer is None:
+                self._edges_buffer = GeometryBuffer(GL_LINES)
+                self._edges_buffer.update(self.vertices[AABB_EDGES])
+            self._edges_buffer.draw()
+        else:
+            corners = self.vertices
+            glBegin(GL_LINES)
+            for edge in AABB_EDGES:
+                glVertex3fv(corners[edge[0]])
+                glVertex3fv(corners[edge[1]])
+            glEnd()
         glEnable(GL_LIGHTING)
 
 
 class ObjectWithControlPoints(Primitive):
+    # режим glDrawArrays для вершин из get_geometry_vertices
+    geometry_mode = None
+
+    _corners = None
+    _geometry_buffer = None
+    _geometry_dirty = True
+    _world_corners = None
+    _batch_geometry = None
+    _batch_dirty = True
+    _batch_color_index = None
+
     def __init__(self):
         super().__init__()
         self.corners = None
         self.control_points = None
 
+    @property
+    def corners(self):
+        return self._corners
+
+    @corners.setter
+    def corners(self, corners):
+        self._corners = corners
+        self.invalidate_geometry()
+
+    def invalidate_geometry(self):
+        """Помечает буфер вершин устаревшим, он перезаливается при отрисовке"""
+        self._geometry_dirty = True
+        self._batch_dirty = True
+        self._world_corners = None
+        damage.mark_dirty()
+
+    def on_transform_changed(self):
+        self._world_corners = None
+        self._batch_dirty = True
+
+    def get_world_corners(self):
+        """Углы, преобразованные как в get_point_coord, массивом (N, 3).
+        Кешируются до изменения углов или матриц объекта"""
+        if self._world_corners is None:
+            self._world_corners = get_points_coord(self.corners, self)
+        return self._world_corners
+
+    def get_geometry_vertices(self):
+        return self.corners
+
+    def get_batch_geometry(self):
+        """Геометрия для общего прохода Scene.render_batches: список
+        (режим glDrawArrays, вершины в ск сцены, rgb). None - узел рисуется сам.
+        Кешируется до изменения углов, матриц или цвета узла"""
+        if self._batch_dirty or self._batch_color_index != self.color_index:
+            self._batch_geometry = self.build_batch_geometry()
+            self._batch_dirty = False
+            self._batch_color_index = self.color_index
+        return self._batch_geometry
+
+    def build_batch_geometry(self):
+        return None
+
+    def to_scene_coords(self, vertices):
+        """Вершины из render_self в ск сцены, та же матрица, что в Node.render"""
+        return transform_points(vertices, self.translation_matrix @ self.scaling_matrix)
+
+    def get_geometry_buffer(self):
+        """VBO с вершинами объекта, обновляется только после изменения углов"""
+        if self._geometry_buffer is None:
+            self._geometry_buffer = GeometryBuffer(self.geometry_mode)
+        if self._geometry_dirty:
+            self._geometry_buffer.update(self.get_geometry_vertices())
+            self._geometry_dirty = False
+        return self._geometry_buffer
+
+    def get_render_bounds(self):
+        """Границы вершин объекта и его рамки"""
+        vertices = self.get_geometry_vertices()
+        if vertices is None or len(vertices) == 0:
+            return None
+        bounds = [
+            get_points_bounds(
+                vertices, self.translation_matrix @ self.scaling_matrix
+            )
+        ]
+        own_bounds = super().get_render_bounds()
+        if own_bounds is not None:
+            bounds.append(own_bounds)
+        return union_bounds(bounds)
+
     def update_corners(self):
         """Обновляет углы плоскости на основе текущих позиций точек-контроллеров."""
         self.corners = np.array([point.get_position() for point in self.control_points])
@@ -266,23 +711,37 @@ class ObjectWithControlPoints(Primitive):
 
     def translate(self, x, y, z):
         super().translate(x, y, z)
-        for point in self.control_points:
-            point.update_position()
+        self.update_control_points()
+
+    def get_control_positions(self):
+        """Положения всех углов в мировой ск (k, 3), те же, что при создании точек"""
+        return self.get_world_corners()
+
+    def update_control_points(self):
+        """Переносит точки-контроллеры в текущие углы"""
+        if not self.control_points:
+            return  # углы ещё не заданы, например при загрузке сцены
+        positions = self.get_control_positions()
+        for i, point in enumerate(self.control_points):
+            index = point.corner_index if point.corner_index is not None else i
+            Node.translate(point, *positions[index] - point.get_position())
 
     def create_control_points(self):
         """Создаёт точки-контроллеры в углах плоскости."""
         from src.premitives import ActivePoint
 
-        self.control_points = [ActivePoint(self) for _ in range(len(self.corners))]
-        for point, corner, i in zip(
-            self.control_points, self.corners, list(range(len(self.corners)))
-        ):
-            Node.translate(
-                point, *get_point_coord(corner, self)
-            )  # Перемещаем точки в нужные углы
-            self.control_points[i] = point
+        self.control_points = [
+            ActivePoint(self, corner_index=i) for i in range(len(self.corners))
+        ]
+        for point, corner in zip(self.control_points, self.get_world_corners()):
+            Node.translate(point, *corner)  # Перемещаем точки в нужные углы
 
     def to_dict(self):
         data = super().to_dict()
         data.update({"corners": self.corners})
         return data
+
+    def load_state(self, corners=None, **state):
+        super().load_state(corners=corners, **state)
+        self.corners = np.array(corners)
+        self.create_control_points()
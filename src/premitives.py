@@ -13,6 +13,7 @@ from OpenGL.GL import (
     glGenLists,
     GL_CULL_FACE,
     GL_LINES,
+    GL_TRIANGLES,
     glVertex3fv,
 )
 from OpenGL.raw.GL.VERSION.GL_1_0 import (
@@ -29,22 +30,32 @@ from OpenGL.raw.GL.VERSION.GL_1_0 import (
 from OpenGL.raw.GLUT import glutSolidSphere, glutSolidCube
 from matplotlib import colors as mcolors
 
+from src import renderer
+from src.renderer import GeometryBuffer
 from src.node import (
     Primitive,
     AABB,
     translation,
     Node,
     get_point_coord,
+    get_points_coord,
     HierarchicalNode,
     scaling,
     ObjectWithControlPoints,
+    register_node_class,
+    get_rgb,
 )
 
 G_OBJ_POINT = None
 G_OBJ_SPHERE = None
 G_OBJ_CUBE = None
 
+# уровни детализации сфер: (минимальный диаметр на экране в пикселях, число
+# делений по широте и долготе), мелкие на экране сферы рисуются грубее
+SPHERE_LODS = ((60, 20), (20, 12), (6, 8), (0, 5))
 
+
+@register_node_class
 class Point(Primitive):
     def __init__(self):
         super().__init__()
@@ -55,6 +66,7 @@ class Point(Primitive):
         return
 
 
+@register_node_class
 class Sphere(Primitive):
     def __init__(self):
         super(Sphere, self).__init__()
@@ -62,6 +74,7 @@ class Sphere(Primitive):
         self.aabb = AABB([-0.5, -0.5, -0.5], [0.5, 0.5, 0.5])
 
 
+@register_node_class
 class Cube(Primitive):
     def __init__(self):
         super(Cube, self).__init__()
@@ -69,9 +82,13 @@ class Cube(Primitive):
         self.aabb = AABB([-0.5, -0.5, -0.5], [0.5, 0.5, 0.5])
 
 
+@register_node_class
 class SnowFigure(HierarchicalNode):
-    def __init__(self):
+    def __init__(self, with_children=True):
         super(SnowFigure, self).__init__()
+        self.aabb = AABB([0.0, 0.0, 0.0], [0.5, 1.1, 0.5])
+        if not with_children:
+            return  # шары задаст node_from_dict
         self.child_nodes = [Sphere(), Sphere(), Sphere()]
         self.child_nodes[0].translate(0, -0.6, 0)  # scale 1.0
         self.child_nodes[1].translate(0, 0.1, 0)
@@ -84,13 +101,23 @@ class SnowFigure(HierarchicalNode):
         )
         for child_node in self.child_nodes:
             child_node.color_index = 0
-        self.aabb = AABB([0.0, 0.0, 0.0], [0.5, 1.1, 0.5])
+
+    @classmethod
+    def from_state(cls, **state):
+        """Шары по умолчанию строятся, только если в файле нет детей"""
+        node = cls(with_children=not state.get("has_children"))
+        node.load_state(**state)
+        return node
+
+    def on_children_loaded(self):
+        pass  # рамка фигуры задана в конструкторе
 
 
 class ActivePoint(Point):
-    def __init__(self, parent_object, position=np.array([0, 0, 0])):
+    def __init__(self, parent_object, position=np.array([0, 0, 0]), corner_index=None):
         super().__init__()
         self.parent_object = parent_object
+        self.corner_index = corner_index  # номер угла в parent_object.corners
         self.translation_matrix = translation(position)
         self.scaling_matrix = self.parent_object.scaling_matrix
 
@@ -100,7 +127,9 @@ class ActivePoint(Point):
 
     def update_position(self):
         """Обновляем позицию точки на основе матриц трансформации плоскости"""
-        corner_idx = self.parent_object.control_points.index(self)
+        corner_idx = self.corner_index
+        if corner_idx is None:
+            corner_idx = self.parent_object.control_points.index(self)
         transformed_corner = (
             self.parent_object.translation_matrix
             @ self.parent_object.scaling_matrix
@@ -109,7 +138,10 @@ class ActivePoint(Point):
         Node.translate(self, *transformed_corner - self.get_position())
 
 
+@register_node_class
 class Plane(ObjectWithControlPoints):
+    geometry_mode = GL_TRIANGLE_STRIP
+
     def __init__(self):
         super(Plane, self).__init__()
         self.corners = None
@@ -193,14 +225,26 @@ class Plane(ObjectWithControlPoints):
         cull_face_enabled = glIsEnabled(GL_CULL_FACE)
         glDisable(GL_CULL_FACE)
 
-        glBegin(GL_TRIANGLE_STRIP)
-        for corner in self.corners:
-            glVertex3fv(corner)
-        glEnd()
+        if renderer.vbo_enabled():
+            self.get_geometry_buffer().draw()
+        else:
+            glBegin(GL_TRIANGLE_STRIP)
+            for corner in self.corners:
+                glVertex3fv(corner)
+            glEnd()
 
         if cull_face_enabled:
             glEnable(GL_CULL_FACE)
 
+    def build_batch_geometry(self):
+        """Полоса углов разбивается на треугольники, чтобы плоскости
+        склеивались в один буфер"""
+        if self.corners is None or len(self.corners) < 3:
+            return None
+        corners = np.asarray(self.corners, dtype=float)
+        vertices = self.to_scene_coords(corners[strip_triangles(len(corners))])
+        return [(GL_TRIANGLES, vertices, get_rgb(self.colors[self.color_index]))]
+
     def pick(self, start, direction, matrix):
         """Проверка пересечения луча с плоскостью"""
         # Преобразуем начальную точку и направление луча в локальную систему координат
@@ -245,6 +289,33 @@ class Plane(ObjectWithControlPoints):
             return True, np.linalg.norm(start - intersect_point)
         return False, None
 
+    def get_pick_bounds(self):
+        """Область, где is_point_inside истинно: u и v в [0, 1] вдоль рёбер.
+        Считаем её только для плоскости без трансформаций, иначе pick
+        строит нормаль не по углам и область не ограничена"""
+        if self.corners is None or not (
+            np.allclose(self.translation_matrix, np.identity(4))
+            and np.allclose(self.scaling_matrix, np.identity(4))
+        ):
+            return None
+
+        corner0 = np.asarray(self.corners[0], dtype=float)
+        edge1 = np.asarray(self.corners[1], dtype=float) - corner0
+        edge2 = np.asarray(self.corners[2], dtype=float) - corner0
+        gram = np.array(
+            [[edge1 @ edge1, edge1 @ edge2], [edge1 @ edge2, edge2 @ edge2]]
+        )
+        # точки плоскости, в которых u, v принимают крайние значения
+        limits = np.array([[u, v] for u in (0, 1) for v in (0, 1)]) * np.diag(gram)
+        try:
+            coefficients = np.linalg.solve(gram, limits.T).T
+        except np.linalg.LinAlgError:
+            return None
+
+        region = corner0 + coefficients @ np.array([edge1, edge2])
+        padding = 1e-6
+        return region.min(axis=0) - padding, region.max(axis=0) + padding
+
     def get_corner_coord(self, corner):
         return ((self.translation_matrix) @ self.scaling_matrix @ np.append(corner, 1))[
             :3
@@ -266,7 +337,7 @@ class Plane(ObjectWithControlPoints):
 
         return 0 <= u <= 1 and 0 <= v <= 1
 
-    def render(self):
+    def render(self, draw_aabb=True):
         # убран рендер aabb
         glPushMatrix()
 
@@ -313,8 +384,9 @@ class Plane(ObjectWithControlPoints):
         line = Line(intersection_point, intersection_point + line_direction)
         self.lines.append(line)
 
-        corner0 = get_point_coord(self.corners[0], self)
-        corner1 = get_point_coord(self.corners[1], self)
+        world_corners = self.get_world_corners()
+        corner0 = world_corners[0]
+        corner1 = world_corners[1]
 
         new_basis = LocalSystemCoord(
             corner1 - corner0, np.cross(corner0, corner1), corner0
@@ -328,12 +400,8 @@ class Plane(ObjectWithControlPoints):
         new_corners = [[] for _ in range(len(self.corners))]
         nodes = [0, 2, 3, 1]  # правильная последовательность обхода углов плоскости
         for i in range(4):
-            local_start = new_basis.to_local_coord(
-                get_point_coord(self.corners[nodes[i]], self)
-            )
-            local_end = new_basis.to_local_coord(
-                get_point_coord(self.corners[nodes[(i + 1) % 4]], self)
-            )
+            local_start = new_basis.to_local_coord(world_corners[nodes[i]])
+            local_end = new_basis.to_local_coord(world_corners[nodes[(i + 1) % 4]])
 
             intersection_point = find_intersection_2d(
                 np.array([local_start, local_end]),
@@ -357,7 +425,7 @@ class Plane(ObjectWithControlPoints):
         print(new_corners)
         for i in range(len(new_corners)):
             if len(new_corners[nodes[i]]) == 0:
-                new_corners[nodes[i]] = get_point_coord(self.corners[nodes[i]], self)
+                new_corners[nodes[i]] = world_corners[nodes[i]].copy()
 
         self.control_points.clear()
         self.corners = new_corners
@@ -366,11 +434,23 @@ class Plane(ObjectWithControlPoints):
         self.create_control_points()
 
 
+@register_node_class
 class Line(ObjectWithControlPoints):
-    def __init__(self, start, end):
+    geometry_mode = GL_LINES
+
+    def __init__(self, start=None, end=None):
         super(Line, self).__init__()
+        if start is None:
+            return  # углы задаст load_state
         self.corners = [np.array(start, float), np.array(end, float)]
-        self.control_points = [ActivePoint(self, start), ActivePoint(self, end)]
+        self.control_points = [
+            ActivePoint(self, start, corner_index=0),
+            ActivePoint(self, end, corner_index=1),
+        ]
+        self.update_aabb()
+
+    def load_state(self, **state):
+        super().load_state(**state)
         self.update_aabb()
 
     def update_aabb(self):
@@ -404,15 +484,27 @@ class Line(ObjectWithControlPoints):
         min_point += padding
         max_point -= padding
 
-        self.aabb = AABB(min_point, max_point)
+        if self.aabb is None:
+            self.aabb = AABB(min_point, max_point)
+        else:
+            self.aabb.set_bounds(min_point, max_point)
 
     def render_self(self):
         """Рендер линии."""
+        if renderer.vbo_enabled():
+            self.get_geometry_buffer().draw()
+            return
         glBegin(GL_LINES)
         glVertex3fv(self.corners[0])
         glVertex3fv(self.corners[1])
         glEnd()
 
+    def build_batch_geometry(self):
+        if self.corners is None:
+            return None
+        vertices = self.to_scene_coords(self.corners)
+        return [(GL_LINES, vertices, get_rgb(self.colors[self.color_index]))]
+
     def get_position(self):
         return (self.corners[0] + self.corners[1]) / 2
 
@@ -424,46 +516,88 @@ class Line(ObjectWithControlPoints):
         self.update_aabb()
 
 
+def strip_triangles(count):
+    """Индексы треугольников полосы GL_TRIANGLE_STRIP из count вершин,
+    с тем же обходом, что у OpenGL"""
+    indices = []
+    for i in range(count - 2):
+        indices += [i, i + 1, i + 2] if i % 2 == 0 else [i + 1, i, i + 2]
+    return indices
+
+
+def _extruded_edges():
+    """Индексы углов для рёбер многогранника: боковые, затем основание и верх"""
+    edges = []
+    for i in range(4):
+        edges += [i, 4 + i]
+    nodes = [0, 2, 3, 1]
+    for k, i in enumerate(nodes):
+        j = nodes[(k + 1) % len(nodes)]
+        edges += [i, j, 4 + i, 4 + j]
+    return edges
+
+
+def _extruded_faces():
+    """Индексы углов для треугольников граней: боковые, нижняя и верхняя.
+    Каждая грань - полоса из 4 углов, как у Plane, то есть 2 треугольника"""
+    quads = []
+    nodes = [0, 2, 3, 1]
+    for k, i in enumerate(nodes):
+        j = nodes[(k + 1) % len(nodes)]
+        quads.append([i, j, 4 + i, 4 + j])
+    quads += [[0, 1, 2, 3], [4, 5, 6, 7]]
+    return [quad[index] for quad in quads for index in (0, 1, 2, 1, 3, 2)]
+
+
+EXTRUDED_EDGES = _extruded_edges()
+EXTRUDED_FACES = _extruded_faces()
+
+
+@register_node_class
 class ExtrudedPolygon(ObjectWithControlPoints):
-    def __init__(self, base_plane, extrusion_height=1.0):
+    geometry_mode = GL_LINES
+
+    _face_buffer = None
+    _faces_dirty = True
+
+    def __init__(self, base_plane=None, extrusion_height=1.0):
         super(ExtrudedPolygon, self).__init__()
-        self.create_corners(extrusion_height, base_plane)
-        self.create_control_points()
         self.aabb = None
         # Список плоскостей (4 боковые, 1 верхняя, 1 нижняя)
         self.planes = []
+        if base_plane is None:
+            return  # углы задаст load_state
+        self.create_corners(extrusion_height, base_plane)
+        self.create_control_points()
+        self.update_planes()
+
+    def load_state(self, **state):
+        super().load_state(**state)
         self.update_planes()
 
     def update_planes(self):
         """Создаёт плоскости для многогранника."""
         self.planes.clear()
+        world_corners = self.get_world_corners()
 
         nodes = [0, 2, 3, 1]
         # Создаем боковые плоскости
         for k, i in enumerate(nodes):
             j = nodes[(k + 1) % len(nodes)]
-            quad_corners = [
-                get_point_coord(self.corners[i], self),
-                get_point_coord(self.corners[j], self),
-                get_point_coord(self.corners[4 + i], self),
-                get_point_coord(self.corners[4 + j], self),
-            ]
             plane = Plane()
-            plane.corners = quad_corners
+            plane.corners = list(world_corners[[i, j, 4 + i, 4 + j]])
             self.planes.append(plane)
 
         # Создаем верхнюю и нижнюю плоскости
         plane1 = Plane()
         plane2 = Plane()
-        plane1.corners = [get_point_coord(corner, self) for corner in self.corners[:4]]
-        plane2.corners = [get_point_coord(corner, self) for corner in self.corners[4:]]
+        plane1.corners = list(world_corners[:4].copy())
+        plane2.corners = list(world_corners[4:].copy())
         self.planes.append(plane1)
         self.planes.append(plane2)
 
     def create_corners(self, extrusion_height, base_plane):
-        base_vertices = [
-            get_point_coord(corner, base_plane) for corner in base_plane.corners
-        ]
+        base_vertices = get_points_coord(base_plane.corners, base_plane)
         top_vertices = list(range(4))
         nodes = [0, 2, 3, 1]
         for i, node in enumerate(nodes):
@@ -480,37 +614,79 @@ class ExtrudedPolygon(ObjectWithControlPoints):
         super().update_corners()
         self.update_planes()
 
+    def on_transform_changed(self):
+        # рёбра хранятся уже с применёнными матрицами
+        self.invalidate_geometry()
+
+    def invalidate_geometry(self):
+        super().invalidate_geometry()
+        self._faces_dirty = True
+
+    def get_geometry_vertices(self):
+        """Вершины рёбер в том же порядке, что и при отрисовке по одной"""
+        return self.get_world_corners()[EXTRUDED_EDGES]
+
+    def get_face_vertices(self):
+        """Треугольники всех шести граней (36, 3)"""
+        return self.get_world_corners()[EXTRUDED_FACES]
+
+    def get_face_buffer(self):
+        """VBO с гранями, перезаливается только после изменения углов"""
+        if self._face_buffer is None:
+            self._face_buffer = GeometryBuffer(GL_TRIANGLES)
+        if self._faces_dirty:
+            self._face_buffer.update(self.get_face_vertices())
+            self._faces_dirty = False
+        return self._face_buffer
+
     def render_self(self):
-        """Рендерит многогранник."""
-        # Рендерим плоскости
-        for plane in self.planes:
-            plane.render_self()
+        """Рендерит многогранник: грани цветом узла, рёбра белым."""
+        cull_face_enabled = glIsEnabled(GL_CULL_FACE)
+        glDisable(GL_CULL_FACE)
 
-        # Рендерим грани (белые линии)
+        self.draw_faces()
         glColor3f(1.0, 1.0, 1.0)
+        if renderer.vbo_enabled():
+            self.get_geometry_buffer().draw()
+        else:
+            # боковые грани, затем грани основания и верхней грани
+            glBegin(GL_LINES)
+            for vertex in self.get_geometry_vertices():
+                glVertex3fv(vertex)
+            glEnd()
 
-        glBegin(GL_LINES)
-        # Рендерим боковые грани
-        for i in range(4):
-            base_corner = get_point_coord(self.corners[i], self)
-            top_corner = get_point_coord(self.corners[4 + i], self)
-            glVertex3fv(base_corner)
-            glVertex3fv(top_corner)
-
-        # Рендерим грани основания и верхней грани
-        nodes = [0, 2, 3, 1]
-        for k, i in enumerate(nodes):
-            j = nodes[(k + 1) % len(nodes)]
+        if cull_face_enabled:
+            glEnable(GL_CULL_FACE)
 
-            # Основание
-            glVertex3fv(get_point_coord(self.corners[i], self))
-            glVertex3fv(get_point_coord(self.corners[j], self))
+    def build_batch_geometry(self):
+        """Грани цветом узла и белые рёбра, как в render_self"""
+        if self.corners is None:
+            return None
+        return [
+            (
+                GL_TRIANGLES,
+                self.to_scene_coords(self.get_face_vertices()),
+                get_rgb(self.colors[self.color_index]),
+            ),
+            (GL_LINES, self.to_scene_coords(self.get_geometry_vertices()), (1, 1, 1)),
+        ]
 
-            # Верхняя грань
-            glVertex3fv(get_point_coord(self.corners[4 + i], self))
-            glVertex3fv(get_point_coord(self.corners[4 + j], self))
+    def render_id_self(self):
+        """Для выбора по цвету хватает граней, белые рёбра не рисуются"""
+        cull_face_enabled = glIsEnabled(GL_CULL_FACE)
+        glDisable(GL_CULL_FACE)
+        self.draw_faces()
+        if cull_face_enabled:
+            glEnable(GL_CULL_FACE)
 
-        glEnd()
+    def draw_faces(self):
+        if renderer.vbo_enabled():
+            self.get_face_buffer().draw()
+        else:
+            glBegin(GL_TRIANGLES)
+            for vertex in self.get_face_vertices():
+                glVertex3fv(vertex)
+            glEnd()
 
     def pick(self, start, direction, mat):
         """Проверка пересечения луча с многогранником."""
@@ -527,27 +703,50 @@ class ExtrudedPolygon(ObjectWithControlPoints):
 
         return hit_any, closest_distance if hit_any else None
 
+    def get_pick_bounds(self):
+        """Объединение областей боковых, верхней и нижней плоскостей"""
+        bounds = [plane.get_pick_bounds() for plane in self.planes]
+        if not bounds or any(bound is None for bound in bounds):
+            return None
+        return (
+            np.min([bound[0] for bound in bounds], axis=0),
+            np.max([bound[1] for bound in bounds], axis=0),
+        )
+
     def translate(self, x, y, z):
         super().translate(x, y, z)
-        self.corners = [get_point_coord(corner, self) for corner in self.corners]
+        self.corners = list(self.get_world_corners().copy())
         self.translation_matrix = np.identity(4)
         self.scaling_matrix = np.identity(4)
         self.update_planes()
 
 
+def compile_sphere_lods(radius):
+    """Дисплейные списки сферы для каждого уровня детализации,
+    возвращает самый подробный, его и хранят узлы"""
+    levels = []
+    for min_size, segments in SPHERE_LODS:
+        call_list = glGenLists(1)
+        glNewList(call_list, GL_COMPILE)
+        # радиус, количество линий по ширине и долготе
+        glutSolidSphere(radius, segments, segments)
+        glEndList()
+        renderer.register_instanced_mesh(
+            call_list, *renderer.sphere_mesh(radius, segments, segments)
+        )
+        levels.append((min_size, call_list))
+    renderer.register_lod(levels[0][1], levels)
+    return levels[0][1]
+
+
 def init_primitives():
     global G_OBJ_SPHERE, G_OBJ_CUBE, G_OBJ_POINT
-    G_OBJ_SPHERE = glGenLists(1)
-    glNewList(G_OBJ_SPHERE, GL_COMPILE)
-    glutSolidSphere(0.5, 20, 20)  # радиус, количество линий по ширине и долготе
-    glEndList()
+    G_OBJ_SPHERE = compile_sphere_lods(0.5)
 
     G_OBJ_CUBE = glGenLists(1)
     glNewList(G_OBJ_CUBE, GL_COMPILE)
     glutSolidCube(1.0)
     glEndList()
+    renderer.register_instanced_mesh(G_OBJ_CUBE, *renderer.cube_mesh(1.0))
 
-    G_OBJ_POINT = glGenLists(1)
-    glNewList(G_OBJ_POINT, GL_COMPILE)
-    glutSolidSphere(0.08, 20, 20)
-    glEndList()
+    G_OBJ_POINT = compile_sphere_lods(0.08)
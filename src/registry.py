@@ -0,0 +1,147 @@
+def key_to_color(key):
+    """Цвет (r, g, b) в байтах для выбора по цвету. Чёрный (0) - фон"""
+    value = key + 1
+    return (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
+
+
+def color_to_key(color):
+    """Номер узла по цвету пикселя, None для фона"""
+    r, g, b = (int(channel) for channel in color[:3])
+    value = (r << 16) | (g << 8) | b
+    return value - 1 if value else None
+
+
+class NodeRegistry:
+    """Узлы сцены в порядке добавления.
+    Каждый узел получает постоянный номер: словарь номер -> узел хранит
+    порядок отрисовки, а словарь id(узла) -> номер даёт добавление, удаление
+    и проверку принадлежности за O(1). Снаружи ведёт себя как список"""
+
+    def __init__(self, nodes=()):
+        self._nodes = dict()  # номер -> узел, в порядке добавления
+        self._keys = dict()  # id(узла) -> номер
+        self._next_key = 0
+        self.extend(nodes)
+
+    def add(self, node):
+        """Добавляет узел в конец и возвращает его номер"""
+        key = self._keys.get(id(node))
+        if key is not None:
+            return key
+        key = self._next_key
+        self._next_key += 1
+        self._nodes[key] = node
+        self._keys[id(node)] = key
+        return key
+
+    def append(self, node):
+        self.add(node)
+
+    def extend(self, nodes):
+        for node in nodes:
+            self.add(node)
+
+    def remove(self, node):
+        """Как list.remove: ValueError, если узла нет"""
+        key = self._keys.pop(id(node), None)
+        if key is None:
+            raise ValueError(f"{node} not in registry")
+        del self._nodes[key]
+
+    def discard(self, node):
+        if node in self:
+            self.remove(node)
+
+    def clear(self):
+        self._nodes.clear()
+        self._keys.clear()
+
+    def key_of(self, node):
+        """Постоянный номер узла, None если узла нет"""
+        return self._keys.get(id(node))
+
+    def get(self, key):
+        """Узел по номеру, None если такого нет"""
+        return self._nodes.get(key)
+
+    def __contains__(self, node):
+        return id(node) in self._keys
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes.values())
+
+    def __getitem__(self, index):
+        # доступ по позиции нужен редко, поэтому за O(n)
+        return list(self._nodes.values())[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (NodeRegistry, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)!r})"
+
+
+class SelectionIndex(NodeRegistry):
+    """Выделенные узлы. Кроме общего порядка выделения узлы разложены
+    по классам, так что правила построения по выделенным (три точки,
+    прямая и точка, плоскость и точка) не перебирают всё выделение"""
+
+    def __init__(self, nodes=()):
+        self._buckets = dict()  # класс узла -> NodeRegistry
+        super().__init__(nodes)
+
+    def add(self, node):
+        if node in self:
+            return self.key_of(node)
+        key = super().add(node)
+        # __class__, а не type(): так же, как isinstance, видит spec у моков
+        self._buckets.setdefault(node.__class__, NodeRegistry()).add(node)
+        return key
+
+    def remove(self, node):
+        super().remove(node)
+        bucket = self._buckets[node.__class__]
+        bucket.remove(node)
+        if not bucket:
+            del self._buckets[node.__class__]
+
+    def clear(self):
+        super().clear()
+        self._buckets.clear()
+
+    def _matching_buckets(self, cls):
+        return [
+            bucket
+            for bucket_cls, bucket in self._buckets.items()
+            if issubclass(bucket_cls, cls)
+        ]
+
+    def count(self, cls):
+        """Сколько выделено узлов класса cls (с подклассами)"""
+        return sum(len(bucket) for bucket in self._matching_buckets(cls))
+
+    def has(self, cls):
+        return any(self._matching_buckets(cls))
+
+    def only(self, cls):
+        """Все выделенные узлы - экземпляры cls"""
+        return self.count(cls) == len(self)
+
+    def first(self, cls):
+        """Выделенный раньше других узел класса cls, None если таких нет"""
+        candidates = [next(iter(bucket)) for bucket in self._matching_buckets(cls)]
+        if not candidates:
+            return None
+        return min(candidates, key=self.key_of)
+
+    def of_type(self, cls):
+        """Узлы класса cls в порядке выделения"""
+        return sorted(
+            (node for bucket in self._matching_buckets(cls) for node in bucket),
+            key=self.key_of,
+        )
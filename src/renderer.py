@@ -0,0 +1,441 @@
+import ctypes
+
+import numpy as np
+from OpenGL.arrays import vbo
+from OpenGL.GL import (
+    glGenBuffers,
+    glEnableClientState,
+    glDisableClientState,
+    glVertexPointer,
+    glColorPointer,
+    glDrawArrays,
+    glDrawArraysInstanced,
+    glVertexAttribDivisor,
+    glVertexAttribPointer,
+    glEnableVertexAttribArray,
+    glDisableVertexAttribArray,
+    glGetAttribLocation,
+    glUseProgram,
+    glGenFramebuffers,
+    glBindFramebuffer,
+    glDeleteFramebuffers,
+    glFramebufferRenderbuffer,
+    glGenRenderbuffers,
+    glBindRenderbuffer,
+    glDeleteRenderbuffers,
+    glRenderbufferStorage,
+    GL_VERTEX_ARRAY,
+    GL_COLOR_ARRAY,
+    GL_FLOAT,
+    GL_FALSE,
+    GL_TRIANGLES,
+    GL_VERTEX_SHADER,
+    GL_FRAGMENT_SHADER,
+    GL_FRAMEBUFFER,
+    GL_RENDERBUFFER,
+    GL_RGBA8,
+    GL_DEPTH_COMPONENT24,
+    GL_COLOR_ATTACHMENT0,
+    GL_DEPTH_ATTACHMENT,
+)
+from OpenGL.GL import shaders
+
+# включается в init_renderer, пока нет контекста OpenGL рисуем по-старому
+VBO_ENABLED = False
+INSTANCING_ENABLED = False
+FRAMEBUFFERS_ENABLED = False
+
+# шейдер берёт матрицы камеры и источник света из фиксированного конвейера,
+# а матрицу узла, цвет и свечение выделения из атрибутов экземпляра
+INSTANCE_VERTEX_SHADER = """
+#version 120
+attribute vec3 position;
+attribute vec3 normal;
+attribute vec4 model0;
+attribute vec4 model1;
+attribute vec4 model2;
+attribute vec4 model3;
+attribute vec4 color;
+varying vec3 v_normal;
+varying vec4 v_color;
+void main() {
+    mat4 model = mat4(model0, model1, model2, model3);
+    v_normal = normalize(gl_NormalMatrix * mat3(model) * normal);
+    v_color = color;
+    gl_Position = gl_ModelViewProjectionMatrix * model * vec4(position, 1.0);
+}
+"""
+
+INSTANCE_FRAGMENT_SHADER = """
+#version 120
+varying vec3 v_normal;
+varying vec4 v_color;
+void main() {
+    vec3 light = normalize(gl_LightSource[0].position.xyz);
+    float diffuse = max(dot(normalize(v_normal), light), 0.0);
+    vec3 lit = v_color.rgb * (gl_LightModel.ambient.rgb + diffuse) + vec3(v_color.a);
+    gl_FragColor = vec4(lit, 1.0);
+}
+"""
+
+# call_list примитива -> InstancedMesh с той же геометрией
+INSTANCED_MESHES = dict()
+
+# call_list примитива -> [(минимальный размер на экране в пикселях, call_list)],
+# от самого подробного к самому грубому
+LOD_LEVELS = dict()
+
+_instance_program = None
+_instance_attributes = dict()
+
+
+def init_renderer():
+    """Включает отрисовку из буферов вершин, если драйвер их поддерживает,
+    и отрисовку одинаковых примитивов одним вызовом, если есть инстансинг"""
+    global VBO_ENABLED, INSTANCING_ENABLED, FRAMEBUFFERS_ENABLED, _instance_program
+    VBO_ENABLED = bool(glGenBuffers)
+    INSTANCING_ENABLED = False
+    FRAMEBUFFERS_ENABLED = bool(glGenFramebuffers)
+
+    if VBO_ENABLED and bool(glDrawArraysInstanced) and bool(glVertexAttribDivisor):
+        try:
+            _instance_program = shaders.compileProgram(
+                shaders.compileShader(INSTANCE_VERTEX_SHADER, GL_VERTEX_SHADER),
+                shaders.compileShader(INSTANCE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER),
+            )
+        except RuntimeError as error:
+            print(f"instancing disabled: {error}")
+        else:
+            for name in (
+                "position",
+                "normal",
+                "model0",
+                "model1",
+                "model2",
+                "model3",
+                "color",
+            ):
+                _instance_attributes[name] = glGetAttribLocation(
+                    _instance_program, name
+                )
+            INSTANCING_ENABLED = True
+    return VBO_ENABLED
+
+
+def vbo_enabled():
+    return VBO_ENABLED
+
+
+def instancing_enabled():
+    return INSTANCING_ENABLED
+
+
+def framebuffers_enabled():
+    return FRAMEBUFFERS_ENABLED
+
+
+def register_instanced_mesh(call_list, vertices, normals):
+    """Связывает дисплейный список примитива с такой же сеткой для инстансинга"""
+    INSTANCED_MESHES[call_list] = InstancedMesh(vertices, normals)
+
+
+def get_instanced_mesh(call_list):
+    if call_list is None:
+        return None
+    return INSTANCED_MESHES.get(call_list)
+
+
+def register_lod(call_list, levels):
+    """Задаёт уровни детализации для дисплейного списка примитива"""
+    LOD_LEVELS[call_list] = sorted(levels, key=lambda level: level[0], reverse=True)
+
+
+def has_lod(call_list):
+    return call_list is not None and call_list in LOD_LEVELS
+
+
+def select_lod(call_list, pixel_sizes):
+    """Дисплейные списки для узлов с заданными размерами на экране.
+    Узел получает самый подробный уровень, до минимума которого он дорос"""
+    levels = LOD_LEVELS.get(call_list)
+    pixel_sizes = np.asarray(pixel_sizes, dtype=float)
+    if not levels:
+        return np.full(len(pixel_sizes), call_list, dtype=object)
+    # уровни по возрастанию минимального размера для searchsorted
+    thresholds = np.array([level[0] for level in reversed(levels)])
+    lists = np.array([level[1] for level in reversed(levels)], dtype=object)
+    index = np.searchsorted(thresholds, pixel_sizes, side="right") - 1
+    return lists[np.clip(index, 0, len(lists) - 1)]
+
+
+def draw_instances(call_list, model_matrices, colors, emissions):
+    """Рисует все экземпляры примитива одним glDrawArraysInstanced"""
+    mesh = INSTANCED_MESHES[call_list]
+    glUseProgram(_instance_program)
+    try:
+        mesh.draw(_instance_attributes, model_matrices, colors, emissions)
+    finally:
+        glUseProgram(0)
+
+
+def draw_vertex_array(mode, vertices, colors=None):
+    """Рисует вершины из массива в памяти одним glDrawArrays, без VBO.
+    colors - rgb для каждой вершины, иначе действует текущий цвет"""
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    if len(vertices) == 0:
+        return
+    glEnableClientState(GL_VERTEX_ARRAY)
+    if colors is not None:
+        colors = np.ascontiguousarray(colors, dtype=np.float32).reshape(-1, 3)
+        glEnableClientState(GL_COLOR_ARRAY)
+    try:
+        glVertexPointer(3, GL_FLOAT, 0, vertices)
+        if colors is not None:
+            glColorPointer(3, GL_FLOAT, 0, colors)
+        glDrawArrays(mode, 0, len(vertices))
+    finally:
+        if colors is not None:
+            glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+
+def sphere_mesh(radius, slices, stacks):
+    """Треугольники UV-сферы (обход против часовой стрелки снаружи) и нормали"""
+    theta = np.linspace(0, np.pi, stacks + 1)
+    phi = np.linspace(0, 2 * np.pi, slices + 1)
+    grid = np.stack(
+        [
+            np.sin(theta)[:, None] * np.cos(phi)[None, :],
+            np.sin(theta)[:, None] * np.sin(phi)[None, :],
+            np.repeat(np.cos(theta)[:, None], slices + 1, axis=1),
+        ],
+        axis=-1,
+    )
+
+    top_left = grid[:-1, :-1].reshape(-1, 3)
+    top_right = grid[:-1, 1:].reshape(-1, 3)
+    bottom_left = grid[1:, :-1].reshape(-1, 3)
+    bottom_right = grid[1:, 1:].reshape(-1, 3)
+    triangles = np.stack(
+        [top_left, bottom_left, bottom_right, top_left, bottom_right, top_right],
+        axis=1,
+    ).reshape(-1, 3, 3)
+
+    # у полюсов треугольники вырождаются, убираем их
+    area = np.linalg.norm(
+        np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]),
+        axis=1,
+    )
+    # на единичной сфере нормаль совпадает с вершиной
+    normals = triangles[area > 1e-12].reshape(-1, 3)
+    return normals * radius, normals
+
+
+def cube_mesh(size):
+    """Треугольники куба с ребром size (обход против часовой стрелки снаружи)"""
+    vertices = []
+    normals = []
+    for axis in range(3):
+        for sign in (-1.0, 1.0):
+            normal = np.zeros(3)
+            normal[axis] = sign
+            u = np.zeros(3)
+            v = np.zeros(3)
+            u[(axis + 1) % 3] = 1.0
+            v[(axis + 2) % 3] = 1.0
+            if sign < 0:
+                u, v = v, u
+            center = normal * 0.5
+            quad = [
+                center - u * 0.5 - v * 0.5,
+                center + u * 0.5 - v * 0.5,
+                center + u * 0.5 + v * 0.5,
+                center - u * 0.5 + v * 0.5,
+            ]
+            for index in (0, 1, 2, 0, 2, 3):
+                vertices.append(quad[index] * size)
+                normals.append(normal)
+    return np.array(vertices), np.array(normals)
+
+
+class GeometryBuffer:
+    """Вершины примитива в VBO: загружаются при изменении геометрии,
+    а рисуются одним вызовом glDrawArrays. С colors вершины хранятся
+    вперемешку с цветом (x, y, z, r, g, b)"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.count = 0
+        self.has_colors = False
+        self._vbo = None
+
+    def update(self, vertices, colors=None):
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        self.has_colors = colors is not None
+        if self.has_colors:
+            colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+            vertices = np.hstack([vertices, colors])
+        vertices = np.ascontiguousarray(vertices)
+        if self._vbo is None:
+            self._vbo = vbo.VBO(vertices)
+        else:
+            self._vbo.set_array(vertices)
+        self.count = len(vertices)
+
+    def draw(self):
+        if self.count == 0:
+            return
+        self._vbo.bind()
+        try:
+            glEnableClientState(GL_VERTEX_ARRAY)
+            if self.has_colors:
+                stride = 6 * 4
+                glEnableClientState(GL_COLOR_ARRAY)
+                glVertexPointer(3, GL_FLOAT, stride, self._vbo)
+                glColorPointer(3, GL_FLOAT, stride, self._vbo + 3 * 4)
+            else:
+                glVertexPointer(3, GL_FLOAT, 0, self._vbo)
+            glDrawArrays(self.mode, 0, self.count)
+        finally:
+            if self.has_colors:
+                glDisableClientState(GL_COLOR_ARRAY)
+            glDisableClientState(GL_VERTEX_ARRAY)
+            self._vbo.unbind()
+
+    def delete(self):
+        if self._vbo is not None:
+            self._vbo.delete()
+            self._vbo = None
+        self.count = 0
+
+
+class InstancedMesh:
+    """Сетка примитива в VBO и буфер атрибутов экземпляров:
+    16 чисел матрицы (по столбцам), rgb цвета и яркость свечения"""
+
+    INSTANCE_SIZE = 20
+
+    def __init__(self, vertices, normals):
+        self.mesh = np.ascontiguousarray(
+            np.hstack([vertices, normals]), dtype=np.float32
+        )
+        self.count = len(self.mesh)
+        self._mesh_vbo = None
+        self._instance_vbo = None
+
+    @staticmethod
+    def pack_instances(model_matrices, colors, emissions):
+        model_matrices = np.asarray(model_matrices, dtype=np.float32)
+        instances = np.empty(
+            (len(model_matrices), InstancedMesh.INSTANCE_SIZE), dtype=np.float32
+        )
+        # OpenGL ждёт матрицы по столбцам
+        instances[:, :16] = np.transpose(model_matrices, (0, 2, 1)).reshape(-1, 16)
+        instances[:, 16:19] = colors
+        instances[:, 19] = emissions
+        return instances
+
+    def draw(self, attributes, model_matrices, colors, emissions):
+        instances = self.pack_instances(model_matrices, colors, emissions)
+        if len(instances) == 0:
+            return
+
+        if self._mesh_vbo is None:
+            self._mesh_vbo = vbo.VBO(self.mesh)
+            self._instance_vbo = vbo.VBO(instances)
+        else:
+            self._instance_vbo.set_array(instances)
+
+        float_size = 4
+        mesh_stride = 6 * float_size
+        instance_stride = self.INSTANCE_SIZE * float_size
+        per_vertex = [
+            (attributes["position"], 3, 0),
+            (attributes["normal"], 3, 3),
+        ]
+        per_instance = [
+            (attributes["model0"], 4, 0),
+            (attributes["model1"], 4, 4),
+            (attributes["model2"], 4, 8),
+            (attributes["model3"], 4, 12),
+            (attributes["color"], 4, 16),
+        ]
+
+        self._mesh_vbo.bind()
+        for location, size, offset in per_vertex:
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(
+                location,
+                size,
+                GL_FLOAT,
+                GL_FALSE,
+                mesh_stride,
+                ctypes.c_void_p(offset * float_size),
+            )
+        self._instance_vbo.bind()
+        for location, size, offset in per_instance:
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(
+                location,
+                size,
+                GL_FLOAT,
+                GL_FALSE,
+                instance_stride,
+                ctypes.c_void_p(offset * float_size),
+            )
+            glVertexAttribDivisor(location, 1)
+
+        try:
+            glDrawArraysInstanced(GL_TRIANGLES, 0, self.count, len(instances))
+        finally:
+            for location, _, _ in per_instance:
+                glVertexAttribDivisor(location, 0)
+                glDisableVertexAttribArray(location)
+            for location, _, _ in per_vertex:
+                glDisableVertexAttribArray(location)
+            self._instance_vbo.unbind()
+
+
+class PickBuffer:
+    """Внеэкранный кадр (FBO) для выбора по цвету: цвет RGBA8 и глубина.
+    Пересоздаётся только при изменении размера окна"""
+
+    def __init__(self):
+        self.size = None
+        self._framebuffer = None
+        self._renderbuffers = None
+
+    def bind(self, width, height):
+        if self.size != (width, height):
+            self.delete()
+            self._create(width, height)
+        glBindFramebuffer(GL_FRAMEBUFFER, self._framebuffer)
+
+    def unbind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+    def _create(self, width, height):
+        self._framebuffer = glGenFramebuffers(1)
+        self._renderbuffers = glGenRenderbuffers(2)
+        glBindFramebuffer(GL_FRAMEBUFFER, self._framebuffer)
+        for renderbuffer, storage, attachment in zip(
+            self._renderbuffers,
+            (GL_RGBA8, GL_DEPTH_COMPONENT24),
+            (GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT),
+        ):
+            glBindRenderbuffer(GL_RENDERBUFFER, renderbuffer)
+            glRenderbufferStorage(GL_RENDERBUFFER, storage, width, height)
+            glFramebufferRenderbuffer(
+                GL_FRAMEBUFFER, attachment, GL_RENDERBUFFER, renderbuffer
+            )
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.size = (width, height)
+
+    def delete(self):
+        if self._framebuffer is not None:
+            glDeleteFramebuffers(1, [self._framebuffer])
+            glDeleteRenderbuffers(2, self._renderbuffers)
+            self._framebuffer = None
+            self._renderbuffers = None
+        self.size = None
@@ -1,11 +1,46 @@
 import sys
+from collections import defaultdict
 
 import numpy
 import numpy as np
-from src import node
-
-from src.node import Node, ObjectWithControlPoints
-from src.premitives import Point, Line, Plane, ExtrudedPolygon, Sphere, Cube, SnowFigure
+from OpenGL.GL import (
+    glEnable,
+    glDisable,
+    glColor3f,
+    glColor3ub,
+    glIsEnabled,
+    glMaterialfv,
+    GL_CULL_FACE,
+    GL_EMISSION,
+    GL_FRONT,
+    GL_LIGHTING,
+    GL_LINES,
+)
+
+from src import node, renderer, damage
+from src.bvh import BVH
+from src.node import (
+    Node,
+    Primitive,
+    ObjectWithControlPoints,
+    ray_box_intersection,
+    get_rgb,
+    AABB,
+    AABB_EDGES,
+)
+from src.registry import NodeRegistry, SelectionIndex, key_to_color, color_to_key
+from src.renderer import GeometryBuffer
+from src.transform_store import TransformStore
+from src.premitives import (
+    Point,
+    Line,
+    Plane,
+    ExtrudedPolygon,
+    Sphere,
+    Cube,
+    SnowFigure,
+    ActivePoint,
+)
 
 
 class Scene:
@@ -14,28 +49,408 @@ class Scene:
     PLACE_DEPTH = 5.0
 
     def __init__(self):
-        self.node_list = list()
-        self.select_nodes = list()
+        self.node_list = NodeRegistry()
+        self.select_nodes = SelectionIndex()
+        self._bvh = None  # строится лениво при первом pick
+        self._render_bvh = None  # границы отрисовки, для отсечения по камере
+        self.transform_store = None  # общий массив матриц, включается по желанию
+        self.journal = None  # журнал автосохранения, подключает SceneJournal.attach
+        self.show_aabbs = True
+        self.aabb_selected_only = False  # рамки только у выделенных узлов
+        self._aabb_buffer = None
+        self._batch_buffers = dict()
+        self._batch_arrays = dict()  # (режим, выделен) -> (части, вершины, цвета)
+
+    @property
+    def node_list(self):
+        return self._node_registry
+
+    @node_list.setter
+    def node_list(self, nodes):
+        # список узлов можно заменить целиком, индексы тогда строятся заново
+        if not isinstance(nodes, NodeRegistry):
+            nodes = NodeRegistry(nodes)
+        self._node_registry = nodes
+        self._bvh = None
+        self._render_bvh = None
+
+    @property
+    def select_nodes(self):
+        return self._selection
+
+    @select_nodes.setter
+    def select_nodes(self, nodes):
+        if not isinstance(nodes, SelectionIndex):
+            nodes = SelectionIndex(nodes)
+        self._selection = nodes
 
     def add_node(self, node: Node):
         self.node_list.append(node)
+        damage.mark_dirty()
+        if self.transform_store is not None:
+            self.transform_store.attach(node)
+        if self.journal is not None:
+            self.journal.node_added(node)
+        for bvh in self.get_indexes():
+            bvh.insert(node)
+
+    def remove_node(self, node: Node):
+        self.node_list.remove(node)
+        damage.mark_dirty()
+        if self.transform_store is not None:
+            self.transform_store.detach(node)
+        if self.journal is not None:
+            self.journal.node_removed(node)
+        for bvh in self.get_indexes():
+            bvh.remove(node)
+
+    def record_change(self, changed_node):
+        """Отмечает изменённый узел для журнала автосохранения"""
+        if self.journal is not None:
+            self.journal.node_changed(changed_node)
+
+    def enable_transform_store(self, capacity=64):
+        """Переносит матрицы всех узлов сцены в один непрерывный массив"""
+        if self.transform_store is None:
+            self.transform_store = TransformStore(capacity)
+            for scene_node in self.node_list:
+                self.transform_store.attach(scene_node)
+        return self.transform_store
+
+    def translate_nodes(self, nodes, x, y, z):
+        """Сдвигает группу узлов. Простые узлы из хранилища двигаются одной
+        операцией над массивом, остальные (с точками-контроллерами) по одному"""
+        bulk_nodes = []
+        for scene_node in nodes:
+            if (
+                self.transform_store is not None
+                and scene_node._transform_store is self.transform_store
+                and getattr(type(scene_node), "translate", None) is Node.translate
+            ):
+                bulk_nodes.append(scene_node)
+            else:
+                scene_node.translate(x, y, z)
+
+        if bulk_nodes:
+            self.transform_store.translate(
+                self.transform_store.indices_of(bulk_nodes), [x, y, z]
+            )
+            damage.mark_dirty()
 
-    def render(self):
-        for node in self.node_list:
-            node.render()
+        for scene_node in nodes:
+            self.refit(scene_node)
+            self.record_change(scene_node)
+
+    def get_bvh(self):
+        if self._bvh is None:
+            self._bvh = BVH(self.node_list, lambda item: item.get_pick_bounds())
+        return self._bvh
+
+    def get_render_bvh(self):
+        if self._render_bvh is None:
+            self._render_bvh = BVH(
+                self.node_list, lambda item: item.get_render_bounds()
+            )
+        return self._render_bvh
+
+    def get_indexes(self):
+        """Уже построенные BVH, их нужно обновлять вместе со сценой"""
+        return [bvh for bvh in (self._bvh, self._render_bvh) if bvh is not None]
+
+    def refit(self, changed_node):
+        """Обновляет BVH после перемещения или масштабирования узла,
+        вместе с ним меняются его точки-контроллеры или их владелец"""
+        for bvh in self.get_indexes():
+            bvh.refit(changed_node)
+            if isinstance(changed_node, ObjectWithControlPoints):
+                for point in changed_node.control_points:
+                    bvh.refit(point)
+            if isinstance(changed_node, ActivePoint):
+                bvh.refit(changed_node.parent_object)
+
+    def get_visible_nodes(self, frustum):
+        """Узлы, чьи границы попадают в пирамиду видимости камеры"""
+        return self.get_render_bvh().query_frustum(frustum)
+
+    def render(self, frustum=None):
+        """Рисует сцену, при заданной пирамиде видимости только видимые узлы"""
+        if frustum is None:
+            nodes = self.node_list
+        else:
+            nodes = self.get_visible_nodes(frustum)
+        self.update_lod(nodes, frustum)
+
+        # сферы, кубы и точки рисуются группами, по вызову на тип примитива,
+        # плоскости, линии и многогранники - общими буферами вершин
+        instancing = renderer.instancing_enabled()
+        instanced = defaultdict(list)
+        batches = defaultdict(list)
+        for scene_node in nodes:
+            if instancing and self.is_instanced(scene_node):
+                instanced[scene_node.get_call_list()].append(scene_node)
+                continue
+            geometry = self.get_batch_geometry(scene_node)
+            if geometry is None:
+                scene_node.render(draw_aabb=False)
+                continue
+            for mode, vertices, color in geometry:
+                batches[(mode, scene_node.selected)].append((vertices, color))
+
+        for call_list, instanced_nodes in instanced.items():
+            self.render_instances(call_list, instanced_nodes)
+        self.render_batches(batches)
+
+        if self.show_aabbs:
+            self.render_aabbs(self.aabb_selected_only, nodes)
+
+    def render_ids(self, frustum=None):
+        """Рисует узлы для выбора по цвету: каждый залит цветом своего
+        номера в реестре. Освещение и сглаживание цвета должны быть выключены"""
+        if frustum is None:
+            nodes = self.node_list
+        else:
+            nodes = self.get_visible_nodes(frustum)
+        for scene_node in nodes:
+            glColor3ub(*key_to_color(self.node_list.key_of(scene_node)))
+            scene_node.render_id()
+
+    def get_node_by_color(self, color):
+        """Узел, чьим номером окрашен пиксель, None для фона"""
+        key = color_to_key(color)
+        if key is None:
+            return None
+        return self.node_list.get(key)
+
+    def update_lod(self, nodes, frustum):
+        """Выбирает детализацию сфер и точек по их размеру на экране,
+        без пирамиды видимости рисуется самый подробный уровень"""
+        lod_nodes = defaultdict(list)
+        for scene_node in nodes:
+            if isinstance(scene_node, Primitive) and renderer.has_lod(
+                scene_node.call_list
+            ):
+                lod_nodes[scene_node.call_list].append(scene_node)
+
+        for call_list, group in lod_nodes.items():
+            bounds = np.array([n.aabb.bounds for n in group])
+            translations = np.array([n.translation_matrix[:3, 3] for n in group])
+            centers = translations + bounds.mean(axis=1)
+            radii = (bounds[:, 1] - bounds[:, 0]).max(axis=1) / 2
+            sizes = None
+            if frustum is not None:
+                sizes = frustum.projected_sizes(centers, radii)
+            if sizes is None:
+                for scene_node in group:
+                    scene_node.lod_call_list = None
+                continue
+            for scene_node, lod_call_list in zip(
+                group, renderer.select_lod(call_list, sizes)
+            ):
+                scene_node.lod_call_list = lod_call_list
+
+    def get_aabb_lines(self, nodes):
+        """Вершины рёбер AABB узлов в координатах сцены одним массивом (N * 24, 3).
+        Рамка рисуется со сдвигом узла, но без его масштаба, как в Node.render"""
+        nodes = [n for n in nodes if isinstance(getattr(n, "aabb", None), AABB)]
+        if not nodes:
+            return np.empty((0, 3))
+        edges = np.array([n.aabb.vertices[AABB_EDGES] for n in nodes])
+        translations = np.array([n.translation_matrix for n in nodes], dtype=float)
+        lines = np.einsum("nij,nkmj->nkmi", translations[:, :3, :3], edges)
+        lines += translations[:, None, None, :3, 3]
+        return lines.reshape(-1, 3)
+
+    def render_aabbs(self, selected_only=False, nodes=None):
+        """Рисует рамки всех узлов за один вызов, вместо отдельного
+        glBegin/glEnd и переключения освещения на каждый узел"""
+        if nodes is None:
+            nodes = self.node_list
+        if selected_only:
+            nodes = [n for n in nodes if n in self.select_nodes]
+        lines = self.get_aabb_lines(nodes)
+        if len(lines) == 0:
+            return
+
+        glDisable(GL_LIGHTING)
+        glColor3f(1, 1, 1)
+        if renderer.vbo_enabled():
+            if self._aabb_buffer is None:
+                self._aabb_buffer = GeometryBuffer(GL_LINES)
+            self._aabb_buffer.update(lines)
+            self._aabb_buffer.draw()
+        else:
+            renderer.draw_vertex_array(GL_LINES, lines)
+        glEnable(GL_LIGHTING)
+
+    @staticmethod
+    def get_batch_geometry(scene_node):
+        if not isinstance(scene_node, ObjectWithControlPoints):
+            return None
+        return scene_node.get_batch_geometry()
+
+    def get_batch_arrays(self, key, parts):
+        """Вершины и цвета группы одним массивом. Собираются заново, только
+        если изменился состав группы или геометрия кого-то из её узлов
+        (узел тогда отдаёт новый массив вершин). Третье - были ли изменения"""
+        cached = self._batch_arrays.get(key)
+        if (
+            cached is not None
+            and len(cached[0]) == len(parts)
+            and all(
+                vertices is old_vertices and color == old_color
+                for (vertices, color), (old_vertices, old_color) in zip(
+                    parts, cached[0]
+                )
+            )
+        ):
+            return cached[1], cached[2], False
+        vertices = np.concatenate([part[0] for part in parts])
+        colors = np.repeat(
+            [part[1] for part in parts], [len(part[0]) for part in parts], axis=0
+        )
+        self._batch_arrays[key] = (list(parts), vertices, colors)
+        return vertices, colors, True
+
+    def render_batches(self, batches):
+        """Рисует собранную геометрию одним glDrawArrays на режим, цвет узла
+        задаётся каждой вершине. Выделенные идут отдельным вызовом со свечением.
+        Общий буфер перезаливается, только когда изменился кто-то из его узлов"""
+        for key in set(self._batch_arrays) - set(batches):
+            del self._batch_arrays[key]
+        if not batches:
+            return
+        cull_face_enabled = glIsEnabled(GL_CULL_FACE)
+        glDisable(GL_CULL_FACE)
+        for (mode, selected), parts in batches.items():
+            vertices, colors, changed = self.get_batch_arrays((mode, selected), parts)
+            if selected:
+                glMaterialfv(GL_FRONT, GL_EMISSION, [0.3, 0.3, 0.3])
+            buffer = self._batch_buffers.get((mode, selected))
+            if renderer.vbo_enabled():
+                if buffer is None:
+                    buffer = GeometryBuffer(mode)
+                    self._batch_buffers[(mode, selected)] = buffer
+                    changed = True
+                if changed:
+                    buffer.update(vertices, colors)
+                buffer.draw()
+            else:
+                if changed and buffer is not None:
+                    # без VBO буфер не обновляется, устаревший удаляем
+                    self._batch_buffers.pop((mode, selected)).delete()
+                renderer.draw_vertex_array(mode, vertices, colors)
+            if selected:
+                glMaterialfv(GL_FRONT, GL_EMISSION, [0.0, 0.0, 0.0])
+        if cull_face_enabled:
+            glEnable(GL_CULL_FACE)
+
+    @staticmethod
+    def is_instanced(scene_node):
+        """Узел можно рисовать инстансингом, если он рисуется только своим
+        дисплейным списком и для списка есть такая же сетка"""
+        return (
+            isinstance(scene_node, Primitive)
+            and type(scene_node).render is Node.render
+            and type(scene_node).render_self is Primitive.render_self
+            and renderer.get_instanced_mesh(scene_node.call_list) is not None
+        )
+
+    def get_model_matrices(self, nodes):
+        """Матрицы translation @ scaling узлов одним массивом (N, 4, 4)"""
+        store = self.transform_store
+        if store is not None and all(n._transform_store is store for n in nodes):
+            return store.model_matrices(store.indices_of(nodes))
+        return np.array([n.translation_matrix for n in nodes]) @ np.array(
+            [n.scaling_matrix for n in nodes]
+        )
+
+    def render_instances(self, call_list, nodes):
+        colors = np.array([get_rgb(n.colors[n.color_index]) for n in nodes])
+        emissions = np.array([0.3 if n.selected else 0.0 for n in nodes])
+        renderer.draw_instances(
+            call_list, self.get_model_matrices(nodes), colors, emissions
+        )
 
     def apply_for_each_select_nodes(self, function):
         for select_node in self.select_nodes:
             function(select_node)
 
-    def pick(self, start, direction, mat, multiple_choice):
+    def pick_batch(self, start, direction, mat, nodes=None):
+        """Ищет ближайший задетый лучом узел. Узлы со стандартным Node.pick
+        проверяются все сразу: матрицы складываются в массив (N, 4, 4), а
+        обращение матриц и тест с AABB делаются одним вызовом NumPy.
+        Возвращает (узел, расстояние) или (None, None)"""
+        if nodes is None:
+            nodes = self.node_list
+
+        batch_nodes = []
         mindist = sys.maxsize
         closest_node = None
-        for node in self.node_list:
+        for node in nodes:
+            if getattr(type(node), "pick", None) is Node.pick and node.aabb is not None:
+                batch_nodes.append(node)
+                continue
+            # у плоскостей и многогранников своя проверка
             hit, distance = node.pick(start, direction, mat)
             if hit and distance < mindist:
                 mindist, closest_node = distance, node
 
+        if batch_nodes:
+            store = self.transform_store
+            if store is not None and all(
+                n._transform_store is store for n in batch_nodes
+            ):
+                indices = store.indices_of(batch_nodes)
+                translations = store.translations[indices].astype(float)
+                scalings = store.scalings[indices].astype(float)
+            else:
+                translations = np.array([n.translation_matrix for n in batch_nodes])
+                scalings = np.array([n.scaling_matrix for n in batch_nodes])
+            bounds = np.array([n.aabb.bounds for n in batch_nodes])
+
+            # то же, что Node.pick и AABB.ray_hit, но для всех узлов сразу
+            new_mats = np.asarray(mat) @ translations @ np.linalg.inv(scalings)
+            local_starts = np.einsum(
+                "nij,j->ni", np.linalg.inv(new_mats), np.append(start, 1)
+            )[:, :3]
+            local_directions = np.einsum("nji,j->ni", new_mats[:, :3, :3], direction)
+            local_directions /= np.linalg.norm(local_directions, axis=1)[:, None]
+
+            hit, t = ray_box_intersection(
+                local_starts, local_directions, bounds[:, 0], bounds[:, 1]
+            )
+            hit_indices = np.nonzero(hit)[0]
+            if len(hit_indices):
+                locations = (
+                    local_starts[hit_indices]
+                    + local_directions[hit_indices] * t[hit_indices, None]
+                )
+                distances = np.linalg.norm(start - locations, axis=1)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] < mindist:
+                    mindist = distances[nearest]
+                    closest_node = batch_nodes[hit_indices[nearest]]
+
+        if closest_node is None:
+            return None, None
+        return closest_node, mindist
+
+    def pick(self, start, direction, mat, multiple_choice):
+        # переводим луч в мировую ск и отсекаем узлы, чьи границы он не задевает
+        world_start = numpy.dot(numpy.linalg.inv(mat), np.append(start, 1))[:3]
+        world_direction = numpy.dot(numpy.transpose(mat)[:3, :3], direction)
+
+        closest_node, mindist = self.pick_batch(
+            start,
+            direction,
+            mat,
+            self.get_bvh().query_ray(world_start, world_direction),
+        )
+        self.select_picked(closest_node, mindist, start, direction, multiple_choice)
+
+    def select_picked(self, closest_node, mindist, start, direction, multiple_choice):
+        """Выделяет найденный узел (или снимает выделение при промахе)
+        и строит плоскость, если выделенное это позволяет"""
         if closest_node is not None and (
             not self.select_nodes or self.select_nodes and multiple_choice
         ):
@@ -44,46 +459,21 @@ class Scene:
             closest_node.depth = mindist
             closest_node.selected_loc = start + direction * mindist
             self.select_nodes.append(closest_node)
+            selection = self.select_nodes
 
-            def find_element(primitive):
-                return list(
-                    filter(
-                        lambda select_node: isinstance(select_node, primitive),
-                        self.select_nodes,
-                    )
-                )[0]
-
-            def instance_in_collection(primitive):
-                return any(
-                    (
-                        isinstance(select_node, primitive)
-                        for select_node in self.select_nodes
-                    )
-                )
-
-            if len(self.select_nodes) == 3 and all(
-                (isinstance(select_node, Point) for select_node in self.select_nodes)
-            ):
+            if len(selection) == 3 and selection.only(Point):
                 self.create_plane_from_three_points(
-                    *[select_node.get_position() for select_node in self.select_nodes]
+                    *[select_node.get_position() for select_node in selection]
                 )
-                for point in self.select_nodes:
-                    self.node_list.remove(point)
-            elif (
-                len(self.select_nodes) == 2
-                and instance_in_collection(Point)
-                and instance_in_collection(Line)
-            ):
+                for point in selection:
+                    self.remove_node(point)
+            elif len(selection) == 2 and selection.has(Point) and selection.has(Line):
                 self.create_plane_from_line_and_point(
-                    find_element(Line), find_element(Point)
+                    selection.first(Line), selection.first(Point)
                 )
-            elif (
-                len(self.select_nodes) == 2
-                and instance_in_collection(Plane)
-                and instance_in_collection(Point)
-            ):
+            elif len(selection) == 2 and selection.has(Plane) and selection.has(Point):
                 self.create_plane_from_plane_and_point(
-                    find_element(Plane), find_element(Point)
+                    selection.first(Plane), selection.first(Point)
                 )
 
         elif self.select_nodes:
@@ -92,6 +482,58 @@ class Scene:
             )
             self.select_nodes.clear()
 
+    def select_in_region(
+        self, frustum, multiple_choice=False, start=None, direction=None, mat=None
+    ):
+        """Выделяет все узлы, чьи границы целиком попадают в пирамиду
+        прямоугольника выделения. Кандидатов даёт BVH, а проверка коробок
+        делается одним вызовом NumPy. Точки-контроллеры не выделяются,
+        они двигаются и удаляются вместе со своими объектами.
+        start, direction - луч через центр рамки, mat - матрица вида. Как и в
+        select_picked, точка захвата лежит на луче на глубине узла, так что
+        перетаскивание двигает узлы относительно их места"""
+        if not multiple_choice:
+            self.apply_for_each_select_nodes(
+                lambda select_node: select_node.select(False)
+            )
+            self.select_nodes.clear()
+
+        candidates = []
+        bounds = []
+        for scene_node in self.get_render_bvh().query_frustum(frustum):
+            if isinstance(scene_node, ActivePoint):
+                continue
+            node_bounds = scene_node.get_render_bounds()
+            if node_bounds is None:
+                continue
+            candidates.append(scene_node)
+            bounds.append(node_bounds)
+        if not candidates:
+            return []
+
+        bounds = np.asarray(bounds, dtype=float)
+        inside = frustum.boxes_inside(bounds[:, 0], bounds[:, 1])
+        selected = [n for n, hit in zip(candidates, inside) if hit]
+        if not selected:
+            return selected
+
+        # центры рамок переводим в ск вида, где двигает move_selected
+        mat = np.identity(4) if mat is None else np.asarray(mat, dtype=float)
+        start = np.zeros(3) if start is None else np.asarray(start, dtype=float)
+        if direction is None:
+            direction = np.array([0.0, 0.0, -1.0])  # камера смотрит вдоль -z
+        centers = bounds[inside].mean(axis=1)
+        view_centers = centers @ mat[:3, :3].T + mat[:3, 3]
+        depths = np.linalg.norm(view_centers - start, axis=1)
+
+        for scene_node, depth in zip(selected, depths):
+            scene_node.depth = depth
+            scene_node.selected_loc = start + direction * depth
+            if scene_node not in self.select_nodes:
+                scene_node.select(True)
+                self.select_nodes.append(scene_node)
+        return selected
+
     def create_plane_from_three_points(self, point1, point2, point3):
         new_plane = Plane.from_three_points(point1, point2, point3)
         self.add_node(new_plane)
@@ -123,44 +565,55 @@ class Scene:
             self.add_node(control_point)
 
     def dissection_plane(self):
-        if len(self.select_nodes) == 2 and all(
-            (isinstance(select_node, Plane) for select_node in self.select_nodes)
-        ):
-            for point in self.select_nodes[0].control_points:
-                self.node_list.remove(point)
-            self.select_nodes[0].intersect_with_plane(self.select_nodes[1])
-            for point in self.select_nodes[0].control_points:
-                self.node_list.append(point)
+        if len(self.select_nodes) == 2 and self.select_nodes.only(Plane):
+            plane, other_plane = self.select_nodes
+            for point in plane.control_points:
+                self.remove_node(point)
+            plane.intersect_with_plane(other_plane)
+            self.refit(plane)
+            self.record_change(plane)
+            for point in plane.control_points:
+                self.add_node(point)
 
     def extruded_plane(self):
-        if len(self.select_nodes) == 1 and isinstance(self.select_nodes[0], Plane):
-            extruded_polygon = ExtrudedPolygon(self.select_nodes[0])
+        if len(self.select_nodes) == 1 and self.select_nodes.only(Plane):
+            (plane,) = self.select_nodes
+            extruded_polygon = ExtrudedPolygon(plane)
             self.add_node(extruded_polygon)
             for control_point in extruded_polygon.control_points:
                 self.add_node(control_point)
-            for point in self.select_nodes[0].control_points:
-                self.node_list.remove(point)
-            self.node_list.remove(self.select_nodes[0])
+            for point in plane.control_points:
+                self.remove_node(point)
+            self.remove_node(plane)
             self.select_nodes.clear()
 
     def scale_selected(self, up):
         if not self.select_nodes:
             return
-        self.apply_for_each_select_nodes(lambda select_node: select_node.scale(up))
+
+        def scale_each_node(select_node):
+            select_node.scale(up)
+            self.refit(select_node)
+            self.record_change(select_node)
+
+        self.apply_for_each_select_nodes(scale_each_node)
 
     def rotate_selected_color(self, forwards):
         if not self.select_nodes:
             return
-        self.apply_for_each_select_nodes(
-            lambda select_node: select_node.rotate_color(forwards)
-        )
+
+        def rotate_each_color(select_node):
+            select_node.rotate_color(forwards)
+            self.record_change(select_node)
+
+        self.apply_for_each_select_nodes(rotate_each_color)
 
     def delete_selected(self):
         for select_node in self.select_nodes:
             if isinstance(select_node, ObjectWithControlPoints):
                 for point in select_node.control_points:
-                    self.node_list.remove(point)
-            self.node_list.remove(select_node)
+                    self.remove_node(point)
+            self.remove_node(select_node)
         self.select_nodes.clear()
 
     def move_selected(self, start, direction, inv_modelview):
@@ -181,6 +634,8 @@ class Scene:
 
             node.translate(translation[0], translation[1], translation[2])
             node.selected_loc = newloc
+            self.refit(node)
+            self.record_change(node)
 
         self.apply_for_each_select_nodes(move_each_node)
 
@@ -192,22 +647,15 @@ class Scene:
         new_node.child_nodes = self.select_nodes[:]
 
         # Обновляем AABB для нового узла, используя все дочерние узлы
-        min_corner = np.min(
-            [child.get_transformed_aabb().min_point for child in new_node.child_nodes],
-            axis=0,
-        )
-        max_corner = np.max(
-            [child.get_transformed_aabb().max_point for child in new_node.child_nodes],
-            axis=0,
-        )
-        new_node.aabb = node.AABB(min_corner, max_corner)
+        new_node.fit_aabb()
 
         # Добавляем новый узел в сцену и очищаем список выделенных узлов
-        self.node_list.append(new_node)
+        self.add_node(new_node)
         self.delete_selected()
 
         for child_node in new_node.child_nodes:
             child_node.color_index = len(self.node_list)
+        self.record_change(new_node)
 
         return new_node
 
@@ -231,4 +679,6 @@ class Scene:
         translation = inv_modelview.dot(pre_tran)
 
         new_node.translate(translation[0], translation[1], translation[2])
+        self.refit(new_node)
+        self.record_change(new_node)
         print(f"new node: {str(new_node)}")
@@ -6,18 +6,12 @@ from json import JSONEncoder
 import numpy as np
 from OpenGL.raw.GL.VERSION.GL_1_0 import GL_FRONT, glReadBuffer
 
-from src.node import HierarchicalNode, ObjectWithControlPoints
-from src.premitives import (
-    ActivePoint,
-    Cube,
-    Sphere,
-    SnowFigure,
-    Line,
-    Point,
-    Plane,
-    ExtrudedPolygon,
-)
+from src.node import ObjectWithControlPoints, node_from_dict
+from src.premitives import ActivePoint
 from src.scene import Scene
+from src import software_renderer
+from src.binary_scene import BINARY_EXTENSION, write_scene_data, read_scene_nodes
+from src.json_stream import JSONStreamReader
 from OpenGL.GL import glReadPixels, GL_RGB, GL_UNSIGNED_BYTE
 from PIL import Image
 from OpenGL.GLUT import glutGet, GLUT_WINDOW_WIDTH, GLUT_WINDOW_HEIGHT
@@ -27,7 +21,7 @@ SAVE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
 
 class NumpyArrayEncoder(JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, np.ndarray):
+        if isinstance(obj, (np.ndarray, np.generic)):
             return obj.tolist()
         return JSONEncoder.default(self, obj)
 
@@ -36,7 +30,8 @@ def get_name_file_for_save_scene():
     return f'scene_{str(datetime.now()).replace(":", "-").split(".")[0]}'
 
 
-def save_scene(scene):
+def save_scene(scene, binary=False):
+    """Сохраняет сцену в JSON или, при binary=True, в компактный двоичный файл"""
     scene_data = {
         "nodes": [
             node.to_dict()
@@ -47,12 +42,26 @@ def save_scene(scene):
 
     name_with_date = get_name_file_for_save_scene()
 
+    if binary:
+        write_scene_data(
+            scene_data,
+            os.path.join(SAVE_DIRECTORY, name_with_date + BINARY_EXTENSION),
+        )
+        print("Scene saved")
+        return
+
     with open(f"./{SAVE_DIRECTORY}/{name_with_date}.json", "w") as file:
         json.dump(scene_data, file, indent=4, cls=NumpyArrayEncoder)  # отступ от :
     print("Scene saved")
 
 
 def load_scene(filename):
+    if filename.endswith(BINARY_EXTENSION):
+        scene = Scene()
+        for node in read_scene_nodes(f"{SAVE_DIRECTORY}/{filename}"):
+            add_node(scene, node)
+        print("Scene is loaded")
+        return scene
     with open(f"{SAVE_DIRECTORY}/{filename}", "r") as file:
         scene_data = json.load(file)
     return load_data(scene_data)
@@ -62,54 +71,46 @@ def load_data(scene_data):
     scene = Scene()
 
     for node_data in scene_data["nodes"]:
-        node_type = node_data["type"]
-        node = None
-
-        if node_type == "Cube":
-            node = Cube()
-
-        elif node_type == "Sphere":
-            node = Sphere()
-
-        elif node_type == "SnowFigure":
-            node = SnowFigure()
-
-        elif node_type == "Line":
-            node = Line([0, 0, 0], [1, 1, 1])
-
-        elif node_type == "Point":
-            node = Point()
+        add_node_data(scene, node_data)
 
-        elif node_type == "Plane":
-            node = Plane()
+    print("Scene is loaded")
+    return scene
 
-        elif node_type == "ExtrudedPolygon":
-            node = ExtrudedPolygon(Plane())
 
-        elif node_type == "HierarchicalNode":
-            node = HierarchicalNode()
-            node.child_nodes = node_data.get("children", [])
+def stream_scene(filename, scene=None, progress=None):
+    """Загружает JSON-сцену по одному узлу, не читая файл целиком.
+    Генератор: добавляет очередной узел в scene и отдаёт его, так что сцену
+    можно показывать до конца загрузки. progress(узлов, прочитано байт,
+    размер файла) вызывается после каждого узла"""
+    scene = Scene() if scene is None else scene
+    path = f"{SAVE_DIRECTORY}/{filename}"
+    total_bytes = os.path.getsize(path)
 
-        if node:
-            node.color_index = node_data.get("color_index", 0)
-            position = node_data.get("position", [0, 0, 0])
-            node.translate(*position)
+    with open(path, "rb") as file:
+        reader = JSONStreamReader(file)
+        for count, node_data in enumerate(reader.iter_member_array("nodes"), 1):
+            node = add_node_data(scene, node_data)
+            if progress is not None:
+                progress(count, reader.bytes_read, total_bytes)
+            yield node
 
-            if isinstance(node, ObjectWithControlPoints):
-                node.corners = np.array(node_data.get("corners"))
-                node.create_control_points()
-                for control_point in node.control_points:
-                    scene.add_node(control_point)
 
-                if isinstance(node, ExtrudedPolygon):
-                    node.update_planes()
-                elif isinstance(node, Line):
-                    node.update_aabb()
+def add_node_data(scene, node_data):
+    """Создаёт узел по словарю из файла и добавляет его в сцену вместе
+    с контрольными точками. Неизвестный тип пропускается (None)"""
+    node = node_from_dict(node_data)
+    if node is None:
+        return None
+    return add_node(scene, node)
 
-            scene.add_node(node)
 
-    print("Scene is loaded")
-    return scene
+def add_node(scene, node):
+    """Добавляет загруженный узел в сцену вместе с контрольными точками"""
+    if isinstance(node, ObjectWithControlPoints):
+        for control_point in node.control_points:
+            scene.add_node(control_point)
+    scene.add_node(node)
+    return node
 
 
 def get_saved_scenes():
@@ -120,6 +121,20 @@ def get_saved_scenes():
     ]
 
 
+def get_scene_size(filename):
+    return os.path.getsize(os.path.join(SAVE_DIRECTORY, filename))
+
+
+def get_image_directory():
+    return SAVE_DIRECTORY.replace(
+        os.path.basename(SAVE_DIRECTORY), "Save_scene_as_image"
+    )
+
+
+def get_autosave_directory():
+    return SAVE_DIRECTORY.replace(os.path.basename(SAVE_DIRECTORY), "Autosave")
+
+
 def export_scene_to_image():
     width = glutGet(GLUT_WINDOW_WIDTH)
     height = glutGet(GLUT_WINDOW_HEIGHT)
@@ -133,9 +148,7 @@ def export_scene_to_image():
     image = np.flipud(image)
 
     filename = get_name_file_for_save_scene() + ".png"
-    path = SAVE_DIRECTORY.replace(
-        os.path.basename(SAVE_DIRECTORY), "Save_scene_as_image"
-    )
+    path = get_image_directory()
 
     if not os.path.exists(path):
         os.makedirs(path)
@@ -145,3 +158,12 @@ def export_scene_to_image():
     img = Image.fromarray(image)
     img.save(path)
     print(f"Scene in image format saved as {filename}")
+
+
+def render_scene_to_image(filename, path, width=640, height=480, camera=None):
+    """Рисует сохранённую сцену в PNG без окна и OpenGL"""
+    scene = load_scene(filename)
+    image = software_renderer.render_image(scene, width, height, camera)
+    Image.fromarray(image).save(path)
+    return path
+
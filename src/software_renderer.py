@@ -0,0 +1,229 @@
+import numpy as np
+from matplotlib import colors as mcolors
+
+from src.frustum import perspective
+from src.interaction import Trackball
+from src.node import HierarchicalNode, translation
+from src.premitives import Point, Sphere, Cube, Plane, Line, ExtrudedPolygon
+from src.renderer import sphere_mesh, cube_mesh
+
+# те же настройки, что у окна во viewer
+BACKGROUND = (0.4, 0.4, 0.4)
+GRID_COLOR = (0.8, 0.8, 0.8)
+EDGE_COLOR = (1.0, 1.0, 1.0)
+AMBIENT = 0.2  # фоновый свет фиксированного конвейера по умолчанию
+LIGHT_DIRECTION = np.array([0.0, 0.0, 1.0])  # GL_LIGHT0, в ск камеры
+
+# треугольники дисплейных списков примитивов, в порядке проверки isinstance
+PRIMITIVE_MESHES = (
+    (Point, sphere_mesh(0.08, 8, 8)[0]),
+    (Sphere, sphere_mesh(0.5, 20, 20)[0]),
+    (Cube, cube_mesh(1.0)[0]),
+)
+
+
+def default_camera(width, height, offset=(0, 0, 0), theta=-25, phi=0, distance=15):
+    """Матрицы (projection, modelview) камеры, какой её видит окно при запуске"""
+    projection = perspective(70, width / height, 0.1, 1000.0) @ translation([0, 0, -15])
+    # glMultMatrixf читает матрицу трекбола по столбцам
+    modelview = translation(offset) @ Trackball(theta, phi, distance).matrix.T
+    return projection, modelview
+
+
+def get_node_geometry(node):
+    """Треугольники (N, 3, 3) и отрезки (M, 2, 3) узла в его ск,
+    цвет отрезков (None - цвет узла)"""
+    no_triangles = np.empty((0, 3, 3))
+    no_lines = np.empty((0, 2, 3))
+    for primitive_class, mesh in PRIMITIVE_MESHES:
+        if isinstance(node, primitive_class):
+            return mesh.reshape(-1, 3, 3), no_lines, None
+    if isinstance(node, ExtrudedPolygon):
+        return (
+            node.get_face_vertices().reshape(-1, 3, 3),
+            node.get_geometry_vertices().reshape(-1, 2, 3),
+            EDGE_COLOR,
+        )
+    if isinstance(node, Plane) and node.corners is not None:
+        # полоса из четырёх углов
+        corners = np.asarray(node.corners, dtype=float)
+        return corners[[[0, 1, 2], [2, 1, 3]]], no_lines, None
+    if isinstance(node, Line) and node.corners is not None:
+        return no_triangles, np.asarray(node.corners, dtype=float)[None], None
+    return no_triangles, no_lines, None
+
+
+def collect_geometry(nodes):
+    """Треугольники и отрезки всех узлов в мировой ск вместе с их цветами"""
+    triangles = [np.empty((0, 3, 3))]
+    triangle_colors = [np.empty((0, 3))]
+    lines = [np.empty((0, 2, 3))]
+    line_colors = [np.empty((0, 3))]
+
+    def transform(points, model):
+        return points @ model[:3, :3].T + model[:3, 3]
+
+    def visit(scene_node, parent):
+        model = parent @ scene_node.translation_matrix @ scene_node.scaling_matrix
+        color = mcolors.to_rgb(scene_node.colors[scene_node.color_index])
+        if isinstance(scene_node, HierarchicalNode):
+            for child in scene_node.child_nodes:
+                visit(child, model)
+            return
+        node_triangles, node_lines, line_color = get_node_geometry(scene_node)
+        triangles.append(transform(node_triangles, model))
+        triangle_colors.append(np.tile(color, (len(node_triangles), 1)))
+        lines.append(transform(node_lines, model))
+        line_colors.append(np.tile(line_color or color, (len(node_lines), 1)))
+
+    for scene_node in nodes:
+        visit(scene_node, np.identity(4))
+    return (
+        np.concatenate(triangles),
+        np.concatenate(triangle_colors),
+        np.concatenate(lines),
+        np.concatenate(line_colors),
+    )
+
+
+def grid_lines(size=50, step=1):
+    """Отрезки сетки, как в Viewer.draw_grid"""
+    lines = []
+    for i in range(-size, size + 1, step):
+        lines.append([[i, 0, -size], [i, 0, size]])
+        lines.append([[-size, 0, i], [size, 0, i]])
+    return np.array(lines, dtype=float)
+
+
+class SoftwareRasterizer:
+    """Растеризация треугольников и отрезков в массивы NumPy с буфером глубины.
+    Не требует окна и OpenGL, поэтому подходит для серверов без GPU.
+    Треугольники, задевающие плоскость камеры, отбрасываются целиком"""
+
+    def __init__(self, width, height, matrix):
+        self.width = width
+        self.height = height
+        self.matrix = np.asarray(matrix, dtype=float)  # projection @ modelview
+        self.color = np.empty((height, width, 3))
+        self.color[:] = BACKGROUND
+        self.depth = np.full((height, width), np.inf)
+
+    def project(self, points):
+        """Точки (..., 3) в пиксели окна: x, y (строки сверху вниз), глубина и w"""
+        clip = points @ self.matrix[:3, :3].T + self.matrix[:3, 3]
+        w = points @ self.matrix[3, :3] + self.matrix[3, 3]
+        safe_w = np.where(np.abs(w) < 1e-9, 1e-9, w)
+        ndc = clip / safe_w[..., None]
+        x = (ndc[..., 0] + 1) / 2 * self.width
+        y = (1 - ndc[..., 1]) / 2 * self.height
+        return x, y, ndc[..., 2], w
+
+    def draw_triangles(self, triangles, colors):
+        x, y, z, w = self.project(triangles)
+        in_front = np.all(w > 1e-6, axis=1)
+        for i in np.flatnonzero(in_front):
+            self._draw_triangle(x[i], y[i], z[i], colors[i])
+
+    def _draw_triangle(self, x, y, z, color):
+        x0 = max(int(np.floor(x.min())), 0)
+        x1 = min(int(np.ceil(x.max())), self.width)
+        y0 = max(int(np.floor(y.min())), 0)
+        y1 = min(int(np.ceil(y.max())), self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        area = (x[1] - x[0]) * (y[2] - y[0]) - (x[2] - x[0]) * (y[1] - y[0])
+        if abs(area) < 1e-12:
+            return
+
+        # центры пикселей рамки треугольника и их барицентрические координаты
+        px, py = np.meshgrid(np.arange(x0, x1) + 0.5, np.arange(y0, y1) + 0.5)
+        w0 = ((x[1] - px) * (y[2] - py) - (x[2] - px) * (y[1] - py)) / area
+        w1 = ((x[2] - px) * (y[0] - py) - (x[0] - px) * (y[2] - py)) / area
+        w2 = 1 - w0 - w1
+        inside = (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+        depth = w0 * z[0] + w1 * z[1] + w2 * z[2]
+
+        depth_region = self.depth[y0:y1, x0:x1]
+        visible = inside & (depth < depth_region) & (depth >= -1) & (depth <= 1)
+        depth_region[visible] = depth[visible]
+        self.color[y0:y1, x0:x1][visible] = color
+
+    def clip_lines(self, lines):
+        """Обрезает отрезки (N, 2, 3) по пирамиде видимости (Лианг-Барски
+        в однородных координатах). Возвращает обрезанные отрезки и маску
+        оставшихся"""
+        lines = np.asarray(lines, dtype=float)
+        clip = lines @ self.matrix[:, :3].T + self.matrix[:, 3]
+        # расстояния до шести плоскостей: w + x, w - x, w + y, w - y, w + z, w - z
+        signs = np.array([1, -1, 1, -1, 1, -1])
+        axes = np.array([0, 0, 1, 1, 2, 2])
+        distances = clip[..., 3:4] + signs * clip[..., axes]  # (N, 2, 6)
+        start, end = distances[:, 0], distances[:, 1]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = start / (start - end)
+        t_enter = np.max(np.where((start < 0) & (end >= 0), t, 0.0), axis=1)
+        t_exit = np.min(np.where((end < 0) & (start >= 0), t, 1.0), axis=1)
+        outside = np.any((start < 0) & (end < 0), axis=1)
+        keep = ~outside & (t_enter <= t_exit)
+
+        direction = lines[keep, 1] - lines[keep, 0]
+        clipped = np.stack(
+            [
+                lines[keep, 0] + direction * t_enter[keep, None],
+                lines[keep, 0] + direction * t_exit[keep, None],
+            ],
+            axis=1,
+        )
+        return clipped, keep
+
+    def draw_lines(self, lines, colors, depth_bias=1e-4):
+        lines, keep = self.clip_lines(lines)
+        colors = np.asarray(colors)[keep]
+        x, y, z, w = self.project(lines)
+        for i in range(len(lines)):
+            length = np.hypot(x[i, 1] - x[i, 0], y[i, 1] - y[i, 0])
+            t = np.linspace(0.0, 1.0, int(np.ceil(length)) + 1)
+            px = np.floor(x[i, 0] + (x[i, 1] - x[i, 0]) * t).astype(int)
+            py = np.floor(y[i, 0] + (y[i, 1] - y[i, 0]) * t).astype(int)
+            pz = z[i, 0] + (z[i, 1] - z[i, 0]) * t - depth_bias
+            on_screen = (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+            px, py, pz = px[on_screen], py[on_screen], pz[on_screen]
+            visible = (pz < self.depth[py, px]) & (pz >= -1) & (pz <= 1)
+            self.depth[py[visible], px[visible]] = pz[visible]
+            self.color[py[visible], px[visible]] = colors[i]
+
+    def get_image(self):
+        """Кадр (height, width, 3) в uint8, первая строка - верх"""
+        return (np.clip(self.color, 0, 1) * 255).round().astype(np.uint8)
+
+
+def shade(triangles, colors, light_direction):
+    """Плоское освещение по Ламберту, как у фиксированного конвейера"""
+    normals = np.cross(
+        triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]
+    )
+    lengths = np.linalg.norm(normals, axis=1)
+    normals /= np.where(lengths == 0, 1, lengths)[:, None]
+    diffuse = np.maximum(normals @ light_direction, 0)
+    return np.clip(colors * (AMBIENT + diffuse)[:, None], 0, 1)
+
+
+def render_image(scene, width, height, camera=None, draw_grid=True):
+    """Рисует сцену без OpenGL и возвращает кадр (height, width, 3) uint8.
+    camera - пара (projection, modelview), по умолчанию стартовая камера окна"""
+    projection, modelview = camera or default_camera(width, height)
+    rasterizer = SoftwareRasterizer(width, height, projection @ modelview)
+
+    triangles, triangle_colors, lines, line_colors = collect_geometry(scene.node_list)
+    # источник света задан в ск камеры, переводим направление в мировую
+    light_direction = np.linalg.inv(modelview)[:3, :3] @ LIGHT_DIRECTION
+    light_direction /= np.linalg.norm(light_direction)
+    rasterizer.draw_triangles(
+        triangles, shade(triangles, triangle_colors, light_direction)
+    )
+    rasterizer.draw_lines(lines, line_colors)
+    if draw_grid:
+        grid = grid_lines()
+        rasterizer.draw_lines(grid, np.tile(GRID_COLOR, (len(grid), 1)))
+    return rasterizer.get_image()
@@ -0,0 +1,150 @@
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src import serialization
+
+# имя сцены -> хеш, с которым для неё рисовалась миниатюра
+MANIFEST_NAME = "thumbnails.json"
+
+
+def find_scenes(pattern="*.json"):
+    """Сохранённые сцены, подходящие под шаблон имени"""
+    return sorted(fnmatch.filter(serialization.get_saved_scenes(), pattern))
+
+
+def get_scene_hash(filename, width, height):
+    """Хеш содержимого сцены вместе с размером миниатюры"""
+    digest = hashlib.sha256(f"{width}x{height}".encode())
+    with open(os.path.join(serialization.SAVE_DIRECTORY, filename), "rb") as file:
+        digest.update(file.read())
+    return digest.hexdigest()
+
+
+def get_thumbnail_path(directory, filename):
+    """Расширение сцены остаётся в имени, чтобы scene.json и scene.s3d
+    не делили одну миниатюру"""
+    return os.path.join(directory, filename + ".png")
+
+
+def load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return dict()
+
+
+def save_manifest(directory, manifest):
+    # подменяем файл целиком, чтобы прерванный запуск не испортил манифест
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(path + ".tmp", path)
+
+
+def render_thumbnail(task):
+    """Рисует одну миниатюру, выполняется в процессе-обработчике"""
+    filename, path, width, height = task
+    serialization.render_scene_to_image(filename, path, width, height)
+    return filename
+
+
+def render_thumbnails(tasks, workers=None):
+    """Рисует миниатюры и по мере готовности отдаёт (имя сцены, ошибка),
+    ошибка None, если миниатюра нарисована"""
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            try:
+                render_thumbnail(task)
+            except Exception as error:
+                yield task[0], error
+            else:
+                yield task[0], None
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_thumbnail, task): task[0] for task in tasks}
+        for future in as_completed(futures):
+            yield futures[future], future.exception()
+
+
+def generate_thumbnails(
+    pattern="*.json",
+    directory=None,
+    width=320,
+    height=240,
+    workers=None,
+    force=False,
+):
+    """Рисует миниатюры сохранённых сцен в несколько процессов.
+    Сцены, чей файл не менялся с прошлого запуска, пропускаются.
+    Манифест сохраняется после каждой миниатюры, ошибка одной сцены
+    не останавливает остальные. Возвращает пути нарисованных миниатюр
+    и словарь имя сцены -> ошибка для ненарисованных"""
+    directory = directory or serialization.get_image_directory()
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+
+    tasks = []
+    hashes = dict()
+    for filename in find_scenes(pattern):
+        path = get_thumbnail_path(directory, filename)
+        hashes[filename] = get_scene_hash(filename, width, height)
+        if (
+            not force
+            and manifest.get(filename) == hashes[filename]
+            and os.path.exists(path)
+        ):
+            continue
+        tasks.append((filename, path, width, height))
+
+    rendered = set()
+    failed = dict()
+    for filename, error in render_thumbnails(tasks, workers):
+        if error is not None:
+            failed[filename] = error
+            continue
+        rendered.add(filename)
+        manifest[filename] = hashes[filename]
+        save_manifest(directory, manifest)
+
+    paths = [
+        get_thumbnail_path(directory, filename)
+        for filename, *_ in tasks
+        if filename in rendered
+    ]
+    return paths, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Миниатюры сохранённых сцен")
+    parser.add_argument("pattern", nargs="?", default="*.json")
+    parser.add_argument("--directory", default=None)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+
+    paths, failed = generate_thumbnails(
+        args.pattern,
+        args.directory,
+        args.width,
+        args.height,
+        args.workers,
+        args.force,
+    )
+    for path in paths:
+        print(path)
+    for filename, error in failed.items():
+        print(f"{filename}: {error}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class TransformStore:
+    """Непрерывное хранилище матриц узлов.
+    Один буфер float32 формы (2, N, 4, 4): translations и scalings это его
+    срезы (N, 4, 4), узел хранит только индекс своей строки"""
+
+    def __init__(self, capacity=64):
+        self.buffer = np.zeros((2, capacity, 4, 4), dtype=np.float32)
+        self.buffer[:] = np.identity(4, dtype=np.float32)
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.nodes = dict()  # индекс -> узел
+
+    @property
+    def translations(self):
+        return self.buffer[0]
+
+    @property
+    def scalings(self):
+        return self.buffer[1]
+
+    @property
+    def capacity(self):
+        return self.buffer.shape[1]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _grow(self):
+        old_capacity = self.capacity
+        buffer = np.empty((2, old_capacity * 2, 4, 4), dtype=np.float32)
+        buffer[:] = np.identity(4, dtype=np.float32)
+        buffer[:, :old_capacity] = self.buffer
+        self.buffer = buffer
+        self.free_slots.extend(range(old_capacity * 2 - 1, old_capacity - 1, -1))
+
+    def attach(self, node):
+        """Переносит матрицы узла в хранилище"""
+        if node._transform_store is self:
+            return node._transform_index
+        if node._transform_store is not None:
+            node._transform_store.detach(node)
+
+        if not self.free_slots:
+            self._grow()
+        index = self.free_slots.pop()
+
+        self.translations[index] = node.translation_matrix
+        self.scalings[index] = node.scaling_matrix
+        node._transform_store = self
+        node._transform_index = index
+        self.nodes[index] = node
+        return index
+
+    def detach(self, node):
+        """Возвращает узлу собственные матрицы и освобождает строку"""
+        if node._transform_store is not self:
+            return
+        index = node._transform_index
+        translation_matrix = np.array(self.translations[index], dtype=float)
+        scaling_matrix = np.array(self.scalings[index], dtype=float)
+
+        node._transform_store = None
+        node._transform_index = None
+        node.translation_matrix = translation_matrix
+        node.scaling_matrix = scaling_matrix
+
+        self.translations[index] = np.identity(4)
+        self.scalings[index] = np.identity(4)
+        del self.nodes[index]
+        self.free_slots.append(index)
+
+    def indices_of(self, nodes):
+        return np.array([node._transform_index for node in nodes], dtype=int)
+
+    def translate(self, indices, offsets):
+        """Сдвигает сразу много узлов, то же, что Node.translate для каждого"""
+        offsets = np.broadcast_to(
+            np.asarray(offsets, dtype=np.float32), (len(indices), 3)
+        )
+        translations = self.translations[indices]
+        translations[:, :3, 3] += np.einsum(
+            "nij,nj->ni", translations[:, :3, :3], offsets
+        )
+        self.translations[indices] = translations
+
+    def model_matrices(self, indices=None):
+        """Матрицы translation @ scaling, в таком виде их применяет render"""
+        if indices is None:
+            indices = sorted(self.nodes)
+        return self.translations[indices] @ self.scalings[indices]
@@ -1,3 +1,7 @@
+import atexit
+import sys
+import time
+
 import numpy as np
 from OpenGL.GL import (
     glEnable,
@@ -22,6 +26,8 @@ from OpenGL.GL import (
     glDisable,
     glCallList,
     glGenLists,
+    glScissor,
+    glReadPixels,
     GL_CULL_FACE,
     GL_BACK,
     GL_DEPTH_TEST,
@@ -37,6 +43,10 @@ from OpenGL.GL import (
     GL_FRONT_AND_BACK,
     GL_AMBIENT_AND_DIFFUSE,
     GL_LINES,
+    GL_DITHER,
+    GL_SCISSOR_TEST,
+    GL_DEPTH_COMPONENT,
+    GL_FLOAT,
 )
 from OpenGL.GLU import gluPerspective, gluUnProject
 from OpenGL.GLUT import (
@@ -45,14 +55,19 @@ from OpenGL.GLUT import (
     glutInitDisplayMode,
     glutDisplayFunc,
     glutMainLoop,
+    glutCloseFunc,
     glutGet,
     glutPostRedisplay,
     glutCreateMenu,
     glutAddMenuEntry,
     glutAttachMenu,
     glutAddSubMenu,
+    glutIdleFunc,
+    glutSetWindowTitle,
+    glutTimerFunc,
     GLUT_SINGLE,
     GLUT_RGB,
+    GLUT_DEPTH,
     GLUT_WINDOW_WIDTH,
     GLUT_WINDOW_HEIGHT,
     GLUT_MIDDLE_BUTTON,
@@ -69,26 +84,42 @@ from OpenGL.raw.GL.VERSION.GL_1_0 import (
     glColor3f,
     glReadBuffer,
     GL_FRONT,
-    glReadPixels,
     GL_RGB,
 )
 from OpenGL.raw.GL._types import GLfloat_4, GLfloat_3, GL_UNSIGNED_BYTE
 from numpy.linalg import norm
 from src.interaction import Interaction
 from src.premitives import init_primitives, Plane, Cube, Sphere, Point
+from src.renderer import init_renderer, PickBuffer
+from src.frustum import Frustum, perspective, pick_matrix
+from src.node import translation
 from src.scene import Scene
-from src import serialization
+from src.journal import SceneJournal
+from src import serialization, damage, renderer
 
 WINDOW_WIDTH = 480
 WINDOW_HEIGHT = 640
+WINDOW_TITLE = "3D Editor"
+STREAM_SIZE = 16 * 1024 * 1024  # JSON-сцены больше этого грузятся по частям
+LOAD_STEP_SECONDS = 0.05  # сколько загрузка занимает за один простой окна
+AUTOSAVE_MS = 5000  # как часто изменения сцены дописываются в журнал
 
 
 class Viewer:
     def __init__(self):
+        self.projection = None  # копия матрицы проекции для отсечения по камере
+        self.viewport_height = None
+        self.pick_mode = "ray"  # или "color": выбор по цвету номера узла
+        self.pick_buffer = PickBuffer()
+        self.loading = None  # генератор загрузки сцены по частям
+        self.journal = None  # журнал автосохранения
+        self.load_percent = None
         self._init_interface()
         self.init_opengl()
         init_primitives()
+        init_renderer()
         self.init_grid()
+        self.init_autosave()
         self.init_scene()
         self.init_interaction()
         self.create_menu()
@@ -97,8 +128,9 @@ class Viewer:
         glutInit()
         glutInitWindowSize(WINDOW_HEIGHT, WINDOW_WIDTH)
         glutInitWindowPosition(50, 50)
-        glutInitDisplayMode(GLUT_SINGLE | GLUT_RGB)
-        glutCreateWindow("3D Editor")
+        # буфер глубины нужен z-тесту и выбору по цвету без FBO
+        glutInitDisplayMode(GLUT_SINGLE | GLUT_RGB | GLUT_DEPTH)
+        glutCreateWindow(WINDOW_TITLE)
         glutDisplayFunc(self.render)
 
     def init_opengl(self):
@@ -122,7 +154,43 @@ class Viewer:
         glClearColor(0.4, 0.4, 0.4, 0.0)
 
     def init_scene(self):
-        self.load_scene()
+        if self.journal is not None and self.journal.exists():
+            # прошлый сеанс оборвался: продолжаем с его автосохранения
+            self.scene = self.journal.recover()
+            self.start_journal()
+            damage.mark_dirty()
+        else:
+            self.load_scene()
+
+    def init_autosave(self):
+        self.journal = SceneJournal(serialization.get_autosave_directory())
+        glutTimerFunc(AUTOSAVE_MS, self.autosave, 0)
+        if bool(glutCloseFunc):  # есть только во freeglut
+            glutCloseFunc(self.shutdown)
+        # обычный GLUT о закрытии окна не сообщает, остаётся выход процесса
+        atexit.register(self.exit_handler)
+
+    def start_journal(self):
+        """Автосохранение текущей сцены начинается с её полного снимка"""
+        if self.journal is not None:
+            self.journal.attach(self.scene)
+
+    def autosave(self, value=0):
+        # сцена, загружаемая по частям, попадёт в журнал целиком по окончании
+        if self.journal is not None and self.loading is None:
+            self.journal.flush()
+        glutTimerFunc(AUTOSAVE_MS, self.autosave, 0)
+
+    def shutdown(self):
+        """Окно закрыто штатно: автосохранение больше не нужно"""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def exit_handler(self):
+        # после необработанной ошибки автосохранение нужно для восстановления
+        if not hasattr(sys, "last_value"):
+            self.shutdown()
 
     def create_sample_scene(self):
         def create_plane(corners_coords):
@@ -187,6 +255,8 @@ class Viewer:
         self.interaction.register_callback("scale", self.scale)
         self.interaction.register_callback("delete", self.delete)
         self.interaction.register_callback("multiple_choice", self.multiple_choice)
+        self.interaction.register_callback("box_select", self.box_select)
+        self.interaction.register_callback("toggle_pick_mode", self.toggle_pick_mode)
         self.interaction.register_callback("combine", self.combine)
         self.interaction.register_callback("create_menu", self.create_menu)
         self.interaction.register_callback("dissection", self.dissection_plane)
@@ -194,24 +264,91 @@ class Viewer:
         self.interaction.register_callback("save", self.save_scene)
         self.interaction.register_callback("load", self.load_scene)
 
-    def save_scene(self):
-        serialization.save_scene(self.scene)
+    def save_scene(self, binary=False):
+        if binary:
+            serialization.save_scene(self.scene, binary=True)
+        else:
+            serialization.save_scene(self.scene)
         self.create_menu()
 
     def load_scene(self, filename="Demonstration_scene.json"):
+        self.stop_loading()
+        if (
+            filename.endswith(".json")
+            and serialization.get_scene_size(filename) > STREAM_SIZE
+        ):
+            self.stream_scene(filename)
+            return
         self.scene = serialization.load_scene(filename)
+        self.start_journal()
+        damage.mark_dirty()
         # self.scene = Scene()
         # self.create_sample_scene()
 
+    def stream_scene(self, filename):
+        """Показывает пустую сцену сразу и достраивает её в простое окна"""
+        self.stop_loading()
+        self.scene = Scene()
+        self.loading = serialization.stream_scene(
+            filename, self.scene, self.show_load_progress
+        )
+        glutIdleFunc(self.load_step)
+        damage.mark_dirty()
+
+    def load_step(self):
+        """Добавляет узлы, пока не выйдет время шага, и перерисовывает окно"""
+        deadline = time.perf_counter() + LOAD_STEP_SECONDS
+        for _ in self.loading:
+            if time.perf_counter() >= deadline:
+                break
+        else:
+            self.stop_loading()
+            self.start_journal()
+            print("Scene is loaded")
+        if damage.tracker.is_dirty():
+            glutPostRedisplay()
+
+    def show_load_progress(self, count, bytes_read, total_bytes):
+        percent = 100 * bytes_read // max(total_bytes, 1)
+        if percent != self.load_percent:
+            self.load_percent = percent
+            glutSetWindowTitle(f"{WINDOW_TITLE} - loading {percent}% ({count} nodes)")
+
+    def stop_loading(self):
+        if self.loading is None:
+            return
+        self.loading.close()
+        self.loading = None
+        self.load_percent = None
+        glutIdleFunc(None)
+        glutSetWindowTitle(WINDOW_TITLE)
+
     def main_loop(self):
         glutMainLoop()
 
     def render(self):
+        damage.tracker.clear()  # всё, что изменилось до этого, попадёт в кадр
         self.init_view()
 
         glEnable(GL_LIGHTING)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
+        self.apply_camera()
+
+        # рендерим объекты на сцене, попадающие в поле зрения
+        self.scene.render(self.get_frustum())
+
+        # отрисовка сетки
+        glDisable(GL_LIGHTING)  # отключаем свет чтобы она выделялась
+        glCallList(G_OBJ_PLANE)
+        glPopMatrix()
+
+        # ждём очистки буферов, чтобы начать отрисовку сцены
+        glFlush()
+
+    def apply_camera(self):
+        """Кладёт в стек матрицу трекбола и запоминает modelView.
+        Парный glPopMatrix делает вызывающий"""
         # меняем положение трекбола
         glMatrixMode(GL_MODELVIEW)
         glPushMatrix()
@@ -227,16 +364,49 @@ class Viewer:
         self.modelView = numpy.transpose(currentModelView)
         self.inverseModelView = numpy.linalg.inv(numpy.transpose(currentModelView))
 
-        # рендерим каждый объект на сцене
-        self.scene.render()
+    def get_frustum(self):
+        """Пирамида видимости текущей камеры, None до первого init_view"""
+        if self.projection is None:
+            return None
+        return Frustum.from_matrix(
+            self.projection @ self.modelView, self.viewport_height
+        )
 
-        # отрисовка сетки
-        glDisable(GL_LIGHTING)  # отключаем свет чтобы она выделялась
-        glCallList(G_OBJ_PLANE)
+    def pick_color(self, x, y):
+        """Выбор по цвету: узлы рисуются цветами своих номеров, и читается
+        один пиксель под курсором. Рисуем во внеэкранный кадр, а без FBO
+        прямо в окно с последующей перерисовкой. Возвращает (узел, глубина)"""
+        self.init_view()
+        use_framebuffer = renderer.framebuffers_enabled()
+        if use_framebuffer:
+            self.pick_buffer.bind(
+                glutGet(GLUT_WINDOW_WIDTH), glutGet(GLUT_WINDOW_HEIGHT)
+            )
+        glDisable(GL_LIGHTING)
+        glDisable(GL_DITHER)  # иначе цвет номера может исказиться
+        glEnable(GL_SCISSOR_TEST)
+        glScissor(x, y, 1, 1)  # нужен только пиксель под курсором
+        glClearColor(0.0, 0.0, 0.0, 0.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        self.apply_camera()
+        self.scene.render_ids(self.get_frustum())
         glPopMatrix()
 
-        # ждём очистки буферов, чтобы начать отрисовку сцены
-        glFlush()
+        color = glReadPixels(x, y, 1, 1, GL_RGB, GL_UNSIGNED_BYTE)
+        depth = glReadPixels(x, y, 1, 1, GL_DEPTH_COMPONENT, GL_FLOAT)
+
+        glDisable(GL_SCISSOR_TEST)
+        glEnable(GL_DITHER)
+        glClearColor(0.4, 0.4, 0.4, 0.0)
+        if use_framebuffer:
+            self.pick_buffer.unbind()
+        else:
+            damage.mark_dirty()  # пиксель в окне затёрт
+
+        color = np.frombuffer(color, dtype=np.uint8)
+        depth = float(np.asarray(depth, dtype=float).reshape(-1)[0])
+        return self.scene.get_node_by_color(color), depth
 
     def init_view(self):
         # параметры экрана
@@ -251,6 +421,10 @@ class Viewer:
         )  # задаёт преобразование из нормальных в экранные координаты
         gluPerspective(70, aspect_ratio, 0.1, 1000.0)  # задаём усечённую пирамиду
         glTranslated(0, 0, -15)  # двигаем камеру
+        self.projection = perspective(70, aspect_ratio, 0.1, 1000.0) @ translation(
+            [0, 0, -15]
+        )
+        self.viewport_height = ySize
 
     def get_ray(self, x, y):
         """Генерация луча"""
@@ -274,13 +448,49 @@ class Viewer:
 
     # методы обработки событий из interaction
     def pick(self, x, y, multiple_choice=False):
+        if self.pick_mode == "color":
+            picked, depth = self.pick_color(x, y)
+            start, direction = self.get_ray(x, y)
+            mindist = None
+            if picked is not None:
+                hit_point = numpy.array(gluUnProject(x, y, depth))
+                mindist = norm(hit_point - start)
+            self.scene.select_picked(
+                picked, mindist, start, direction, multiple_choice
+            )
+            return
         start, direction = self.get_ray(x, y)
         self.scene.pick(start, direction, self.modelView, multiple_choice)
 
+    def toggle_pick_mode(self):
+        self.pick_mode = "color" if self.pick_mode == "ray" else "ray"
+        print(f"pick mode: {self.pick_mode}")
+
     def multiple_choice(self, x, y):
         # print(f'condition ctrl is: {bool(x)}')
         self.pick(x, y, True)
 
+    def box_select(self, x0, y0, x1, y1, multiple_choice=False):
+        """Выделяет узлы внутри прямоугольника окна"""
+        if abs(x1 - x0) < 1 or abs(y1 - y0) < 1:
+            return  # рамка без площади
+        if self.projection is None:
+            self.init_view()
+        xSize, ySize = glutGet(GLUT_WINDOW_WIDTH), glutGet(GLUT_WINDOW_HEIGHT)
+        frustum = Frustum.from_matrix(
+            pick_matrix(x0, y0, x1, y1, xSize, ySize)
+            @ self.projection
+            @ self.modelView
+        )
+        start, direction = self.get_ray((x0 + x1) / 2, (y0 + y1) / 2)
+        self.scene.select_in_region(
+            frustum,
+            multiple_choice,
+            start=start,
+            direction=direction,
+            mat=self.modelView,
+        )
+
     def combine(self):
         self.scene.combine()
 
@@ -315,6 +525,7 @@ class Viewer:
         load_menu = glutCreateMenu(self.menu_select)
         glutAddMenuEntry("Save scene (K)", 1)
         glutAddMenuEntry("Save scene as png", 2)
+        glutAddMenuEntry("Save scene as binary", 13)
         glutAddMenuEntry("Create new scene", 3)
         glutAddSubMenu("Load scene (L)", load2_menu)
 
@@ -349,7 +560,10 @@ class Viewer:
         elif value == 2:
             serialization.export_scene_to_image()
         elif value == 3:
+            self.stop_loading()
             self.scene = Scene()
+            self.start_journal()
+            damage.mark_dirty()
         elif value == 4:
             self.place("point", center_of_window[0], center_of_window[1])
         elif value == 5:
@@ -368,6 +582,8 @@ class Viewer:
             self.dissection_plane()
         elif value == 12:
             self.extrude_plane()
+        elif value == 13:
+            self.save_scene(binary=True)
         elif value >= 100:
             files = serialization.get_saved_scenes()
             try:
@@ -377,7 +593,8 @@ class Viewer:
                 print("Файла ент")
                 raise IndexError
 
-        glutPostRedisplay()
+        if damage.tracker.is_dirty():
+            glutPostRedisplay()
         return 0
 
     def init_grid(self):